@@ -0,0 +1,264 @@
+"""admin_response_feed.py
+
+Paged, projected reads behind ``/api/survey-responses/admin``.
+
+The endpoint returned every response in one payload, with full ``answers`` blobs and
+``user_details`` form data, lazily loading user, organization, organization type and user
+details per row and logging a line per row. ``AdminResponseFeed`` instead:
+
+* selects exactly the columns the payload needs in one joined statement (responses ->
+  users -> organizations -> organization_types), plus one query for the first
+  ``user_details`` row of the page's users -- no ORM entities, no lazy loads;
+* classifies ``survey_type`` in SQL as well (``survey_type_condition``), so the
+  ``survey_type`` filter and keyset pagination (``id > cursor``, ``limit`` rows) give
+  full pages;
+* honours a ``fields`` projection: ``answers`` is only read when requested, and
+  ``user_details`` only when one of ``DETAIL_FIELDS``/``GEO_FIELDS`` is;
+* derives a weak ETag from ``COUNT(*)``, ``MAX(id)`` and ``MAX(updated_at)`` of the
+  responses and ``MAX(updated_at)`` of the other stamped tables (users, user details,
+  organizations, geocode cache), so an unchanged dashboard can be answered with ``304``
+  after one aggregate query, while an organization rename or type change (which moves
+  rows between survey types) produces a new tag.
+
+Row dicts keep exactly the keys (and conditional presence) the endpoint produced before.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, func, inspect, or_, select
+
+SURVEY_TYPES = ('church', 'institution', 'nonFormal', 'other')
+
+# Normalized organization type name -> survey type; anything else is 'other'
+_TYPE_NAMES = {
+    'church': ('church',),
+    'institution': ('institution',),
+    'nonFormal': ('non_formal_organizations', 'non-formal', 'non_formal'),
+}
+
+BASE_FIELDS = ('id', 'survey_type', 'response_date', 'template_id', 'user_id', 'status', 'answers')
+USER_FIELDS = ('user_name', 'user_email')
+ORGANIZATION_FIELDS = ('organization_id', 'organization_name', 'organization_type_id', 'organization_type_name')
+DETAIL_FIELDS = (
+    'city', 'country', 'physical_address', 'town', 'age_group', 'education_level',
+    'church_name', 'pastor_name', 'institution_name', 'president_name', 'ministry_name', 'leader_name',
+)
+# Filled in by the endpoint from the geocode cache, from the address detail fields
+GEO_FIELDS = ('latitude', 'longitude')
+ALL_FIELDS = BASE_FIELDS + USER_FIELDS + ORGANIZATION_FIELDS + DETAIL_FIELDS + GEO_FIELDS
+
+MAX_PAGE_SIZE = 1000
+
+
+def survey_type_for(org_type_name: Optional[str]) -> str:
+    """Survey type for an organization type name (as stored in ``organization_types.type``)."""
+    if not org_type_name:
+        return 'other'
+    normalized = org_type_name.lower().strip()
+    for survey_type, names in _TYPE_NAMES.items():
+        if normalized in names:
+            return survey_type
+    return 'other'
+
+
+def survey_type_condition(org_type_column, survey_type: str):
+    """SQL equivalent of ``survey_type_for(org_type_column) == survey_type``."""
+    normalized = func.lower(func.trim(org_type_column))
+    if survey_type in _TYPE_NAMES:
+        return normalized.in_(_TYPE_NAMES[survey_type])
+    known = [name for names in _TYPE_NAMES.values() for name in names]
+    return or_(org_type_column.is_(None), normalized.notin_(known))
+
+
+def parse_fields(value: Optional[str]) -> Optional[Set[str]]:
+    """``fields=a,b,c`` -> set of known field names; ``None`` (everything) when absent.
+
+    Raises ``ValueError`` naming any unknown field.
+    """
+    if not value:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = fields - set(ALL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields | {'id'}  # the cursor is the response id
+
+
+def project(data: Dict, fields: Optional[Set[str]]) -> Dict:
+    """``data`` restricted to ``fields`` (all of it for ``None``)."""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+
+class AdminResponseFeed:
+    """Read admin survey response rows for the given (v1) models."""
+
+    def __init__(self, response_model, user_model, org_model, org_type_model, details_model,
+                 stamp_models: Sequence = ()):
+        self.response_model = response_model
+        self.user_model = user_model
+        self.org_model = org_model
+        self.org_type_model = org_type_model
+        self.details_model = details_model
+        # Other tables whose MAX(updated_at) feeds into the ETag
+        self.stamp_models = tuple(stamp_models)
+        self._stamp_tables_seen: Set[str] = set()
+
+    # ------------------------------------------------------------------
+    # ETag
+    # ------------------------------------------------------------------
+
+    def etag(self, session, variant: str = '') -> str:
+        """Opaque tag for the current data (send as a weak ETag); ``variant`` distinguishes query parameters."""
+        response = self.response_model
+        columns = [func.count(response.id), func.max(response.id), func.max(response.updated_at)]
+        columns += [select(func.max(model.updated_at)).scalar_subquery()
+                    for model in self.stamp_models if self._stampable(session, model)]
+        row = session.execute(select(*columns)).one()
+        stamp = '|'.join('' if value is None else str(value) for value in row) + '|' + variant
+        return hashlib.sha1(stamp.encode('utf-8')).hexdigest()[:20]
+
+    def _stampable(self, session, model) -> bool:
+        # Some stamped tables (geocode_cache) are only created on first use, and older
+        # databases lack organizations.updated_at until migrate_organizations_updated_at.py
+        name = model.__tablename__
+        if name not in self._stamp_tables_seen:
+            inspector = inspect(session.get_bind())
+            if inspector.has_table(name) and any(
+                    column['name'] == 'updated_at' for column in inspector.get_columns(name)):
+                self._stamp_tables_seen.add(name)
+        return name in self._stamp_tables_seen
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def _first_details(self, session, user_ids: Iterable[int]) -> Dict[int, Dict]:
+        """``{user_id: form_data}`` of each user's first ``user_details`` row."""
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return {}
+        model = self.details_model
+        details = {}
+        for user_id, form_data in session.execute(
+                select(model.user_id, model.form_data)
+                .where(model.user_id.in_(user_ids)).order_by(model.user_id, model.id)):
+            details.setdefault(user_id, form_data or {})
+        return details
+
+    def page(self, session, survey_type: Optional[str] = None, cursor: Optional[int] = None,
+             limit: Optional[int] = None, fields: Optional[Set[str]] = None) -> Tuple[List[Dict], Optional[int]]:
+        """``(rows, next_cursor)`` ordered by response id; ``next_cursor`` is ``None`` on the last page.
+
+        ``fields`` decides what is read (answers, user details); apply ``project`` to the
+        rows once they are complete.
+        """
+        response, user, org, org_type = self.response_model, self.user_model, self.org_model, self.org_type_model
+        wants_answers = fields is None or 'answers' in fields
+        wants_details = fields is None or bool(fields & set(DETAIL_FIELDS + GEO_FIELDS))
+
+        columns = [
+            response.id, response.created_at, response.template_id, response.user_id, response.status,
+            user.firstname, user.lastname, user.email,
+            org.id.label('organization_id'), org.name.label('organization_name'), org.type.label('organization_type_id'),
+            org_type.type.label('organization_type_name'),
+        ]
+        if wants_answers:
+            columns.append(response.answers)
+
+        query = (
+            select(*columns)
+            .select_from(response)
+            .join(user, response.user_id == user.id)
+            .outerjoin(org, user.organization_id == org.id)
+            .outerjoin(org_type, org.type == org_type.id)
+        )
+        conditions = []
+        if survey_type:
+            conditions.append(survey_type_condition(org_type.type, survey_type))
+        if cursor is not None:
+            conditions.append(response.id > cursor)
+        if conditions:
+            query = query.where(and_(*conditions))
+        query = query.order_by(response.id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        records = session.execute(query).all()
+        next_cursor = None
+        if limit is not None and len(records) > limit:
+            records = records[:limit]
+            next_cursor = records[-1].id
+
+        details = self._first_details(session, (r.user_id for r in records)) if wants_details else {}
+        return [self._row(record, details, wants_answers) for record in records], next_cursor
+
+    @staticmethod
+    def _row(record, details: Dict[int, Dict], with_answers: bool) -> Dict:
+        org_type_name = record.organization_type_name if record.organization_id is not None else None
+        survey_type = survey_type_for(org_type_name)
+        data = {
+            'id': record.id,
+            'survey_type': survey_type,
+            'response_date': record.created_at.isoformat() if record.created_at else None,
+            'template_id': record.template_id,
+            'user_id': record.user_id,
+            'status': record.status,
+        }
+        if with_answers:
+            data['answers'] = record.answers
+        data.update({
+            'user_name': f"{record.firstname or ''} {record.lastname or ''}".strip(),
+            'user_email': record.email,
+        })
+        if record.organization_id is not None:
+            data.update({
+                'organization_id': record.organization_id,
+                'organization_name': record.organization_name,
+                'organization_type_id': record.organization_type_id,
+                'organization_type_name': org_type_name,
+            })
+
+        form_data = details.get(record.user_id)
+        if form_data is not None:
+            data.update({
+                'city': form_data.get('city'),
+                'country': form_data.get('country'),
+                'physical_address': form_data.get('address'),
+                'town': form_data.get('town'),
+                'age_group': form_data.get('age_group'),
+                'education_level': form_data.get('education_level'),
+            })
+            contact_name = f"{form_data.get('first_name', '')} {form_data.get('last_name', '')}".strip()
+            if survey_type == 'church':
+                data.update({
+                    'church_name': form_data.get('organization_name') or data.get('organization_name'),
+                    'pastor_name': contact_name or data.get('user_name'),
+                })
+            elif survey_type == 'institution':
+                data.update({
+                    'institution_name': form_data.get('organization_name') or data.get('organization_name'),
+                    'president_name': contact_name or data.get('user_name'),
+                })
+            elif survey_type == 'nonFormal':
+                data.update({
+                    'ministry_name': form_data.get('organization_name') or data.get('organization_name'),
+                    'leader_name': contact_name or data.get('user_name'),
+                })
+        return data
+
+
+__all__ = [
+    'SURVEY_TYPES',
+    'ALL_FIELDS',
+    'DETAIL_FIELDS',
+    'GEO_FIELDS',
+    'MAX_PAGE_SIZE',
+    'survey_type_for',
+    'survey_type_condition',
+    'parse_fields',
+    'project',
+    'AdminResponseFeed',
+]
@@ -1,10 +1,10 @@
-from flask import Flask, request, jsonify, g, make_response, send_from_directory
+from flask import Flask, request, jsonify, make_response, send_file, send_from_directory, stream_with_context, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy import text, or_, and_, select
 from sqlalchemy import UniqueConstraint
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 import json 
 from datetime import datetime, timedelta
 import secrets
@@ -22,15 +22,13 @@ from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import create_engine
-import boto3
-from botocore.exceptions import ClientError
+# boto3/botocore, geopy, document_parser and text_analytics are imported where they are used
+# so workers boot without paying for them; run startup_report.py to check import cost.
 import csv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import time as time_module
 import secrets
 from datetime import timedelta
@@ -44,7 +42,36 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Import services
-from document_parser import DocumentParserService
+from response_answer_store import (
+    VERSION_V1, sync_response_answers, delete_response_answers, aggregate_numeric_answers,
+    extract_numeric_value, build_section_lookup,
+)
+from comparison_aggregates import (
+    record_response_change, response_contributions, signature_lookup, peer_statistics,
+    index_template_signatures, drop_template_signatures, templates_sharing_signatures,
+)
+from text_analysis_jobs import TextAnalysisJobRunner
+from request_metrics import init_request_metrics
+from batch_geocoder import BatchGeocoder, FakeGeocodeProvider, GeocodeProvider
+from email_delivery import get_smtp_pool, shared_ses_client
+from email_outbox import EmailOutbox
+from email_templates import EmailTemplateCache, render_template
+from scheduler_service import SchedulerService
+from org_search_index import OrganizationSearchIndex
+from kpi_rollups import KpiRollups
+from report_queries import EXPORT_COLUMNS, ReportQueryCompiler
+from report_export import CSV_MIMETYPE, XLSX_MIMETYPE, csv_stream, xlsx_stream
+from wide_export import MIMETYPES as WIDE_EXPORT_MIMETYPES, WideResponseExporter
+from response_cache import ResponseCache, STATS_ENDPOINT as RESPONSE_CACHE_STATS_ENDPOINT, make_backend
+from admin_response_feed import (
+    AdminResponseFeed, MAX_PAGE_SIZE as ADMIN_MAX_PAGE_SIZE, SURVEY_TYPES as ADMIN_SURVEY_TYPES,
+    GEO_FIELDS as ADMIN_GEO_FIELDS, parse_fields as parse_admin_fields, project as project_admin_fields,
+)
+from org_hierarchy import OrganizationHierarchy
+from geocode_pipeline import (
+    GeocodeCache, GeocodeWorker, address_from_components, normalize_address,
+    NEGATIVE as GEOCODE_NEGATIVE,
+)
 
 # Email configuration
 def load_ses_credentials():
@@ -83,8 +110,21 @@ def is_email_service_active_for_organization(org_id):
         logger.error(f"Error checking email service status for organization {org_id}: {str(e)}")
         return False, f"Error checking email service status: {str(e)}"
 
+def _ses_client_error():
+    """botocore's ClientError for ``except`` clauses, imported only once an exception is being handled"""
+    try:
+        from botocore.exceptions import ClientError
+    except ImportError:  # without botocore no SES call can raise it
+        class ClientError(Exception):
+            pass
+    return ClientError
+
 # Initialize SES client
 def get_ses_client():
+    """Return the shared, rate-limited SES client (built on first use)"""
+    return shared_ses_client(_create_ses_client)
+
+def _create_ses_client():
     """Initialize and return SES client"""
     try:
         # Get AWS credentials from environment variables
@@ -100,6 +140,8 @@ def get_ses_client():
             logger.error("AWS credentials not found in environment variables")
             return None
         
+        import boto3  # deferred: only email routes need it
+        
         # Create SES client with explicit credentials
         session = boto3.Session(
             aws_access_key_id=aws_access_key_id,
@@ -117,8 +159,6 @@ def send_welcome_email_smtp(to_email, username, password, firstname=None, survey
         # Get SMTP credentials from environment
         smtp_username = os.getenv('SES_SMTP_USERNAME')
         smtp_password = os.getenv('SES_SMTP_PASSWORD')
-        smtp_host = os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com')
-        smtp_port = int(os.getenv('SES_SMTP_PORT', '587'))
         source_email = os.getenv('SES_VERIFIED_EMAIL', 'noreply@saurara.org')
         
         if not smtp_username or not smtp_password:
@@ -308,10 +348,7 @@ Stay Connected: Follow us for updates and insights"""
         msg.attach(html_part)
         
         # Send the email
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(source_email, to_email, msg.as_string())
+        get_smtp_pool().send(source_email, to_email, msg.as_string())
         
         logger.info(f"Welcome email sent successfully via SMTP to {to_email}")
         return {
@@ -336,23 +373,18 @@ def send_welcome_email(to_email, username, password, firstname=None, survey_code
         if email_template_id:
             logger.info(f"[EMAIL] Attempting to use specific email template ID: {email_template_id}")
             try:
-                template = EmailTemplate.query.get(email_template_id)
+                template = email_template_cache.get(email_template_id, EmailTemplate.query.get)
                 if template:
-                    template_data = {
-                        'name': template.name,
-                        'subject': template.subject,
-                        'html_body': template.html_body,
-                        'text_body': template.text_body
-                    }
+                    template_data = template.to_template_data()
                     use_template = True
                     logger.info(f"[EMAIL] Successfully loaded specific email template ID {email_template_id}: {template.name}")
                 else:
                     logger.warning(f"[EMAIL] Specific template ID {email_template_id} not found, falling back to default")
                     # Fallback to default template if specified template not found
-                    template_response = get_email_template_by_type('welcome')
-                    use_template = template_response[1] == 200
+                    welcome_template, status_code, _ = get_email_template_by_type_and_organization('welcome')
+                    use_template = status_code == 200
                     if use_template:
-                        template_data = template_response[0].get_json()
+                        template_data = welcome_template.to_template_data()
                         logger.info("[EMAIL] Specified template not found, using default welcome template")
                     else:
                         logger.error("[EMAIL] Failed to load both specific and default templates")
@@ -361,10 +393,10 @@ def send_welcome_email(to_email, username, password, firstname=None, survey_code
                 logger.error(f"[EMAIL] Error fetching specific email template {email_template_id}: {str(e)}")
                 # Fallback to default template
                 logger.info(f"[EMAIL] Attempting fallback to default welcome template")
-                template_response = get_email_template_by_type('welcome')
-                use_template = template_response[1] == 200
+                welcome_template, status_code, _ = get_email_template_by_type_and_organization('welcome')
+                use_template = status_code == 200
                 if use_template:
-                    template_data = template_response[0].get_json()
+                    template_data = welcome_template.to_template_data()
                     logger.info("[EMAIL] Error with specific template, using default welcome template")
                 else:
                     logger.error("[EMAIL] Failed to load fallback default template")
@@ -372,10 +404,10 @@ def send_welcome_email(to_email, username, password, firstname=None, survey_code
         else:
             # Use default welcome template
             logger.info(f"[EMAIL] No specific template ID provided, using default welcome template")
-            template_response = get_email_template_by_type('welcome')
-            use_template = template_response[1] == 200
+            welcome_template, status_code, _ = get_email_template_by_type_and_organization('welcome')
+            use_template = status_code == 200
             if use_template:
-                template_data = template_response[0].get_json()
+                template_data = welcome_template.to_template_data()
                 logger.info("[EMAIL] Successfully loaded default welcome template")
             else:
                 logger.error("[EMAIL] Failed to load default welcome template")
@@ -489,7 +521,7 @@ The Saurara Research Team"""
             'message': 'Email sent successfully via SES API'
         }
         
-    except ClientError as e:
+    except _ses_client_error() as e:
         error_code = e.response['Error']['Code']
         error_message = e.response['Error']['Message']
         logger.error(f"[EMAIL] SES API ClientError: {error_code} - {error_message}")
@@ -683,8 +715,6 @@ def send_survey_assignment_email_smtp(to_email, username, password, survey_code,
         # Get SMTP credentials from environment
         smtp_username = os.getenv('SES_SMTP_USERNAME')
         smtp_password = os.getenv('SES_SMTP_PASSWORD')
-        smtp_host = os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com')
-        smtp_port = int(os.getenv('SES_SMTP_PORT', '587'))
         source_email = os.getenv('SES_VERIFIED_EMAIL', 'noreply@saurara.org')
         
         if not smtp_username or not smtp_password:
@@ -846,10 +876,7 @@ Survey Platform: www.saurara.org | Support: info@saurara.org"""
         msg.attach(html_part)
         
         # Send the email
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(source_email, to_email, msg.as_string())
+        get_smtp_pool().send(source_email, to_email, msg.as_string())
         
         logger.info(f"Survey assignment email sent successfully via SMTP to {to_email}")
         return {
@@ -871,8 +898,6 @@ def send_reminder_email_smtp(to_email, username, survey_code, firstname=None, or
         # Get SMTP credentials from environment
         smtp_username = os.getenv('SES_SMTP_USERNAME')
         smtp_password = os.getenv('SES_SMTP_PASSWORD')
-        smtp_host = os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com')
-        smtp_port = int(os.getenv('SES_SMTP_PORT', '587'))
         source_email = os.getenv('SES_VERIFIED_EMAIL', 'noreply@saurara.org')
         
         if not smtp_username or not smtp_password:
@@ -1045,10 +1070,7 @@ Visit: www.saurara.org | Email: info@saurara.org"""
         msg.attach(html_part)
         
         # Send the email
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(source_email, to_email, msg.as_string())
+        get_smtp_pool().send(source_email, to_email, msg.as_string())
         
         logger.info(f"Reminder email sent successfully via SMTP to {to_email}")
         return {
@@ -1074,14 +1096,9 @@ def send_reminder_email(to_email, username, survey_code, firstname=None, organiz
         # If specific template_id is provided, use that template
         if template_id:
             try:
-                template = EmailTemplate.query.get(template_id)
+                template = email_template_cache.get(template_id, EmailTemplate.query.get)
                 if template:
-                    template_data = {
-                        'name': template.name,
-                        'subject': template.subject,
-                        'html_body': template.html_body,
-                        'text_body': template.text_body
-                    }
+                    template_data = template.to_template_data()
                     use_template = True
                     logger.info(f"Using specific email template ID {template_id}: {template.name}")
             except Exception as e:
@@ -1092,12 +1109,7 @@ def send_reminder_email(to_email, username, survey_code, firstname=None, organiz
             template, status_code, message = get_email_template_by_type_and_organization('reminder', organization_id)
             use_template = status_code == 200
             if use_template:
-                template_data = {
-                    'name': template.name,
-                    'subject': template.subject,
-                    'html_body': template.html_body,
-                    'text_body': template.text_body
-                }
+                template_data = template.to_template_data()
                 logger.info(f"Using email template: {template.name} (Org: {template.organization_id})")
             else:
                 logger.warning(f"No reminder template found for organization {organization_id}, using fallback")
@@ -1197,7 +1209,7 @@ The Saurara Research Team"""
             'message': 'Reminder email sent successfully via SES API'
         }
         
-    except ClientError as e:
+    except _ses_client_error() as e:
         error_code = e.response['Error']['Code']
         error_message = e.response['Error']['Message']
         logger.error(f"[EMAIL] SES API ClientError: {error_code} - {error_message}")
@@ -1209,6 +1221,67 @@ The Saurara Research Team"""
         return send_reminder_email_smtp(to_email, username, survey_code, firstname, organization_name, days_remaining, password)
 
 # Geocoding utility functions
+_nominatim_client = None
+
+
+def _get_nominatim():
+    """One Nominatim client per process instead of one per lookup."""
+    global _nominatim_client
+    if _nominatim_client is None:
+        from geopy.geocoders import Nominatim
+        _nominatim_client = Nominatim(user_agent="bosko_partners_survey_app")
+    return _nominatim_client
+
+
+def _nominatim_query(address_components):
+    """Nominatim query string for an address component dict ('' when there is nothing to look up)"""
+    address_parts = []
+    
+    # Add address lines
+    if address_components.get('address_line1'):
+        address_parts.append(address_components['address_line1'])
+    if address_components.get('address_line2'):
+        address_parts.append(address_components['address_line2'])
+    
+    # Add city/town
+    if address_components.get('city'):
+        address_parts.append(address_components['city'])
+    elif address_components.get('town'):
+        address_parts.append(address_components['town'])
+    
+    # Add province/state
+    if address_components.get('province'):
+        address_parts.append(address_components['province'])
+    
+    # Add country
+    if address_components.get('country'):
+        address_parts.append(address_components['country'])
+    
+    # Add postal code
+    if address_components.get('postal_code'):
+        address_parts.append(address_components['postal_code'])
+    
+    return ', '.join(filter(None, address_parts))
+
+def _geocode_nominatim_once(address_components):
+    """
+    One Nominatim request, recording the answer in the geocode cache.
+    
+    Timeouts and service errors are raised, not retried, so callers decide how to retry
+    (the batch geocoder does so under Nominatim's rate limit).
+    """
+    full_address = _nominatim_query(address_components)
+    if not full_address:
+        return None, None
+    location = _get_nominatim().geocode(full_address, timeout=10)
+    if location:
+        logger.info(f"Successfully geocoded address to: {location.latitude}, {location.longitude}")
+        geocode_cache.put(address_components, float(location.latitude), float(location.longitude), 'nominatim')
+        return float(location.latitude), float(location.longitude)
+    logger.warning(f"No geocoding results found for address: {full_address}")
+    geocode_cache.put_miss(address_components, 'nominatim')
+    return None, None
+
 def geocode_address(address_components):
     """
     Geocode an address using multiple components and return latitude, longitude
@@ -1220,56 +1293,26 @@ def geocode_address(address_components):
     Returns:
         tuple: (latitude, longitude) or (None, None) if geocoding fails
     """
+    from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+    
     try:
-        # Initialize geocoder with a user agent
-        geolocator = Nominatim(user_agent="bosko_partners_survey_app")
-        
-        # Build address string from components
-        address_parts = []
-        
-        # Add address lines
-        if address_components.get('address_line1'):
-            address_parts.append(address_components['address_line1'])
-        if address_components.get('address_line2'):
-            address_parts.append(address_components['address_line2'])
-        
-        # Add city/town
-        if address_components.get('city'):
-            address_parts.append(address_components['city'])
-        elif address_components.get('town'):
-            address_parts.append(address_components['town'])
-        
-        # Add province/state
-        if address_components.get('province'):
-            address_parts.append(address_components['province'])
-        
-        # Add country
-        if address_components.get('country'):
-            address_parts.append(address_components['country'])
-        
-        # Add postal code
-        if address_components.get('postal_code'):
-            address_parts.append(address_components['postal_code'])
-        
-        if not address_parts:
+        full_address = _nominatim_query(address_components)
+        if not full_address:
             logger.warning("No address components provided for geocoding")
             return None, None
         
-        # Create full address string
-        full_address = ', '.join(filter(None, address_parts))
+        # Shared cache first: repeated addresses (and known misses) never reach the network
+        cached = geocode_cache.get(address_components, 'nominatim')
+        if cached is not None:
+            return cached
+        
         logger.info(f"Geocoding address: {full_address}")
         
         # Attempt geocoding with retry logic
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                location = geolocator.geocode(full_address, timeout=10)
-                if location:
-                    logger.info(f"Successfully geocoded address to: {location.latitude}, {location.longitude}")
-                    return float(location.latitude), float(location.longitude)
-                else:
-                    logger.warning(f"No geocoding results found for address: {full_address}")
-                    break
+                return _geocode_nominatim_once(address_components)
             except GeocoderTimedOut:
                 logger.warning(f"Geocoding timeout on attempt {attempt + 1} for address: {full_address}")
                 if attempt < max_retries - 1:
@@ -1342,15 +1385,19 @@ def update_geo_location_coordinates(geo_location_id):
 
 def geocode_survey_response_locations(response_data_list):
     """
-    Process a list of survey response data and geocode any with zero coordinates
+    Fill zero coordinates in a list of survey response dictionaries from the geocode
+    cache. Addresses that are not cached yet are queued for the background geocode
+    worker (which also writes them back to geo_locations when the response carries a
+    geo_location_id); this function never calls a geocoding service itself.
     
     Args:
         response_data_list (list): List of survey response dictionaries
     
     Returns:
-        list: Updated list with geocoded coordinates where possible
+        list: Updated list with cached coordinates where available
     """
     try:
+        pending = []
         for response_data in response_data_list:
             # Check if coordinates need updating
             lat = response_data.get('latitude', 0)
@@ -1364,7 +1411,6 @@ def geocode_survey_response_locations(response_data_list):
                 lat = lng = 0
             
             if lat == 0 and lng == 0:
-                # Try to geocode using available address information
                 # Handle different field names from different endpoints
                 address_components = {
                     'address_line1': response_data.get('physical_address') or response_data.get('address_line1'),
@@ -1374,14 +1420,27 @@ def geocode_survey_response_locations(response_data_list):
                     'country': response_data.get('country'),
                     'postal_code': response_data.get('postal_code')
                 }
-                
-                new_lat, new_lng = geocode_address(address_components)
-                
-                if new_lat is not None and new_lng is not None:
-                    response_data['latitude'] = new_lat
-                    response_data['longitude'] = new_lng
-                    logger.info(f"Geocoded response {response_data.get('id', 'unknown')} to: {new_lat}, {new_lng}")
-        
+                address = address_from_components(address_components)
+                if address:
+                    pending.append((response_data, address_components, address))
+        
+        if not pending:
+            return response_data_list
+        
+        cached = geocode_cache.get_many((address for _, _, address in pending), 'nominatim')
+        queued = 0
+        for response_data, address_components, address in pending:
+            coordinates = cached.get(normalize_address(address))
+            if coordinates == GEOCODE_NEGATIVE:
+                continue  # provider recently had no result for this address
+            if coordinates:
+                response_data['latitude'], response_data['longitude'] = coordinates
+            geo_location_id = response_data.get('geo_location_id')
+            if not coordinates or geo_location_id:
+                # Misses get geocoded; hits with a geo row get persisted there
+                queued += geocode_worker.enqueue(address_components, geo_location_id)
+        
+        logger.info(f"Geocode cache: {len(cached)} hits for {len(pending)} responses without coordinates, {queued} queued")
         return response_data_list
         
     except Exception as e:
@@ -1409,7 +1468,8 @@ CORS(
         }
     },
     supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization", "x-user-role"]
+    allow_headers=["Content-Type", "Authorization", "x-user-role"],
+    expose_headers=["X-Next-After-Id"]
 )
 # 1) Env-based settings
 env_user     = os.getenv("DB_USER")
@@ -1425,15 +1485,21 @@ if env_user and env_password and env_host and env_name:
         f"mysql+pymysql://{env_user}:{env_password}"
         f"@{env_host}:{env_port}/{env_name}"
     )
-    # 3) Test it
-    try:
-        engine = create_engine(db_url_candidate)
-        conn = engine.connect()
-        conn.close()
+    # 3) Test it. The probe opens a real connection at import time, so deployments whose
+    #    .env is known-good can skip it with DB_STARTUP_PROBE=0 for faster worker boot.
+    if os.getenv("DB_STARTUP_PROBE", "1").lower() in ("0", "false", "no"):
         db_url = db_url_candidate
-        logger.info("✅ Connected using .env settings")
-    except OperationalError as e:
-        logger.warning(f"⚠️  .env DB connection failed: {e}")
+        logger.info("✅ Using .env settings (startup probe disabled)")
+    else:
+        try:
+            engine = create_engine(db_url_candidate, connect_args={"connect_timeout": 5})
+            conn = engine.connect()
+            conn.close()
+            engine.dispose()
+            db_url = db_url_candidate
+            logger.info("✅ Connected using .env settings")
+        except OperationalError as e:
+            logger.warning(f"⚠️  .env DB connection failed: {e}")
 
 # 4) Fallback to local_* variables if env failed
 if not db_url:
@@ -1474,6 +1540,16 @@ app.config['SQLALCHEMY_POOL_RECYCLE'] = 1800     # Recycle connections every 30
 app.config['SQLALCHEMY_POOL_PRE_PING'] = True    # Test connections before use (avoids stale connections)
 db = SQLAlchemy(app)
 
+# Per-request SQL count / latency headers (debug); GET /api/debug/perf when PERF_ENDPOINT=1
+init_request_metrics(app)
+
+# Rendered responses of read-heavy reference endpoints (see response_cache.py); scoped to
+# this database so other deployments on the host never share entries
+response_cache = ResponseCache(
+    make_backend(path=os.path.join(app.instance_path, 'response_cache.sqlite3')),
+    scope=app.config['SQLALCHEMY_DATABASE_URI'],
+)
+
 # Function to create tables if they don't exist
 def create_tables():
     with app.app_context():
@@ -1519,6 +1595,110 @@ class GeoLocation(db.Model):
     def __repr__(self):
         return f'<GeoLocation {self.id}>'
 
+
+class GeocodeCacheEntry(db.Model):
+    """
+    Address -> coordinates cache shared by every geocoding code path
+    (see geocode_pipeline.py). Keyed by the SHA-1 of the normalized address.
+    """
+    __tablename__ = 'geocode_cache'
+
+    address_hash = db.Column(db.String(40), primary_key=True)
+    address = db.Column(db.String(500), nullable=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    provider = db.Column(db.String(20), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GeocodeCacheEntry {self.address}>'
+
+
+def _write_back_geo_coordinates(geo_location_ids, latitude, longitude):
+    """Store geocoded coordinates on geo_locations rows that still have none."""
+    try:
+        updated = GeoLocation.query.filter(
+            GeoLocation.id.in_(geo_location_ids),
+            or_(GeoLocation.latitude == 0, GeoLocation.latitude.is_(None)),
+            or_(GeoLocation.longitude == 0, GeoLocation.longitude.is_(None)),
+        ).update({'latitude': latitude, 'longitude': longitude}, synchronize_session=False)
+        db.session.commit()
+        logger.info(f"Geocode worker updated {updated} geo_locations rows to: {latitude}, {longitude}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error writing geocoded coordinates for {geo_location_ids}: {str(e)}")
+
+
+geocode_cache = GeocodeCache(lambda: db.engine, GeocodeCacheEntry.__table__)
+geocode_worker = GeocodeWorker(app, geocode_cache, geocode_address, _write_back_geo_coordinates, provider='nominatim')
+
+
+class GeocodeBatchJob(db.Model):
+    """A resumable coordinate backfill over geo_locations (see batch_geocoder.py)."""
+    __tablename__ = 'geocode_batch_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.Enum('queued', 'running', 'completed', 'failed'), nullable=False, default='queued')
+    provider = db.Column(db.String(20), nullable=False, default='nominatim')
+    row_limit = db.Column(db.Integer, nullable=True)
+    total = db.Column(db.Integer, nullable=True)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    unique_addresses = db.Column(db.Integer, nullable=False, default=0)
+    last_geo_location_id = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'provider': self.provider,
+            'limit': self.row_limit,
+            'summary': {
+                'total': self.total,
+                'total_processed': self.processed,
+                'updated': self.updated,
+                'failed': self.failed,
+                'unique_addresses': self.unique_addresses,
+            },
+            'last_geo_location_id': self.last_geo_location_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def _geocode_google_components(address_components):
+    result = geocode_address_google(address_from_components(address_components))
+    if result and result.get('success'):
+        return result['latitude'], result['longitude']
+    return None, None
+
+
+_geocode_providers = {
+    # Nominatim's usage policy is 1 request/second; single attempts, retried under the bucket
+    'nominatim': GeocodeProvider('nominatim', _geocode_nominatim_once, rate=1.0, caches_results=True,
+                                 max_attempts=3),
+    'google': GeocodeProvider('google', _geocode_google_components,
+                              rate=float(os.getenv('GOOGLE_GEOCODE_QPS', '10')), caches_results=True),
+}
+if os.getenv('GEOCODE_FAKE_PROVIDER', '0').lower() in ('1', 'true', 'yes'):
+    # Local deterministic provider for exercising the batch pipeline without network access
+    _geocode_providers['fake'] = GeocodeProvider('fake', FakeGeocodeProvider(latency=0.05), rate=50.0)
+
+batch_geocoder = BatchGeocoder(
+    app, db, GeocodeBatchJob, GeoLocation, _geocode_providers, cache=geocode_cache,
+    max_workers=int(os.getenv('GEOCODE_BATCH_WORKERS', '4')),
+)
+
 class Organization(db.Model):
     __tablename__ = 'organizations'
     id = db.Column(db.Integer, primary_key=True)
@@ -1533,6 +1713,9 @@ class Organization(db.Model):
     highest_level_of_education = db.Column(db.String(255), nullable=True)
     details = db.Column(JSON, nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    # Older databases: add with migrate_organizations_updated_at.py
+    updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
     
     # Relationships
     organization_type = db.relationship('OrganizationType', foreign_keys=[type])
@@ -1545,6 +1728,12 @@ class Organization(db.Model):
     def __repr__(self):
         return f'<Organization {self.name}>'
 
+
+# Fuzzy organization-name search (/api/organizations/search); warmed in the background on a
+# worker's first request (see START SCHEDULER AND EMAIL OUTBOX) and kept current on commit
+org_search_index = OrganizationSearchIndex(app, db, Organization)
+org_search_index.watch()
+
 class OrganizationRelationship(db.Model):
     """
     Tracks relationships between organizations (denominations, accreditations, 
@@ -1588,6 +1777,31 @@ class OrganizationRelationship(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+class OrganizationClosure(db.Model):
+    """
+    Transitive closure of the organization hierarchy: one row per (ancestor, descendant)
+    with the shortest depth between them, including depth-0 self rows. Maintained on
+    every flush by org_hierarchy.py; rebuild with rebuild_org_closure.py.
+    """
+    __tablename__ = 'organization_closure'
+
+    ancestor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    descendant_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_organization_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+    def __repr__(self):
+        return f'<OrganizationClosure {self.ancestor_id} -> {self.descendant_id} depth={self.depth}>'
+
+
+org_hierarchy = OrganizationHierarchy(db, OrganizationClosure, Organization, OrganizationRelationship)
+org_hierarchy.watch()
+
+
 class EmailTemplate(db.Model):
     __tablename__ = 'email_templates'
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
@@ -1628,6 +1842,10 @@ class EmailTemplate(db.Model):
             'survey_templates': [],  # No associations needed
             'organization_roles': []  # No associations needed
         }
+
+
+# Compiled template snapshots + (type, org) resolution; invalidated on template writes
+email_template_cache = EmailTemplateCache()
     
 
 
@@ -2250,6 +2468,264 @@ class SurveyResponseV2(db.Model):
         }
 
 
+class ResponseAnswer(db.Model):
+    """
+    Normalized, one-row-per-answer copy of SurveyResponse / SurveyResponseV2 answers.
+    Kept in sync on every answer write (see response_answer_store.py) so analytics
+    can aggregate with indexed SQL instead of walking the answers JSON in Python.
+    """
+    __tablename__ = 'response_answers'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    response_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Enum('v1', 'v2'), nullable=False, default='v1')
+    question_key = db.Column(db.String(255), nullable=False)
+    numeric_value = db.Column(db.Float, nullable=True)
+    text_value = db.Column(db.Text, nullable=True)
+    section = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('version', 'response_id', 'question_key', name='uq_response_answer'),
+        db.Index('idx_response_answers_question', 'version', 'question_key', 'numeric_value'),
+        db.Index('idx_response_answers_section', 'version', 'section'),
+    )
+
+    def __repr__(self):
+        return f'<ResponseAnswer {self.version}:{self.response_id} {self.question_key}>'
+
+
+class QuestionAggregate(db.Model):
+    """
+    Running numeric statistics of completed v1 answers per (question signature,
+    organization type). Maintained incrementally by comparison_aggregates.py and
+    read by the compare-by-template endpoint.
+    """
+    __tablename__ = 'question_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    signature = db.Column(db.String(40), nullable=False)
+    organization_type = db.Column(db.String(50), nullable=False, default='')
+    value_count = db.Column(db.Integer, nullable=False, default=0)
+    value_sum = db.Column(db.Float, nullable=False, default=0)
+    value_sum_squares = db.Column(db.Float, nullable=False, default=0)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    bounds_stale = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('signature', 'organization_type', name='uq_question_aggregate'),
+    )
+
+    def __repr__(self):
+        return f'<QuestionAggregate {self.signature[:8]} ({self.organization_type}) n={self.value_count}>'
+
+
+class QuestionSignatureIndex(db.Model):
+    """
+    Which survey templates contain a question with a given signature (hash of
+    normalized question text + question_type_id). Maintained on template writes.
+    """
+    __tablename__ = 'question_signature_index'
+
+    signature = db.Column(db.String(40), primary_key=True)
+    template_id = db.Column(db.Integer, primary_key=True)
+
+    __table_args__ = (
+        db.Index('idx_question_signature_template', 'template_id'),
+    )
+
+    def __repr__(self):
+        return f'<QuestionSignatureIndex {self.signature[:8]} -> template {self.template_id}>'
+
+
+class KpiOrgRollup(db.Model):
+    """
+    Users and v1/v2 responses per (organization, source, status, has answers), with
+    completion-time sums. Maintained on every flush by kpi_rollups.py and read by the
+    KPI dashboard; rebuild with rebuild_kpi_rollups.py.
+    """
+    __tablename__ = 'kpi_org_rollups'
+
+    organization_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 = no organization
+    source = db.Column(db.Enum('users', 'v1', 'v2'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True, default='')
+    has_answers = db.Column(db.Boolean, primary_key=True, default=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    days_total = db.Column(db.BigInteger, nullable=False, default=0)
+    days_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<KpiOrgRollup org={self.organization_id} {self.source}/{self.status} n={self.item_count}>'
+
+
+kpi_rollups = KpiRollups(db, KpiOrgRollup, User, SurveyResponse, SurveyResponseV2)
+kpi_rollups.watch()
+
+
+class TextAnalysisJob(db.Model):
+    """A background run of the open-ended answer analysis (see text_analysis_jobs.py)."""
+    __tablename__ = 'text_analysis_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.Enum('queued', 'running', 'completed', 'failed'), nullable=False, default='queued')
+    num_clusters = db.Column(db.Integer, nullable=False, default=10)
+    answer_count = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # 1 while queued/running, NULL afterwards; unique, so only one job can be active
+    active_key = db.Column(db.SmallInteger, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_text_analysis_jobs_status', 'status', 'created_at'),
+        db.UniqueConstraint('active_key', name='uq_text_analysis_jobs_active'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'num_clusters': self.num_clusters,
+            'answer_count': self.answer_count,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<TextAnalysisJob {self.id} {self.status}>'
+
+
+class TextAnswerAnalytics(db.Model):
+    """Sentiment/topic/cluster labels for one open-ended answer, from one analysis job."""
+    __tablename__ = 'text_answer_analytics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), nullable=True)
+    response_id = db.Column(db.Integer)
+    question_id = db.Column(db.Integer)
+    question_type = db.Column(db.String(50))
+    answer = db.Column(db.Text)
+    sentiment = db.Column(db.String(20))
+    topic = db.Column(db.Integer)
+    cluster = db.Column(db.Integer)
+    extra = db.Column(JSON)
+
+    __table_args__ = (
+        db.Index('idx_text_answer_analytics_job_response', 'job_id', 'response_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'response_id': self.response_id,
+            'question_id': self.question_id,
+            'question_type': self.question_type,
+            'answer': self.answer,
+            'sentiment': self.sentiment,
+            'topic': self.topic,
+            'cluster': self.cluster,
+        }
+
+    def __repr__(self):
+        return f'<TextAnswerAnalytics response {self.response_id} question {self.question_id}>'
+
+
+class EmailOutboxMessage(db.Model):
+    """One queued email for one recipient (see email_outbox.py)."""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(36), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    recipient = db.Column(db.String(255), nullable=False)
+    payload = db.Column(JSON, nullable=True)
+    status = db.Column(db.Enum('pending', 'sending', 'sent', 'failed'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    method = db.Column(db.String(20), nullable=True)
+    message_id = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_email_outbox_due', 'status', 'next_attempt_at'),
+        db.Index('idx_email_outbox_batch', 'batch_id'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutboxMessage {self.id} {self.kind} -> {self.recipient} {self.status}>'
+
+
+email_outbox = EmailOutbox(
+    app, db, EmailOutboxMessage,
+    senders={
+        'reminder': send_reminder_email,
+        'welcome': send_welcome_email,
+        'survey_assignment': send_survey_assignment_email,
+    },
+    max_workers=int(os.getenv('EMAIL_WORKERS', '8')),
+)
+
+
+class SchedulerJob(db.Model):
+    """Lease row for one periodic job; only the worker holding it runs the job (see scheduler_service.py)."""
+    __tablename__ = 'scheduler_jobs'
+
+    name = db.Column(db.String(100), primary_key=True)
+    next_run_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(255), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_run_id = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f'<SchedulerJob {self.name} next={self.next_run_at} locked_by={self.locked_by}>'
+
+
+class SchedulerRun(db.Model):
+    """One execution of a scheduled job, with its duration and outcome."""
+    __tablename__ = 'scheduler_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    owner = db.Column(db.String(255), nullable=False)
+    trigger = db.Column(db.Enum('schedule', 'manual'), nullable=False, default='schedule')
+    status = db.Column(db.Enum('running', 'succeeded', 'failed'), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+    result = db.Column(JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_scheduler_runs_job_started', 'job_name', 'started_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'owner': self.owner,
+            'trigger': self.trigger,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+# Jobs are registered by the route modules (e.g. due reminders); started after registration below
+scheduler = SchedulerService(app, db, SchedulerJob, SchedulerRun)
+
+
 # Routes
 
 @app.route('/')
@@ -2902,6 +3378,7 @@ def get_organization_by_id(organization_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/titles', methods=['GET'])
+@response_cache.cached('titles')
 def get_titles():
     """Retrieve all available titles"""
     try:
@@ -3076,6 +3553,7 @@ def get_template_versions():
     return jsonify(result), 200
 
 @app.route('/api/template-versions', methods=['POST'])
+@response_cache.invalidates('templates')
 def add_template_version():
     data = request.get_json() or {}
     if 'name' not in data:
@@ -3104,6 +3582,7 @@ def add_template_version():
     }), 201
 
 @app.route('/api/template-versions/<int:version_id>', methods=['DELETE'])
+@response_cache.invalidates('templates')
 def delete_template_version(version_id):
     """Delete a template version and all its associated templates"""
     try:
@@ -3143,6 +3622,9 @@ def delete_template_version(version_id):
             
             # 2. Delete survey_responses that reference these templates
             try:
+                _discard_response_derived_tables(
+                    SurveyResponse.query.filter(SurveyResponse.template_id.in_(template_ids)).all()
+                )
                 if len(template_ids) == 1:
                     responses_result = db.session.execute(
                         text("DELETE FROM survey_responses WHERE template_id = :template_id"),
@@ -3159,6 +3641,7 @@ def delete_template_version(version_id):
                 logger.warning(f"Error deleting survey_responses records: {str(e)}")
             
             # 3. Delete the survey templates
+            drop_template_signatures(db.session, QuestionSignatureIndex, template_ids)
             for template in templates:
                 db.session.delete(template)
                 deleted_counts['templates'] += 1
@@ -3182,6 +3665,7 @@ def delete_template_version(version_id):
         return jsonify({'error': f'Failed to delete template version: {str(e)}'}), 500
 
 @app.route('/api/templates', methods=['GET'])
+@response_cache.cached('templates')
 def get_templates():
     organization_id = request.args.get('organization_id', type=int)
     query = SurveyTemplate.query
@@ -3338,6 +3822,7 @@ def get_available_survey_templates():
         return jsonify({'error': f'Failed to fetch survey templates: {str(e)}'}), 500
 
 @app.route('/api/templates', methods=['POST'])
+@response_cache.invalidates('templates')
 def add_template():
     data = request.get_json() or {}
     required_keys = ['version_id', 'questions']
@@ -3382,6 +3867,7 @@ def add_template():
         title_id=title_id,
     )
     db.session.add(template)
+    _sync_template_derived_tables(template)
     db.session.commit()
     return jsonify({
         'id': template.id,
@@ -3423,6 +3909,7 @@ def get_template(template_id):
 
 @app.route('/api/templates/<int:template_id>', methods=['PUT'])
 @app.route('/api/templates/<int:template_id>/', methods=['PUT'])
+@response_cache.invalidates('templates')
 def update_template(template_id):
     template = SurveyTemplate.query.get_or_404(template_id)
     data = request.get_json() or {}
@@ -3436,7 +3923,9 @@ def update_template(template_id):
         updated = True
     
     # Allow updating questions
+    old_questions = None
     if 'questions' in data:
+        old_questions = template.questions
         logger.info(f"Updating questions for template {template_id}")
         logger.debug(f"New questions data: {data['questions']}")
         
@@ -3466,6 +3955,8 @@ def update_template(template_id):
         updated = True
     
     if updated:
+        if 'questions' in data:
+            _sync_template_derived_tables(template, old_questions)
         db.session.commit()
         logger.info(f"Successfully updated template {template_id}")
         return jsonify({'updated': True}), 200
@@ -3473,6 +3964,7 @@ def update_template(template_id):
     return jsonify({'error': 'No valid fields to update'}), 400
 
 @app.route('/api/templates/<int:template_id>', methods=['DELETE'])
+@response_cache.invalidates('templates')
 def delete_template(template_id):
     #Delete a template and all its associated records
     try:
@@ -3500,6 +3992,7 @@ def delete_template(template_id):
         
         # 2. Delete survey responses
         survey_responses = SurveyResponse.query.filter_by(template_id=template_id).all()
+        _discard_response_derived_tables(survey_responses)
         for response in survey_responses:
             db.session.delete(response)
         deleted_counts['survey_responses'] = len(survey_responses)
@@ -3527,6 +4020,7 @@ def delete_template(template_id):
         deleted_counts['survey_versions'] = len(survey_versions)
         
         # 5. Finally delete the template itself
+        drop_template_signatures(db.session, QuestionSignatureIndex, [template_id])
         db.session.delete(template)
         db.session.commit()
         
@@ -3543,6 +4037,7 @@ def delete_template(template_id):
         return jsonify({'error': f'Failed to delete template: {str(e)}'}), 500
 
 @app.route('/api/templates/<int:template_id>/questions/<int:question_id>', methods=['DELETE'])
+@response_cache.invalidates('templates')
 def delete_template_question(template_id, question_id):
     template = SurveyTemplate.query.get_or_404(template_id)
     questions = template.questions or []
@@ -3552,6 +4047,7 @@ def delete_template_question(template_id, question_id):
     return jsonify({'deleted': True}), 200
 
 @app.route('/api/templates/<int:template_id>/copy', methods=['POST'])
+@response_cache.invalidates('templates')
 def copy_template_to_organization(template_id):
     """Copy a template to another organization's template version"""
     try:
@@ -3600,8 +4096,10 @@ def copy_template_to_organization(template_id):
         
         if existing_template:
             # Update existing template with new questions and sections
+            old_questions = existing_template.questions
             existing_template.questions = source_template.questions  # Deep copy of questions
             existing_template.sections = source_template.sections    # Deep copy of sections
+            _sync_template_derived_tables(existing_template, old_questions)
             copied_template = existing_template
             action = 'updated'
             logger.info(f"Updated existing template {existing_template.id} in version {target_version.id}")
@@ -3629,6 +4127,7 @@ def copy_template_to_organization(template_id):
             )
             
             db.session.add(copied_template)
+            _sync_template_derived_tables(copied_template)
             action = 'created'
             logger.info(f"Created new template {new_survey_code} in version {target_version.id}")
         
@@ -3655,6 +4154,89 @@ def copy_template_to_organization(template_id):
         logger.error(f"Error copying template {template_id}: {str(e)}")
         return jsonify({'error': f'Failed to copy template: {str(e)}'}), 500
 
+# Derived answer tables (response_answers, question_aggregates)
+def _organization_type_names(user_ids):
+    """Map user_id -> organization type name ('' when the user has no typed organization)."""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if not user_ids:
+        return {}
+    rows = db.session.query(User.id, OrganizationType.type)\
+        .outerjoin(Organization, User.organization_id == Organization.id)\
+        .outerjoin(OrganizationType, Organization.type == OrganizationType.id)\
+        .filter(User.id.in_(user_ids))\
+        .all()
+    return {uid: (org_type or '') for uid, org_type in rows}
+
+
+def _response_snapshot(response):
+    """Capture what a SurveyResponse currently contributes to the derived answer tables."""
+    return {
+        'answers': response.answers,
+        'questions': response.template.questions if response.template else None,
+        'completed': response.status == 'completed',
+    }
+
+
+def _sync_response_derived_tables(response, before=None):
+    """Write-through an answers/status change of a SurveyResponse. Does not commit."""
+    after = _response_snapshot(response)
+    sync_response_answers(
+        db.session, ResponseAnswer, response.id, VERSION_V1,
+        after['answers'], after['questions'],
+    )
+    if (before and before['completed']) or after['completed']:
+        org_type = _organization_type_names([response.user_id]).get(response.user_id, '')
+        record_response_change(db.session, QuestionAggregate, org_type, before, after)
+
+
+def _discard_response_derived_tables(responses):
+    """Remove derived rows of SurveyResponses that are about to be deleted. Does not commit."""
+    responses = list(responses)
+    if not responses:
+        return
+    delete_response_answers(db.session, ResponseAnswer, [r.id for r in responses], VERSION_V1)
+    completed = [r for r in responses if r.status == 'completed']
+    org_types = _organization_type_names([r.user_id for r in completed])
+    for response in completed:
+        record_response_change(
+            db.session, QuestionAggregate, org_types.get(response.user_id, ''),
+            _response_snapshot(response), None,
+        )
+
+
+def _sync_template_derived_tables(template, old_questions=None):
+    """Re-index a template's question signatures after its questions were written.
+
+    When an existing template's questions change, responses already filed against it
+    are re-keyed in response_answers / question_aggregates as well. Does not commit.
+    """
+    if template.id is None:
+        db.session.flush()
+    index_template_signatures(db.session, QuestionSignatureIndex, template.id, template.questions)
+    if old_questions is None:
+        return
+
+    signatures_changed = signature_lookup(old_questions) != signature_lookup(template.questions)
+    sections_changed = build_section_lookup(old_questions) != build_section_lookup(template.questions)
+    if not signatures_changed and not sections_changed:
+        return
+
+    responses = SurveyResponse.query.filter_by(template_id=template.id).all()
+    org_types = _organization_type_names([r.user_id for r in responses if r.status == 'completed'])
+    for response in responses:
+        if sections_changed:
+            sync_response_answers(
+                db.session, ResponseAnswer, response.id, VERSION_V1,
+                response.answers, template.questions,
+            )
+        if signatures_changed and response.status == 'completed':
+            record_response_change(
+                db.session, QuestionAggregate, org_types.get(response.user_id, ''),
+                {'answers': response.answers, 'questions': old_questions, 'completed': True},
+                {'answers': response.answers, 'questions': template.questions, 'completed': True},
+            )
+
+
 # Survey Responses API Endpoints
 @app.route('/api/responses', methods=['GET'])
 def get_responses():
@@ -3742,6 +4324,7 @@ def add_response(template_id):
 
     if existing_response:
         # Update existing response (Save Draft behavior)
+        before = _response_snapshot(existing_response)
         existing_response.answers = data['answers']
         if 'status' in data and data['status']:
             existing_response.status = data['status']
@@ -3749,6 +4332,7 @@ def add_response(template_id):
             existing_response.start_date = start_date
         if end_date is not None:
             existing_response.end_date = end_date
+        _sync_response_derived_tables(existing_response, before)
         db.session.commit()
         return jsonify({
             'id': existing_response.id,
@@ -3767,6 +4351,8 @@ def add_response(template_id):
         end_date=end_date
     )
     db.session.add(response)
+    db.session.flush()
+    _sync_response_derived_tables(response)
     db.session.commit()
     return jsonify({
         'id': response.id,
@@ -3797,6 +4383,7 @@ def get_response(response_id):
 def update_response(response_id):
     response = SurveyResponse.query.get_or_404(response_id)
     data = request.get_json() or {}
+    before = _response_snapshot(response)
     
     for field in ['answers', 'status', 'start_date', 'end_date']:
         if field in data:
@@ -3812,6 +4399,8 @@ def update_response(response_id):
             else:
                 setattr(response, field, data[field])
     
+    if 'answers' in data or 'status' in data:
+        _sync_response_derived_tables(response, before)
     db.session.commit()
     return jsonify({'updated': True}), 200
 
@@ -3953,6 +4542,7 @@ def get_response(response_id):
 """
 # Organization Types API Endpoints
 @app.route('/api/organization-types', methods=['GET'])
+@response_cache.cached('organization_types')
 def get_organization_types():
     org_types = OrganizationType.query.all()
     return jsonify({
@@ -3963,6 +4553,7 @@ def get_organization_types():
     }), 200
 
 @app.route('/api/organization-types', methods=['POST'])
+@response_cache.invalidates('organization_types')
 def add_organization_type():
     try:
         data = request.get_json()
@@ -4003,6 +4594,7 @@ def add_organization_type():
         return jsonify({'error': f'Failed to add organization type: {str(e)}'}), 500
 
 @app.route('/api/organization-types/initialize', methods=['POST'])
+@response_cache.invalidates('organization_types')
 def initialize_organization_types():
     """Initialize organization types with the required types"""
     try:
@@ -4650,11 +5242,13 @@ def delete_organization(org_id):
             for template in templates:
                 # Delete survey responses for this template
                 survey_responses = SurveyResponse.query.filter_by(template_id=template.id).all()
+                _discard_response_derived_tables(survey_responses)
                 for response in survey_responses:
                     db.session.delete(response)
                 deleted_counts['survey_responses'] += len(survey_responses)
                 
                 # Delete the template
+                drop_template_signatures(db.session, QuestionSignatureIndex, [template.id])
                 db.session.delete(template)
                 deleted_counts['survey_templates'] += 1
             
@@ -5674,6 +6268,7 @@ def update_user_organizational_titles(user_id):
 
 # Redefined
 @app.route('/api/template-versions/<int:version_id>', methods=['PUT'])
+@response_cache.invalidates('templates')
 def update_template_version(version_id):
     version = SurveyTemplateVersion.query.get_or_404(version_id)
     data = request.get_json() or {}
@@ -5710,6 +6305,7 @@ def update_template_version(version_id):
     return jsonify({'error': 'No valid fields to update'}), 400
 
 @app.route('/api/template-versions/<int:version_id>/copy', methods=['POST'])
+@response_cache.invalidates('templates')
 def copy_template_version_to_organization(version_id):
     """Copy a template version and all its templates to another organization"""
     try:
@@ -5797,8 +6393,10 @@ def copy_template_version_to_organization(version_id):
             
             if existing_template:
                 # Update existing template
+                old_questions = existing_template.questions
                 existing_template.questions = source_template.questions
                 existing_template.sections = source_template.sections
+                _sync_template_derived_tables(existing_template, old_questions)
                 template_action = 'updated'
                 templates_updated += 1
                 copied_templates.append({
@@ -5828,6 +6426,7 @@ def copy_template_version_to_organization(version_id):
                 )
                 
                 db.session.add(copied_template)
+                _sync_template_derived_tables(copied_template)
                 template_action = 'created'
                 templates_created += 1
                 copied_templates.append({
@@ -5888,6 +6487,7 @@ def get_template_sections(template_id):
     return jsonify(sections_list), 200
 
 @app.route('/api/templates/<int:template_id>/sections', methods=['PUT'])
+@response_cache.invalidates('templates')
 def update_template_sections(template_id):
     #Update section order for a template
     template = SurveyTemplate.query.get_or_404(template_id)
@@ -5923,12 +6523,62 @@ def update_template_sections(template_id):
 # User API Endpoints 
 @app.route('/api/users', methods=['GET'])
 def get_all_users():
-    users = User.query.all()
+    """
+    List users. Optional query params:
+      - after_id / limit: keyset pagination (ordered by id); when more users exist the
+        X-Next-After-Id response header carries the cursor for the next page
+      - fields: comma-separated top-level keys to return (id is always included)
+    The body is the same JSON array as before; related rows are loaded in a fixed
+    number of batched queries instead of several queries per user.
+    """
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    fields = {f.strip() for f in request.args.get('fields', '').split(',') if f.strip()}
+    if limit is not None and not 1 <= limit <= 1000:
+        return jsonify({'error': 'limit must be between 1 and 1000'}), 400
+
+    query = User.query.options(
+        selectinload(User.roles),
+        joinedload(User.organization).joinedload(Organization.organization_type),
+        joinedload(User.geo_location),
+    ).order_by(User.id)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    if limit is not None:
+        users = query.limit(limit + 1).all()
+        has_more = len(users) > limit
+        users = users[:limit]
+    else:
+        users = query.all()
+        has_more = False
+
+    user_ids = [user.id for user in users]
+
+    # Organization titles for the whole page, in one query
+    titles_by_user = {}
+    if user_ids:
+        for ut in UserOrganizationTitle.query.options(joinedload(UserOrganizationTitle.title)) \
+                .filter(UserOrganizationTitle.user_id.in_(user_ids)) \
+                .order_by(UserOrganizationTitle.id).all():
+            titles_by_user.setdefault(ut.user_id, []).append(ut)
+
+    # First survey response (template_id) per user, in one query
+    template_by_user = {}
+    if user_ids:
+        first_response = db.session.query(
+            SurveyResponse.user_id,
+            db.func.min(SurveyResponse.id).label('response_id'),
+        ).filter(SurveyResponse.user_id.in_(user_ids)).group_by(SurveyResponse.user_id).subquery()
+        for user_id, template_id in db.session.query(first_response.c.user_id, SurveyResponse.template_id) \
+                .join(SurveyResponse, SurveyResponse.id == first_response.c.response_id).all():
+            template_by_user[user_id] = template_id
+
     result = []
     for user in users:
         # Get roles from user_roles table
         user_role_names = [r.name for r in (user.roles or [])]
         primary_role = user_role_names[0] if user_role_names else 'user'
+        user_titles = titles_by_user.get(user.id, [])
         
         user_data = {
             'id': user.id,
@@ -5945,7 +6595,7 @@ def get_all_users():
         # Add display role and organizational title info
         if primary_role == 'other':
             # Get organizational title for display
-            org_title = UserOrganizationTitle.query.filter_by(user_id=user.id).first()
+            org_title = user_titles[0] if user_titles else None
             if org_title and org_title.title:
                 user_data['display_role'] = org_title.title.name
                 user_data['ui_role'] = org_title.title.name  # For frontend compatibility
@@ -5957,9 +6607,8 @@ def get_all_users():
             user_data['ui_role'] = primary_role
         
         # Include template_id from survey response if available
-        survey_response = SurveyResponse.query.filter_by(user_id=user.id).first()
-        user_data['template_id'] = survey_response.template_id if survey_response else None
-        user_data['has_survey_assigned'] = bool(survey_response)
+        user_data['template_id'] = template_by_user.get(user.id)
+        user_data['has_survey_assigned'] = user.id in template_by_user
         
         # Include organization info if available
         if user.organization:
@@ -5994,19 +6643,20 @@ def get_all_users():
         user_data['roles'] = user_role_names
         
         # Add titles list for multi-select (scoped to current organization)
-        user_data['titles'] = []
-        if user.organization_id:
-            try:
-                user_org_titles = UserOrganizationTitle.query.filter_by(user_id=user.id, organization_id=user.organization_id).all()
-                for ut in user_org_titles:
-                    if ut.title:
-                        user_data['titles'].append({'id': ut.title.id, 'name': ut.title.name})
-            except Exception as e:
-                logger.error(f"Error fetching titles for user {user.id}: {str(e)}")
+        user_data['titles'] = [
+            {'id': ut.title.id, 'name': ut.title.name}
+            for ut in user_titles
+            if ut.title and user.organization_id and ut.organization_id == user.organization_id
+        ]
         
+        if fields:
+            user_data = {key: value for key, value in user_data.items() if key == 'id' or key in fields}
         result.append(user_data)
 
-    return jsonify(result)
+    response = jsonify(result)
+    if has_more:
+        response.headers['X-Next-After-Id'] = str(users[-1].id)
+    return response
 
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
@@ -6416,6 +7066,9 @@ def update_user(user_id):
                 if survey_response:
                     # Update the chosen survey response with new template
                     old_template_id = survey_response.template_id
+                    if old_template_id != template_id:
+                        # Answers are reset below; drop them from the derived tables first
+                        _discard_response_derived_tables([survey_response])
                     survey_response.template_id = template_id
                     
                     # Reset answers and status if template changed
@@ -6733,6 +7386,7 @@ def delete_user(user_id):
         
         # 2. Delete survey responses
         survey_responses = SurveyResponse.query.filter_by(user_id=user_id).all()
+        _discard_response_derived_tables(survey_responses)
         for response in survey_responses:
             db.session.delete(response)
         deleted_counts['survey_responses'] = len(survey_responses)
@@ -6812,6 +7466,7 @@ def upload_users():
     
     # Process the file and create users
     created_users = []
+    welcome_emails = []
     errors = []
     
     try:
@@ -6855,18 +7510,17 @@ def upload_users():
                 db.session.add(new_user)
                 db.session.flush()  # Get the user ID
                 
-                # Send welcome email
-                try:
-                    email_result = send_welcome_email(
-                        to_email=new_user.email,
-                        username=new_user.username,
-                        password=user_password,
-                        firstname=new_user.firstname,
-                        survey_code=survey_code
-                    )
-                    logger.info(f"Welcome email sent for uploaded user {new_user.username}: {email_result}")
-                except Exception as email_error:
-                    logger.error(f"Failed to send welcome email for user {new_user.username}: {str(email_error)}")
+                # Welcome email is queued in the outbox and sent after commit
+                welcome_emails.append({
+                    'recipient': new_user.email,
+                    'payload': {
+                        'to_email': new_user.email,
+                        'username': new_user.username,
+                        'password': user_password,
+                        'firstname': new_user.firstname,
+                        'survey_code': survey_code
+                    }
+                })
                 
                 created_users.append({
                     'id': new_user.id,
@@ -6879,8 +7533,11 @@ def upload_users():
                 errors.append(f"Row {index + 1}: {str(user_error)}")
                 continue
         
-        # Commit all changes
+        # Commit users and their queued welcome emails together
+        batch_id = email_outbox.enqueue('welcome', welcome_emails) if welcome_emails else None
         db.session.commit()
+        if batch_id:
+            email_outbox.wake()
         
         return jsonify({
             'message': f'Successfully created {len(created_users)} users',
@@ -6888,8 +7545,10 @@ def upload_users():
             'errors': errors,
             'total_processed': len(df),
             'successful': len(created_users),
-            'failed': len(errors)
-        })
+            'failed': len(errors),
+            'email_batch_id': batch_id,
+            'email_status_url': f'/api/email-batches/{batch_id}' if batch_id else None
+        }), 202 if batch_id else 200
         
     except Exception as e:
         db.session.rollback()
@@ -6966,6 +7625,7 @@ def get_users_with_role_user():
 
 # Role API Endpoints
 @app.route('/api/roles', methods=['GET'])
+@response_cache.cached('roles')
 def get_roles():
     """Get all roles"""
     try:
@@ -6981,6 +7641,7 @@ def get_roles():
         return jsonify({'error': 'Failed to fetch roles'}), 500
 
 @app.route('/api/roles', methods=['POST'])
+@response_cache.invalidates('roles')
 def add_role():
     """Add a new role"""
     try:
@@ -7029,24 +7690,28 @@ def add_role():
 
 # Denomination API Endpoints (Stub)
 @app.route('/api/denominations', methods=['GET'])
+@response_cache.cached('denominations')
 def get_denominations():
     # Return empty list since the Denomination model is not yet implemented
     return jsonify([])
 
 # Accreditation Bodies API Endpoints (Stub)
 @app.route('/api/accreditation-bodies', methods=['GET'])
+@response_cache.cached('accreditation_bodies')
 def get_accreditation_bodies():
     # Return empty list since the AccreditationBody model is not yet implemented
     return jsonify([])
 
 # Umbrella Associations API Endpoints (Stub)
 @app.route('/api/umbrella-associations', methods=['GET'])
+@response_cache.cached('umbrella_associations')
 def get_umbrella_associations():
     # Return empty list since the UmbrellaAssociation model is not yet implemented
     return jsonify([])
 
 # Question Types API Endpoints
 @app.route('/api/question-types', methods=['GET'])
+@response_cache.cached('question_types')
 def get_question_types():
     """Get all question types, optionally filtered by category"""
     category = request.args.get('category')
@@ -7067,6 +7732,7 @@ def get_question_types():
     } for qt in question_types]), 200
 
 @app.route('/api/question-types/<int:type_id>', methods=['GET'])
+@response_cache.cached('question_types')
 def get_question_type(type_id):
     """Get a specific question type by ID"""
     question_type = QuestionType.query.get_or_404(type_id)
@@ -7081,12 +7747,14 @@ def get_question_type(type_id):
     }), 200
 
 @app.route('/api/question-types/categories', methods=['GET'])
+@response_cache.cached('question_types')
 def get_question_type_categories():
     """Get all unique question type categories"""
     categories = db.session.query(QuestionType.category).filter_by(is_active=True).distinct().all()
     return jsonify([cat[0] for cat in categories]), 200
 
 @app.route('/api/question-types/numeric', methods=['GET'])
+@response_cache.cached('question_types')
 def get_numeric_question_types():
     """Get all question types that are always numeric"""
     # Based on QUESTION_TYPE_REFERENCE.md
@@ -7108,6 +7776,7 @@ def get_numeric_question_types():
     } for qt in question_types]), 200
 
 @app.route('/api/question-types/non-numeric', methods=['GET'])
+@response_cache.cached('question_types')
 def get_non_numeric_question_types():
     """Get all question types that are always non-numeric"""
     # Based on QUESTION_TYPE_REFERENCE.md
@@ -7129,6 +7798,7 @@ def get_non_numeric_question_types():
     } for qt in question_types]), 200
 
 @app.route('/api/question-types/conditional', methods=['GET'])
+@response_cache.cached('question_types')
 def get_conditional_question_types():
     """Get all question types that may be numeric or non-numeric depending on content"""
     # Based on QUESTION_TYPE_REFERENCE.md
@@ -7166,6 +7836,7 @@ def classify_question_endpoint():
     return jsonify(classification), 200
 
 @app.route('/api/question-types/initialize', methods=['POST'])
+@response_cache.invalidates('question_types')
 def initialize_question_types():
     """Initialize the database with the nine core question types only"""
     try:
@@ -7693,6 +8364,7 @@ Support: info@saurara.org"""
             templates_created.append('Default Invitation Email')
         
         db.session.commit()
+        email_template_cache.invalidate()
         
         return jsonify({
             'success': True,
@@ -8297,7 +8969,7 @@ def test_email_config():
                             'sent_last_24_hours': quota_response['SentLast24Hours']
                         }
                     }
-                except ClientError as e:
+                except _ses_client_error() as e:
                     results['ses_api'] = {
                         'available': False,
                         'message': f'SES API credentials invalid: {e.response["Error"]["Message"]}'
@@ -8517,13 +9189,10 @@ def send_password_reset_email_smtp(to_email, username, reset_token, firstname=No
     try:
         from email.mime.text import MIMEText
         from email.mime.multipart import MIMEMultipart
-        import smtplib
         
         # Get SMTP credentials from environment
         smtp_username = os.getenv('SES_SMTP_USERNAME')
         smtp_password = os.getenv('SES_SMTP_PASSWORD')
-        smtp_host = os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com')
-        smtp_port = int(os.getenv('SES_SMTP_PORT', '587'))
         source_email = os.getenv('SES_VERIFIED_EMAIL', 'noreply@saurara.org')
         
         if not smtp_username or not smtp_password:
@@ -8638,10 +9307,7 @@ www.saurara.org | info@saurara.org"""
         msg.attach(html_part)
         
         # Send the email
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(source_email, to_email, msg.as_string())
+        get_smtp_pool().send(source_email, to_email, msg.as_string())
         
         logger.info(f"Password reset email sent successfully via SMTP to {to_email}")
         return {
@@ -8896,10 +9562,10 @@ def send_reminder_email_endpoint():
 
 @app.route('/api/send-bulk-reminder-emails', methods=['POST'])
 def send_bulk_reminder_emails():
-    """Send reminder emails to multiple users at once"""
+    """Queue reminder emails for multiple users; returns 202 with the outbox batch ID"""
     try:
         data = request.get_json()
-        logger.info(f"Sending bulk reminder emails to {len(data.get('users', []))} users")
+        logger.info(f"Queueing bulk reminder emails to {len(data.get('users', []))} users")
         
         # Validate required fields
         if 'users' not in data or not isinstance(data['users'], list):
@@ -8915,77 +9581,86 @@ def send_bulk_reminder_emails():
             'results': []
         }
         
-        # Send reminder emails to each user
+        # Validate up front; only complete entries are queued
+        required_user_fields = ['to_email', 'username', 'survey_code']
+        valid_users = []
         for user_data in data['users']:
-            try:
-                # Validate user data
-                required_user_fields = ['to_email', 'username', 'survey_code']
-                for field in required_user_fields:
-                    if field not in user_data or not user_data[field]:
-                        results['results'].append({
-                            'user': user_data.get('username', 'Unknown'),
-                            'email': user_data.get('to_email', 'Unknown'),
-                            'success': False,
-                            'error': f'{field} is required'
-                        })
-                        results['failed_sends'] += 1
-                        continue
-                
-                # Send reminder email
-                result = send_reminder_email(
-                    to_email=user_data['to_email'],
-                    username=user_data['username'],
-                    survey_code=user_data['survey_code'],
-                    firstname=user_data.get('firstname'),
-                    organization_name=user_data.get('organization_name'),
-                    days_remaining=user_data.get('days_remaining'),
-                    organization_id=user_data.get('organization_id')
-                )
-                
-                if result['success']:
-                    results['successful_sends'] += 1
-                    results['results'].append({
-                        'user': user_data['username'],
-                        'email': user_data['to_email'],
-                        'success': True,
-                        'method': result.get('method'),
-                        'message_id': result.get('message_id')
-                    })
-                else:
-                    results['failed_sends'] += 1
-                    results['results'].append({
-                        'user': user_data['username'],
-                        'email': user_data['to_email'],
-                        'success': False,
-                        'error': result['error']
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Error sending reminder to {user_data.get('username', 'Unknown')}: {str(e)}")
-                results['failed_sends'] += 1
+            missing = next((field for field in required_user_fields if not user_data.get(field)), None)
+            if missing:
                 results['results'].append({
                     'user': user_data.get('username', 'Unknown'),
                     'email': user_data.get('to_email', 'Unknown'),
                     'success': False,
-                    'error': str(e)
+                    'error': f'{missing} is required'
                 })
+                results['failed_sends'] += 1
+            else:
+                valid_users.append(user_data)
+        
+        batch_id = None
+        if valid_users:
+            batch_id = email_outbox.enqueue('reminder', [{
+                'recipient': user_data['to_email'],
+                'payload': {
+                    'to_email': user_data['to_email'],
+                    'username': user_data['username'],
+                    'survey_code': user_data['survey_code'],
+                    'firstname': user_data.get('firstname'),
+                    'organization_name': user_data.get('organization_name'),
+                    'days_remaining': user_data.get('days_remaining'),
+                    'organization_id': user_data.get('organization_id')
+                }
+            } for user_data in valid_users])
+            db.session.commit()
+            email_outbox.wake()
         
-        # Calculate success rate
-        success_rate = (results['successful_sends'] / results['total_users'] * 100) if results['total_users'] > 0 else 0
-        
-        logger.info(f"Bulk reminder email results: {results['successful_sends']}/{results['total_users']} successful")
+        results['queued'] = len(valid_users)
+        logger.info(f"Queued {len(valid_users)}/{results['total_users']} bulk reminder emails (batch {batch_id})")
         
         return jsonify({
-            'message': f'Bulk reminder emails processed: {results["successful_sends"]} successful, {results["failed_sends"]} failed',
-            'success_rate': round(success_rate, 1),
+            'message': f'Bulk reminder emails queued: {len(valid_users)} queued, {results["failed_sends"]} rejected',
+            'batch_id': batch_id,
+            'status_url': f'/api/email-batches/{batch_id}' if batch_id else None,
             'results': results
-        }), 200
+        }), 202
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error in bulk reminder email endpoint: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Failed to send bulk reminder emails: {str(e)}'}), 500
 
+@app.route('/api/email-batches/<batch_id>', methods=['GET'])
+def get_email_batch_status(batch_id):
+    """Per-recipient delivery progress of an email batch queued by a bulk endpoint"""
+    try:
+        status = email_outbox.batch_status(batch_id)
+        if status is None:
+            return jsonify({'error': 'Email batch not found'}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        logger.error(f"Error fetching email batch {batch_id}: {str(e)}")
+        return jsonify({'error': f'Failed to fetch email batch: {str(e)}'}), 500
+
+@app.route('/api/scheduler/jobs', methods=['GET'])
+def get_scheduler_jobs():
+    """Registered periodic jobs with their lease state, next run and duration stats"""
+    try:
+        return jsonify({'owner': scheduler.owner, 'jobs': scheduler.status()}), 200
+    except Exception as e:
+        logger.error(f"Error fetching scheduler jobs: {str(e)}")
+        return jsonify({'error': f'Failed to fetch scheduler jobs: {str(e)}'}), 500
+
+@app.route('/api/scheduler/runs', methods=['GET'])
+def get_scheduler_runs():
+    """Recent scheduled job runs, newest first (?job=<name>&limit=<n>)"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int) or 50, 500)
+        return jsonify(scheduler.history(request.args.get('job'), limit)), 200
+    except Exception as e:
+        logger.error(f"Error fetching scheduler runs: {str(e)}")
+        return jsonify({'error': f'Failed to fetch scheduler runs: {str(e)}'}), 500
+
 @app.route('/api/users/pending-surveys', methods=['GET'])
 def get_users_with_pending_surveys():
     """Get all users who have not completed their surveys yet (for reminder emails)"""
@@ -9489,123 +10164,20 @@ def initialize_survey_data():
 
 # Add Report Builder endpoints before the main execution block
 
+# Compiles report configurations into grouped SQL (see report_queries.py)
+report_queries = ReportQueryCompiler(db, SurveyResponse, User, Organization, GeoLocation, SurveyTemplate)
+
 @app.route('/api/reports/data', methods=['POST'])
 def generate_report_data():
     """Generate report data based on configuration"""
     try:
         config = request.get_json() or {}
-        data_scope = config.get('dataScope', {})
-        metrics = config.get('metrics', [])
-        dimensions = config.get('dimensions', [])
-        chart_config = config.get('chartConfig', {})
-        
-        # Build base query
-        query = db.session.query(SurveyResponse).join(User).join(Organization, isouter=True).join(GeoLocation, isouter=True)
-        
-        # Apply data scope filters
-        if data_scope.get('surveys'):
-            query = query.filter(SurveyResponse.template_id.in_(data_scope['surveys']))
-        
-        if data_scope.get('dateRange', {}).get('start'):
-            start_date = datetime.strptime(data_scope['dateRange']['start'], '%Y-%m-%d')
-            query = query.filter(SurveyResponse.created_at >= start_date)
-            
-        if data_scope.get('dateRange', {}).get('end'):
-            end_date = datetime.strptime(data_scope['dateRange']['end'], '%Y-%m-%d')
-            query = query.filter(SurveyResponse.created_at <= end_date)
-        
-        # Get the responses
-        responses = query.all()
-        
-        # Process data based on metrics and dimensions
-        results = []
-        
-        if 'response_count' in metrics:
-            if 'organization' in dimensions:
-                # Group by organization
-                org_counts = {}
-                for response in responses:
-                    org_name = response.user.organization.name if response.user.organization else 'Unknown'
-                    org_counts[org_name] = org_counts.get(org_name, 0) + 1
-                
-                for org_name, count in org_counts.items():
-                    results.append({
-                        'name': org_name,
-                        'value': count,
-                        'metric': 'response_count',
-                        'dimension': 'organization'
-                    })
-            
-            elif 'geographic_location' in dimensions:
-                # Group by country
-                geo_counts = {}
-                for response in responses:
-                    if response.user.organization and response.user.organization.geo_location:
-                        country = response.user.organization.geo_location.country or 'Unknown'
-                    else:
-                        country = 'Unknown'
-                    geo_counts[country] = geo_counts.get(country, 0) + 1
-                
-                for country, count in geo_counts.items():
-                    results.append({
-                        'name': country,
-                        'value': count,
-                        'metric': 'response_count',
-                        'dimension': 'geographic_location'
-                    })
-            
-            elif 'survey_section' in dimensions:
-                # Group by survey section (analyze answers)
-                section_counts = {}
-                for response in responses:
-                    if response.answers:
-                        for answer_key, answer_value in response.answers.items():
-                            # Extract section from question structure
-                            section = extract_section_from_answer_key(answer_key)
-                            section_counts[section] = section_counts.get(section, 0) + 1
-                
-                for section, count in section_counts.items():
-                    results.append({
-                        'name': section,
-                        'value': count,
-                        'metric': 'response_count',
-                        'dimension': 'survey_section'
-                    })
-            
-            else:
-                # Overall response count
-                results.append({
-                    'name': 'Total Responses',
-                    'value': len(responses),
-                    'metric': 'response_count',
-                    'dimension': 'total'
-                })
-        
-        if 'completion_rate' in metrics:
-            completed_responses = len([r for r in responses if r.status == 'completed'])
-            total_responses = len(responses)
-            completion_rate = (completed_responses / total_responses * 100) if total_responses > 0 else 0
-            
-            results.append({
-                'name': 'Completion Rate',
-                'value': round(completion_rate, 2),
-                'metric': 'completion_rate',
-                'dimension': 'percentage'
-            })
-        
-        if 'unique_respondents' in metrics:
-            unique_users = len(set([r.user_id for r in responses]))
-            results.append({
-                'name': 'Unique Respondents',
-                'value': unique_users,
-                'metric': 'unique_respondents',
-                'dimension': 'count'
-            })
+        results, total_records = report_queries.run(db.session, config)
         
         return jsonify({
             'success': True,
             'results': results,
-            'total_records': len(responses),
+            'total_records': total_records,
             'config': config
         }), 200
         
@@ -9613,15 +10185,6 @@ def generate_report_data():
         logger.error(f"Error generating report data: {str(e)}")
         return jsonify({'error': f'Failed to generate report: {str(e)}'}), 500
 
-def extract_section_from_answer_key(answer_key):
-    """Extract section name from answer key - this depends on your answer structure"""
-    # Assuming answer keys are structured like "section_name_question_id" or similar
-    # Adjust this based on your actual answer structure
-    if '_' in answer_key:
-        parts = answer_key.split('_')
-        return parts[0] if len(parts) > 1 else 'Unknown Section'
-    return 'General'
-
 @app.route('/api/reports/templates', methods=['GET'])
 def get_report_templates():
     """Get saved report templates"""
@@ -9722,75 +10285,82 @@ def render_email_template(template_content, **kwargs):
         return template_content
     
     try:
-        # Simple template variable replacement using {{variable}} syntax
-        rendered = template_content
-        for key, value in kwargs.items():
-            placeholder = f"{{{{{key}}}}}"
-            rendered = rendered.replace(placeholder, str(value) if value is not None else '')
-        return rendered
+        # {{variable}} placeholders, substituted in one pass over the compiled (cached) template
+        return render_template(template_content, kwargs)
     except Exception as e:
         logger.error(f"Error rendering email template: {str(e)}")
         return template_content
 
+EMAIL_TEMPLATE_NAMES = {
+    'welcome':  'Default Welcome Email',
+    'reminder': 'Default Reminder Email',
+    'invitation': 'Default Invitation Email',
+}
+
 def get_email_template_by_type_and_organization(template_type, organization_id=None):
-    """Get email template by type; prefer org-specific when org id is provided."""
+    """Get email template by type; prefer org-specific when org id is provided.
+
+    Returns a cached, detached template snapshot (same attributes as EmailTemplate);
+    the resolution is memoized per (type, organization) in email_template_cache.
+    """
     try:
-        name_map = {
-            'welcome':  'Default Welcome Email',
-            'reminder': 'Default Reminder Email',
-            'invitation': 'Default Invitation Email',
-        }
         key = (template_type or '').lower()
-        if key not in name_map:
+        if key not in EMAIL_TEMPLATE_NAMES:
             return None, 400, f'Unknown template type: {template_type}'
-        template_name = name_map[key]
-
-        template = None
 
-        # 1) If org provided, try org-specific matches first
-        if organization_id is not None:
-            conds = [EmailTemplate.name.ilike(f'%{key}%')]
-            # Optional synonyms
-            if key == 'reminder':
-                conds.append(EmailTemplate.name.ilike('%reminder%'))
-            if key == 'welcome':
-                conds.append(EmailTemplate.name.ilike('%welcome%'))
-
-            template = (EmailTemplate.query
-                        .filter(EmailTemplate.organization_id == organization_id)
-                        .filter(or_(*conds))
-                        .order_by(EmailTemplate.id.desc())
-                        .first())
+        template = email_template_cache.resolve(key, organization_id, _query_email_template_by_type)
 
-            # If an exact name exists for the org, prefer it
-            if not template:
-                template = (EmailTemplate.query
-                            .filter(EmailTemplate.organization_id == organization_id,
-                                    EmailTemplate.name == template_name)
-                            .first())
-
-        # 2) Public template with exact canonical name
         if not template:
-            template = EmailTemplate.query.filter_by(name=template_name, is_public=True).first()
+            return None, 404, f'Template not found for type: {template_type}'
+
+        return template, 200, 'success'
+    except Exception as e:
+        logger.error(f"Error getting email template by type and organization: {e}")
+        return None, 500, f'Failed to get email template: {e}'
 
-        # 3) Global (NULL org) exact canonical name
+def _query_email_template_by_type(key, organization_id=None):
+    """Database lookup behind get_email_template_by_type_and_organization (uncached)."""
+    template_name = EMAIL_TEMPLATE_NAMES[key]
+    template = None
+
+    # 1) If org provided, try org-specific matches first
+    if organization_id is not None:
+        conds = [EmailTemplate.name.ilike(f'%{key}%')]
+        # Optional synonyms
+        if key == 'reminder':
+            conds.append(EmailTemplate.name.ilike('%reminder%'))
+        if key == 'welcome':
+            conds.append(EmailTemplate.name.ilike('%welcome%'))
+
+        template = (EmailTemplate.query
+                    .filter(EmailTemplate.organization_id == organization_id)
+                    .filter(or_(*conds))
+                    .order_by(EmailTemplate.id.desc())
+                    .first())
+
+        # If an exact name exists for the org, prefer it
         if not template:
             template = (EmailTemplate.query
-                        .filter(EmailTemplate.name == template_name,
-                                EmailTemplate.organization_id.is_(None))
+                        .filter(EmailTemplate.organization_id == organization_id,
+                                EmailTemplate.name == template_name)
                         .first())
 
-        # 4) Last resort: any template with canonical name
-        if not template:
-            template = EmailTemplate.query.filter_by(name=template_name).first()
+    # 2) Public template with exact canonical name
+    if not template:
+        template = EmailTemplate.query.filter_by(name=template_name, is_public=True).first()
 
-        if not template:
-            return None, 404, f'Template not found for type: {template_type}'
+    # 3) Global (NULL org) exact canonical name
+    if not template:
+        template = (EmailTemplate.query
+                    .filter(EmailTemplate.name == template_name,
+                            EmailTemplate.organization_id.is_(None))
+                    .first())
 
-        return template, 200, 'success'
-    except Exception as e:
-        logger.error(f"Error getting email template by type and organization: {e}")
-        return None, 500, f'Failed to get email template: {e}'
+    # 4) Last resort: any template with canonical name
+    if not template:
+        template = EmailTemplate.query.filter_by(name=template_name).first()
+
+    return template
 
 @app.route('/api/email-templates/by-type/<template_type>', methods=['GET'])
 def get_email_template_by_type(template_type):
@@ -9899,7 +10469,7 @@ def render_email_template_preview():
 
         # Fetch template by id or by type (org-aware if provided)
         if template_id:
-            template = EmailTemplate.query.get(template_id)
+            template = email_template_cache.get(template_id, EmailTemplate.query.get)
             if not template:
                 return jsonify({'error': f'Template with ID {template_id} not found'}), 404
         else:
@@ -10102,6 +10672,7 @@ def save_email_template():
         )
         db.session.add(template)
         db.session.commit()
+        email_template_cache.invalidate()
         
         logger.info(f"Created email template: {template.name} for organization {organization.name}")
         return jsonify({'success': True, 'template': template.to_dict()}), 201
@@ -10161,6 +10732,7 @@ def update_email_template(template_id):
             template.organization_id = new_org_id
 
         db.session.commit()
+        email_template_cache.invalidate()
         logger.info(f"Updated email template: {template.name} for organization {template.organization_id}")
         return jsonify({'success': True, 'template': template.to_dict()}), 200
     except Exception as e:
@@ -10180,6 +10752,7 @@ def delete_email_template(template_id):
         # Delete the template itself
         db.session.delete(template)
         db.session.commit()
+        email_template_cache.invalidate()
         
         logger.info(f"Deleted email template '{template_name}' from organization '{organization_name}'")
         return jsonify({'success': True, 'message': 'Template deleted successfully'}), 200
@@ -10191,36 +10764,46 @@ def delete_email_template(template_id):
 
 @app.route('/api/reports/export', methods=['POST'])
 def export_report():
-    """Export report data in various formats"""
+    """Export report data in various formats.
+
+    With ``data`` in the body the given rows are exported (as before); otherwise the
+    responses selected by the report config's ``dataScope`` are read with a server-side
+    cursor. CSV and XLSX are streamed as a chunked response.
+    """
     try:
         config = request.get_json() or {}
         format_type = config.get('format', 'json')  # json, csv, xlsx
-        data = config.get('data', [])
-        
-        if format_type == 'csv':
-            # Generate CSV
-            import csv
-            import io
-            
-            output = io.StringIO()
-            if data:
-                fieldnames = data[0].keys()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data)
-            
-            response = app.response_class(
-                output.getvalue(),
-                mimetype='text/csv',
-                headers={'Content-Disposition': 'attachment; filename=report.csv'}
+        
+        if format_type in ('csv', 'xlsx'):
+            if 'data' in config:
+                data = config.get('data') or []
+                header = list(data[0].keys()) if data else []
+                rows = ([item.get(key) for key in header] for item in data)
+            else:
+                # Validate the scope up front; errors raised while streaming can't become a 500
+                report_queries.scope(config.get('dataScope', {}))
+                header = list(EXPORT_COLUMNS)
+                rows = report_queries.response_rows(db.session, config.get('dataScope', {}))
+            
+            if format_type == 'csv':
+                body, mimetype = csv_stream(header, rows), CSV_MIMETYPE
+            else:
+                body, mimetype = xlsx_stream(header, rows, config.get('name') or 'Report'), XLSX_MIMETYPE
+            
+            return app.response_class(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={
+                    'Content-Disposition': f'attachment; filename=report.{format_type}',
+                    'X-Accel-Buffering': 'no',
+                }
             )
-            return response
         
         else:
             # Default to JSON
             return jsonify({
                 'success': True,
-                'data': data,
+                'data': config.get('data', []),
                 'format': format_type
             }), 200
             
@@ -10440,6 +11023,21 @@ def get_sample_text_analytics(survey_type, response_id, selected_surveys):
         logger.error(f"Error running sample text analytics: {str(e)}")
         return jsonify({'success': False, 'error': str(e), 'results': []}), 500
 
+text_analysis_jobs = TextAnalysisJobRunner(
+    app, db, TextAnalysisJob, TextAnswerAnalytics, SurveyResponse, Question,
+    max_workers=int(os.getenv('TEXT_ANALYSIS_WORKERS', '1')),
+)
+
+def _text_analysis_tables_outdated():
+    """503 response while the text analysis tables still need the migration script, else None."""
+    try:
+        text_analysis_jobs.ensure_tables()
+    except RuntimeError as e:
+        logger.error(f"Text analysis unavailable: {str(e)}")
+        return jsonify({'error': f'Text analysis is unavailable until its tables are upgraded: {str(e)}',
+                        'success': False}), 503
+    return None
+
 @app.route('/api/reports/analytics/text', methods=['GET'])
 def get_textual_analytics():
     """Return sentiment, topic and cluster labels for open-ended answers."""
@@ -10458,75 +11056,96 @@ def get_textual_analytics():
             logger.info("Returning sample text analytics for test mode")
             return get_sample_text_analytics(survey_type, response_id, selected_surveys)
         
-        # Check if we have open-ended answers in the database before running analysis
-        from text_analytics import fetch_open_ended_answers
-        logger.info("Checking for open-ended answers in database...")
-        open_ended_df = fetch_open_ended_answers(db.session, SurveyResponse, Question)
-        logger.info(f"Found {len(open_ended_df)} open-ended answers in database")
+        outdated = _text_analysis_tables_outdated()
+        if outdated:
+            return outdated
         
-        if open_ended_df.empty:
-            logger.warning("No open-ended answers found in database. Returning empty results.")
-            return jsonify({'success': True, 'results': [], 'message': 'No open-ended answers found in database'}), 200
+        # Serve the latest completed analysis snapshot; analyses run in the background job runner
+        refresh_job = text_analysis_jobs.submit() if refresh else None
+        job = text_analysis_jobs.latest_completed_job()
+        if not job:
+            pending = refresh_job or text_analysis_jobs.submit()
+            logger.info(f"No text analysis snapshot yet; job {pending.id} is {pending.status}")
+            return jsonify({
+                'success': True,
+                'results': [],
+                'status': pending.status,
+                'job': pending.to_dict(),
+                'message': 'Text analysis is running. Poll /api/reports/analytics/text/jobs/<job_id> for progress.'
+            }), 202
         
-        if refresh or not hasattr(g, 'text_analysis_df'):
-            logger.info("Running full text analysis...")
-            from text_analytics import run_full_analysis  # local heavy import
-            try:
-                g.text_analysis_df = run_full_analysis(db.session, SurveyResponse, Question)
-                logger.info(f"Text analysis completed successfully. Results shape: {g.text_analysis_df.shape}")
-            except ValueError as ve:
-                if "No open-ended answers found in database" in str(ve):
-                    logger.warning("No open-ended answers found during analysis. Returning empty results.")
-                    return jsonify({'success': True, 'results': [], 'message': 'No open-ended answers found in database'}), 200
-                else:
-                    raise ve
-
-        df = g.text_analysis_df.copy()
-        logger.info(f"Using cached text analysis data. Shape: {df.shape}")
+        query = text_analysis_jobs.snapshot_query(job)
         
         # Apply filters if provided
-        original_count = len(df)
-        if survey_type:
-            # Get survey responses of the specified type
-            survey_responses = SurveyResponse.query.filter(
-                SurveyResponse.survey_type == survey_type,
-                SurveyResponse.status == 'completed'
-            ).all()
-            response_ids = [sr.id for sr in survey_responses]
-            df = df[df['response_id'].isin(response_ids)]
-            logger.info(f"Filtered by survey_type '{survey_type}'. Reduced from {original_count} to {len(df)} records.")
-        
-        if user_id:
-            # Get user's survey responses
-            user_responses = SurveyResponse.query.filter(
-                SurveyResponse.user_id == user_id,
-                SurveyResponse.status == 'completed'
-            ).all()
-            user_response_ids = [ur.id for ur in user_responses]
-            df = df[df['response_id'].isin(user_response_ids)]
-            logger.info(f"Filtered by user_id '{user_id}'. Reduced from {original_count} to {len(df)} records.")
+        if survey_type or user_id:
+            # survey_responses has no survey_type column, so survey_type narrows to completed responses only
+            response_ids = db.session.query(SurveyResponse.id).filter(SurveyResponse.status == 'completed')
+            if user_id:
+                response_ids = response_ids.filter(SurveyResponse.user_id == user_id)
+            query = query.filter(TextAnswerAnalytics.response_id.in_(response_ids))
         
         if selected_surveys:
             # Filter by selected survey IDs
             selected_ids = [int(id.strip()) for id in selected_surveys.split(',') if id.strip().isdigit()]
             if selected_ids:
-                original_count = len(df)
-                df = df[df['response_id'].isin(selected_ids)]
-                logger.info(f"Filtered by selected_surveys. Reduced from {original_count} to {len(df)} records.")
+                query = query.filter(TextAnswerAnalytics.response_id.in_(selected_ids))
         
-        # Drop clean_text column and convert to records
-        payload = df.drop(columns=['clean_text'], errors='ignore').to_dict(orient='records')
-        logger.info(f"Returning {len(payload)} text analytics results")
-        return jsonify({'success': True, 'results': payload}), 200
+        payload = [row.to_dict() for row in query.all()]
+        logger.info(f"Returning {len(payload)} text analytics results from job {job.id}")
+        result = {
+            'success': True,
+            'results': payload,
+            'job': job.to_dict(),
+            'analyzed_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if not job.answer_count:
+            result['message'] = 'No open-ended answers found in database'
+        if refresh_job:
+            result['refresh_job'] = refresh_job.to_dict()
+        return jsonify(result), 200
     except Exception as e:
         logger.error(f"Error generating text analytics: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Failed to generate text analytics: {str(e)}', 'success': False}), 500
 
+@app.route('/api/reports/analytics/text/jobs', methods=['POST'])
+def create_text_analysis_job():
+    """Queue a background text analysis (or return the one already running)."""
+    try:
+        data = request.get_json(silent=True) or {}
+        num_clusters = data.get('num_clusters', 10)
+        if not isinstance(num_clusters, int) or num_clusters < 1 or num_clusters > 50:
+            return jsonify({'error': 'num_clusters must be an integer between 1 and 50'}), 400
+        
+        outdated = _text_analysis_tables_outdated()
+        if outdated:
+            return outdated
+        job = text_analysis_jobs.submit(num_clusters=num_clusters)
+        return jsonify({'success': True, 'job': job.to_dict()}), 202
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error queuing text analysis job: {str(e)}")
+        return jsonify({'error': f'Failed to queue text analysis: {str(e)}', 'success': False}), 500
+
+@app.route('/api/reports/analytics/text/jobs/<job_id>', methods=['GET'])
+def get_text_analysis_job(job_id):
+    """Poll the status of a background text analysis job."""
+    try:
+        outdated = _text_analysis_tables_outdated()
+        if outdated:
+            return outdated
+        job = text_analysis_jobs.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job.to_dict()}), 200
+    except Exception as e:
+        logger.error(f"Error fetching text analysis job {job_id}: {str(e)}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
 # Survey Assignment API Endpoints
 @app.route('/api/assign-survey', methods=['POST'])
 def assign_survey_to_user():
-    """Assign a survey to existing user(s) and send email notifications"""
+    """Assign a survey to existing user(s) and queue email notifications (202 with the email batch ID)"""
     
     # Debug logging helper
     def log_assignment_debug(message):
@@ -10598,19 +11217,18 @@ def assign_survey_to_user():
             'total_users': len(user_ids),
             'successful_assignments': 0,
             'failed_assignments': 0,
-            'successful_emails': 0,
-            'failed_emails': 0,
+            'queued_emails': 0,
             'details': []
         }
+        assignment_emails = []
         
         for user_id in user_ids:
             log_assignment_debug(f"Processing User ID: {user_id}")
             user_result = {
                 'user_id': user_id,
                 'assignment_success': False,
-                'email_success': False,
-                'assignment_error': None,
-                'email_error': None
+                'email_queued': False,
+                'assignment_error': None
             }
             
             try:
@@ -10717,41 +11335,27 @@ def assign_survey_to_user():
                 user_result['survey_code'] = survey_response.survey_code
                 results['successful_assignments'] += 1
                 
-                # Send assignment email
-                try:
-                    organization_name_for_email = (
-                        template_org_name
-                        or (user.organization.name if user.organization else None)
-                    )
-                    log_assignment_debug(f" - Sending email to {user.email}")
-                    email_result = send_survey_assignment_email(
-                        to_email=user.email,
-                        username=user.username,
-                        password=user.password,
-                        survey_code=survey_response.survey_code,
-                        firstname=user.firstname,
-                        organization_name=organization_name_for_email,
-                        survey_name=template.version.name if template.version else "Survey",
-                        assigned_by=admin_name
-                    )
-                    
-                    if email_result.get('success'):
-                        user_result['email_success'] = True
-                        results['successful_emails'] += 1
-                        log_assignment_debug(" - Email Sent Successfully")
-                        logger.info(f"Survey assignment email sent to user {user_id}: {user.email}")
-                    else:
-                        error_msg = email_result.get('error', 'Unknown email error')
-                        user_result['email_error'] = error_msg
-                        results['failed_emails'] += 1
-                        log_assignment_debug(f" - Email Failed: {error_msg}")
-                        logger.error(f"Failed to send assignment email to user {user_id}: {user_result['email_error']}")
-                
-                except Exception as email_error:
-                    user_result['email_error'] = str(email_error)
-                    results['failed_emails'] += 1
-                    log_assignment_debug(f" - Email Exception: {str(email_error)}")
-                    logger.error(f"Exception sending assignment email to user {user_id}: {str(email_error)}")
+                # Queue assignment email (sent by the outbox dispatcher after commit)
+                organization_name_for_email = (
+                    template_org_name
+                    or (user.organization.name if user.organization else None)
+                )
+                assignment_emails.append({
+                    'recipient': user.email,
+                    'payload': {
+                        'to_email': user.email,
+                        'username': user.username,
+                        'password': user.password,
+                        'survey_code': survey_response.survey_code,
+                        'firstname': user.firstname,
+                        'organization_name': organization_name_for_email,
+                        'survey_name': template.version.name if template.version else "Survey",
+                        'assigned_by': admin_name
+                    }
+                })
+                user_result['email_queued'] = True
+                results['queued_emails'] += 1
+                log_assignment_debug(f" - Email queued for {user.email}")
                 
             except Exception as assignment_error:
                 error_msg = str(assignment_error)
@@ -10760,17 +11364,37 @@ def assign_survey_to_user():
                 log_assignment_debug(f" - CRITICAL ASSIGNMENT EXCEPTION: {error_msg}")
                 logger.error(f"Exception assigning survey to user {user_id}: {error_msg}")
                 db.session.rollback()
+                # The rollback also discards the assignments flushed so far; don't email them
+                # and don't report them as assigned
+                assignment_emails.clear()
+                for earlier in results['details']:
+                    if earlier['assignment_success']:
+                        earlier.update({
+                            'assignment_success': False,
+                            'email_queued': False,
+                            'survey_response_id': None,
+                            'survey_code': None,
+                            'assignment_error': 'Rolled back after a later assignment failed',
+                        })
+                        results['successful_assignments'] -= 1
+                        results['failed_assignments'] += 1
                 # IMPORTANT: Append result before continuing!
                 results['details'].append(user_result)
                 continue
             
             results['details'].append(user_result)
         
-        # Commit all successful assignments
+        # Commit all successful assignments together with their queued emails
+        batch_id = None
+        results['queued_emails'] = len(assignment_emails)
         try:
+            if assignment_emails:
+                batch_id = email_outbox.enqueue('survey_assignment', assignment_emails)
             db.session.commit()
+            if batch_id:
+                email_outbox.wake()
             log_assignment_debug(f"Transaction Committed. {results['successful_assignments']} success, {results['failed_assignments']} fail.")
-            logger.info(f"Survey assignment completed: {results['successful_assignments']} assignments, {results['successful_emails']} emails sent")
+            logger.info(f"Survey assignment completed: {results['successful_assignments']} assignments, {results['queued_emails']} emails queued (batch {batch_id})")
         except Exception as commit_error:
             db.session.rollback()
             log_assignment_debug(f"COMMIT ERROR: {str(commit_error)}")
@@ -10779,16 +11403,16 @@ def assign_survey_to_user():
         
         # Calculate success rates
         assignment_success_rate = (results['successful_assignments'] / results['total_users'] * 100) if results['total_users'] > 0 else 0
-        email_success_rate = (results['successful_emails'] / results['total_users'] * 100) if results['total_users'] > 0 else 0
         
         return jsonify({
-            'message': f'Survey assignment completed: {results["successful_assignments"]}/{results["total_users"]} assignments, {results["successful_emails"]}/{results["total_users"]} emails sent',
+            'message': f'Survey assignment completed: {results["successful_assignments"]}/{results["total_users"]} assignments, {results["queued_emails"]} emails queued',
             'assignment_success_rate': round(assignment_success_rate, 1),
-            'email_success_rate': round(email_success_rate, 1),
             'template_name': template.version.name if template.version else "Survey",
             'assigned_by': admin_name,
+            'email_batch_id': batch_id,
+            'email_status_url': f'/api/email-batches/{batch_id}' if batch_id else None,
             'results': results
-        }), 200
+        }), 202 if batch_id else 200
         
     except Exception as e:
         db.session.rollback()
@@ -10936,6 +11560,7 @@ def remove_survey_assignment(user_id, assignment_id):
         logger.info(f"Removing survey assignment {assignment_id} (template: {template_name}) for user {user_id}")
         
         # Delete the survey response record
+        _discard_response_derived_tables([assignment])
         db.session.delete(assignment)
         db.session.commit()
         
@@ -11341,14 +11966,15 @@ def get_admin_survey_responses_with_geo():
                     'postal_code': geo.postal_code,
                     'latitude': geo.latitude,
                     'longitude': geo.longitude,
+                    'geo_location_id': geo.id,
                     'timezone': None  # GeoLocation model doesn't have timezone field
                 })
             
             # Add to appropriate survey type group
             result[survey_type].append(response_data)
         
-        # Apply geocoding to responses with zero coordinates
-        logger.info("Applying geocoding to responses with zero coordinates...")
+        # Fill zero coordinates from the geocode cache; misses are geocoded in the background
+        logger.info("Applying cached coordinates to responses with zero coordinates...")
         for survey_type in result:
             if result[survey_type]:
                 result[survey_type] = geocode_survey_response_locations(result[survey_type])
@@ -11368,156 +11994,153 @@ def get_admin_survey_responses_with_geo():
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Failed to fetch survey responses: {str(e)}'}), 500
 
+# Paged, projected reads for the admin responses endpoint (see admin_response_feed.py)
+admin_response_feed = AdminResponseFeed(
+    SurveyResponse, User, Organization, OrganizationType, UserDetails,
+    stamp_models=(User, UserDetails, Organization, GeocodeCacheEntry),
+)
+
 @app.route('/api/survey-responses/admin', methods=['GET', 'OPTIONS'])
 def get_admin_survey_responses():
-    """Get all survey responses for admin reports - automatically determines survey type from user's organization type"""
+    """Get survey responses for admin reports - automatically determines survey type from user's organization type
+
+    Optional query parameters:
+      survey_type  church | institution | nonFormal | other (returns a flat list)
+      fields       comma-separated projection, e.g. ``fields=id,survey_type,status`` to omit answers
+      limit        page size (max 1000); without it every response is returned
+      cursor       value of the previous page's ``X-Next-Cursor`` header
+    The response carries a weak ETag; send it back as ``If-None-Match`` to get ``304``.
+    """
     # Handle CORS preflight request
     if request.method == 'OPTIONS':
         response = make_response()
         response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,If-None-Match')
         response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
         return response
     
-    logger.info("Admin survey responses endpoint called")
     try:
         # Get optional survey type filter from query parameters
         survey_type_filter = request.args.get('survey_type')
+        if survey_type_filter and survey_type_filter not in ADMIN_SURVEY_TYPES:
+            return jsonify({'error': f"survey_type must be one of {', '.join(ADMIN_SURVEY_TYPES)}"}), 400
+        try:
+            fields = parse_admin_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor', type=int)
+        if limit is not None:
+            limit = max(1, min(limit, ADMIN_MAX_PAGE_SIZE))
+        
+        # Answer unchanged data with 304 before reading any rows
+        etag = admin_response_feed.etag(db.session, request.query_string.decode('utf-8', 'replace'))
+        if request.if_none_match.contains_weak(etag):
+            not_modified = make_response('', 304)
+            not_modified.set_etag(etag, weak=True)
+            not_modified.headers['Cache-Control'] = 'private, no-cache'
+            return not_modified
+        
+        rows, next_cursor = admin_response_feed.page(
+            db.session, survey_type=survey_type_filter, cursor=cursor, limit=limit, fields=fields
+        )
         
-        # Query all survey responses with user and organization information
-        logger.info("Querying survey responses with organization data")
-        responses = db.session.query(SurveyResponse)\
-            .join(User, SurveyResponse.user_id == User.id)\
-            .outerjoin(Organization, User.organization_id == Organization.id)\
-            .outerjoin(OrganizationType, Organization.type == OrganizationType.id)\
-            .all()
-        
-        logger.info(f"Found {len(responses)} total survey responses to process")
-        
-        result = {
-            'church': [],
-            'institution': [],
-            'nonFormal': [],
-            'other': []
-        }
-        
-        for response in responses:
-            # Determine survey type based on user's organization type
-            survey_type = 'other'  # Default
-            org_type_name = None
-            
-            if response.user and response.user.organization and response.user.organization.organization_type:
-                org_type_name = response.user.organization.organization_type.type
-                logger.debug(f"Processing organization type: '{org_type_name}'")
-                # Normalize organization type name for comparison
-                org_type_normalized = org_type_name.lower().strip()
-                
-                if org_type_normalized == 'church':
-                    survey_type = 'church'
-                elif org_type_normalized == 'institution':
-                    survey_type = 'institution'
-                elif org_type_normalized in ['non_formal_organizations', 'non-formal', 'non_formal']:
-                    survey_type = 'nonFormal'
-                else:
-                    logger.warning(f"Unknown organization type: '{org_type_name}' (normalized: '{org_type_normalized}') - assigning to 'other'")
-            
-            # Skip if survey type filter is applied and doesn't match
-            if survey_type_filter and survey_type != survey_type_filter:
-                continue
-            
-            # Build response data
-            response_data = {
-                'id': response.id,
-                'survey_type': survey_type,
-                'response_date': response.created_at.isoformat() if response.created_at else None,
-                'template_id': response.template_id,
-                'user_id': response.user_id,
-                'status': response.status,
-                'answers': response.answers
-            }
-            
-            # Extract user and organization information
-            if response.user:
-                user = response.user
-                response_data.update({
-                    'user_name': f"{user.firstname or ''} {user.lastname or ''}".strip(),
-                    'user_email': user.email,
-                })
-                
-                # Get organization information
-                if user.organization:
-                    org = user.organization
-                    response_data.update({
-                        'organization_id': org.id,
-                        'organization_name': org.name,
-                        'organization_type_id': org.type,
-                        'organization_type_name': org_type_name
-                    })
-                
-                # Extract user details if available
-                user_details_list = user.user_details
-                if user_details_list and len(user_details_list) > 0:
-                    user_details = user_details_list[0]
-                    form_data = user_details.form_data or {}
-                    
-                    # Add common fields
-                    response_data.update({
-                        'city': form_data.get('city'),
-                        'country': form_data.get('country'),
-                        'physical_address': form_data.get('address'),
-                        'town': form_data.get('town'),
-                        'age_group': form_data.get('age_group'),
-                        'education_level': form_data.get('education_level'),
-                    })
-                    
-                    # Add survey-type specific fields
-                    if survey_type == 'church':
-                        response_data.update({
-                            'church_name': form_data.get('organization_name') or response_data.get('organization_name'),
-                            'pastor_name': f"{form_data.get('first_name', '')} {form_data.get('last_name', '')}".strip() or response_data.get('user_name'),
-                        })
-                    elif survey_type == 'institution':
-                        response_data.update({
-                            'institution_name': form_data.get('organization_name') or response_data.get('organization_name'),
-                            'president_name': f"{form_data.get('first_name', '')} {form_data.get('last_name', '')}".strip() or response_data.get('user_name'),
-                        })
-                    elif survey_type == 'nonFormal':
-                        response_data.update({
-                            'ministry_name': form_data.get('organization_name') or response_data.get('organization_name'),
-                            'leader_name': f"{form_data.get('first_name', '')} {form_data.get('last_name', '')}".strip() or response_data.get('user_name'),
-                        })
-            
-            # Log geographic data for debugging
-            if 'latitude' in response_data and 'longitude' in response_data:
-                logger.info(f"Response {response.id} - Survey Type: {survey_type}, Lat: {response_data['latitude']}, Lng: {response_data['longitude']}")
-            
-            # Add to appropriate survey type group
-            result[survey_type].append(response_data)
-        
-        # Apply geocoding to responses with zero coordinates
-        logger.info("Applying geocoding to responses with zero coordinates...")
-        for survey_type in result:
-            if result[survey_type]:
-                result[survey_type] = geocode_survey_response_locations(result[survey_type])
+        result = {survey_type: [] for survey_type in ADMIN_SURVEY_TYPES}
+        unknown_types = set()
+        for row in rows:
+            result[row['survey_type']].append(row)
+            type_name = row.get('organization_type_name')
+            if row['survey_type'] == 'other' and type_name:
+                unknown_types.add(type_name)
+        if unknown_types:
+            logger.warning(f"Unknown organization types assigned to 'other': {', '.join(sorted(unknown_types))}")
+        
+        # Fill zero coordinates from the geocode cache; misses are geocoded in the background
+        if fields is None or fields & set(ADMIN_GEO_FIELDS):
+            for survey_type in result:
+                if result[survey_type]:
+                    result[survey_type] = geocode_survey_response_locations(result[survey_type])
+        if fields is not None:
+            result = {survey_type: [project_admin_fields(row, fields) for row in items]
+                      for survey_type, items in result.items()}
         
-        # If survey type filter is applied, return only that type
         if survey_type_filter:
             logger.info(f"Found {len(result[survey_type_filter])} {survey_type_filter} survey responses")
-            return jsonify(result[survey_type_filter]), 200
-        
-        # Return all grouped by survey type
-        total_responses = sum(len(responses) for responses in result.values())
-        logger.info(f"Found {total_responses} total survey responses: Church({len(result['church'])}), Institution({len(result['institution'])}), Non-Formal Organizations({len(result['nonFormal'])}), Other({len(result['other'])})")
-        return jsonify(result), 200
+            response = jsonify(result[survey_type_filter])
+        else:
+            logger.info(f"Found {len(rows)} survey responses: Church({len(result['church'])}), Institution({len(result['institution'])}), Non-Formal Organizations({len(result['nonFormal'])}), Other({len(result['other'])})")
+            response = jsonify(result)
+        
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Next-Cursor, Link'
+        if next_cursor is not None:
+            args = request.args.to_dict()
+            args['cursor'] = next_cursor
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+            response.headers['Link'] = f'<{url_for(request.endpoint, _external=False, **args)}>; rel="next"'
+        return response, 200
         
     except Exception as e:
         logger.error(f"Error fetching admin survey responses with geo: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Failed to fetch survey responses: {str(e)}'}), 500
 
+# One row per response, one column per question; cached per template (see wide_export.py)
+wide_exporter = WideResponseExporter(
+    db, SurveyResponse, SurveyTemplate,
+    cache_dir=os.getenv('WIDE_EXPORT_CACHE_DIR') or os.path.join(app.instance_path, 'exports', 'wide'),
+)
+
+@app.route('/api/survey-responses/admin/wide', methods=['GET'])
+def export_wide_survey_responses():
+    """Download a template's responses pivoted to one column per question.
+
+    Query parameters: ``template_id`` (required), ``format`` (``csv`` or ``parquet``,
+    default ``csv``) and ``cache`` (``0`` to bypass the per-template file cache).
+    """
+    try:
+        template_id = request.args.get('template_id', type=int)
+        if not template_id:
+            return jsonify({'error': 'template_id is required'}), 400
+        format_type = request.args.get('format', 'csv').lower()
+        use_cache = request.args.get('cache', '1').lower() not in ('0', 'false', 'no')
+        
+        template = SurveyTemplate.query.get(template_id)
+        if not template:
+            return jsonify({'error': 'Template not found'}), 404
+        try:
+            path, from_cache = wide_exporter.export(db.session, template, format_type, use_cache=use_cache)
+        except (ValueError, RuntimeError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = send_file(
+            path,
+            mimetype=WIDE_EXPORT_MIMETYPES[format_type],
+            as_attachment=True,
+            download_name=f'survey_{template.survey_code}_responses.{format_type}',
+            max_age=0,
+        )
+        response.headers['X-Export-Cache'] = 'hit' if from_cache else 'miss'
+        if not use_cache:
+            response.call_on_close(lambda: os.unlink(path))
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error exporting wide survey responses: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': f'Failed to export survey responses: {str(e)}'}), 500
+
 @app.route('/api/geocode/batch-update', methods=['POST', 'OPTIONS'])
 def batch_update_coordinates():
-    """Batch update coordinates for GeoLocation records with zero lat/lng"""
+    """
+    Start (or resume) a background backfill of GeoLocation records with zero lat/lng.
+
+    Body (all optional): ``provider`` ('nominatim' | 'google', plus 'fake' when
+    GEOCODE_FAKE_PROVIDER=1), ``limit`` (max rows; default all), ``job_id`` (resume a
+    failed/interrupted job from its cursor). Returns 202 with the job; poll
+    GET /api/geocode/batch-update/<job_id> for progress.
+    """
     # Handle CORS preflight request
     if request.method == 'OPTIONS':
         response = make_response()
@@ -11527,81 +12150,68 @@ def batch_update_coordinates():
         return response
     
     try:
-        # Get optional limit parameter
-        data = request.get_json() or {}
-        limit = data.get('limit', 50)  # Default to 50 records to avoid overwhelming the geocoding service
-        
-        logger.info(f"Starting batch geocoding update for up to {limit} records")
-        
-        # Find GeoLocation records with zero coordinates
-        geo_locations = db.session.query(GeoLocation)\
-            .filter(
-                (GeoLocation.latitude == 0) | (GeoLocation.latitude == None),
-                (GeoLocation.longitude == 0) | (GeoLocation.longitude == None)
-            )\
-            .limit(limit)\
-            .all()
-        
-        logger.info(f"Found {len(geo_locations)} GeoLocation records with zero coordinates")
-        
-        updated_count = 0
-        failed_count = 0
-        results = []
-        
-        for geo_location in geo_locations:
+        data = request.get_json(silent=True) or {}
+        provider = data.get('provider', 'nominatim')
+        limit = data.get('limit')
+        if limit is not None:
             try:
-                success = update_geo_location_coordinates(geo_location.id)
-                if success:
-                    updated_count += 1
-                    results.append({
-                        'id': geo_location.id,
-                        'status': 'updated',
-                        'address': f"{geo_location.address_line1 or ''}, {geo_location.city or ''}, {geo_location.country or ''}".strip(', ')
-                    })
-                else:
-                    failed_count += 1
-                    results.append({
-                        'id': geo_location.id,
-                        'status': 'failed',
-                        'address': f"{geo_location.address_line1 or ''}, {geo_location.city or ''}, {geo_location.country or ''}".strip(', ')
-                    })
-                
-                # Add a small delay to be respectful to the geocoding service
-                time_module.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"Error updating GeoLocation {geo_location.id}: {str(e)}")
-                failed_count += 1
-                results.append({
-                    'id': geo_location.id,
-                    'status': 'error',
-                    'error': str(e),
-                    'address': f"{geo_location.address_line1 or ''}, {geo_location.city or ''}, {geo_location.country or ''}".strip(', ')
-                })
+                limit = int(limit)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'limit must be an integer'}), 400
+            if limit <= 0:
+                return jsonify({'error': 'limit must be positive'}), 400
         
-        logger.info(f"Batch geocoding completed: {updated_count} updated, {failed_count} failed")
+        try:
+            job = batch_geocoder.submit(provider=provider, limit=limit, resume_job_id=data.get('job_id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        logger.info(f"Batch geocoding job {job.id} queued ({job.provider}, limit={job.row_limit})")
         return jsonify({
             'success': True,
-            'message': f'Batch geocoding completed',
-            'summary': {
-                'total_processed': len(geo_locations),
-                'updated': updated_count,
-                'failed': failed_count
-            },
-            'results': results
-        }), 200
+            'message': 'Batch geocoding started',
+            'job_id': job.id,
+            'status_url': f'/api/geocode/batch-update/{job.id}',
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error in batch geocoding update: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Failed to perform batch geocoding: {str(e)}'}), 500
 
+@app.route('/api/geocode/batch-update/<job_id>', methods=['GET'])
+def batch_update_coordinates_status(job_id):
+    """Progress of a batch geocoding job."""
+    try:
+        batch_geocoder.ensure_table()
+        job = batch_geocoder.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Geocoding job not found'}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        logger.error(f"Error fetching batch geocoding job {job_id}: {str(e)}")
+        return jsonify({'error': f'Failed to fetch geocoding job: {str(e)}'}), 500
+
 def geocode_address_google(address):
     """Geocode an address using Google Maps API from environment variable"""
     if not address or not address.strip():
         return None
         
+    cached = geocode_cache.get(address, 'google')
+    if cached == GEOCODE_NEGATIVE:
+        logger.info(f"Skipping geocoding for address Google recently could not resolve: {address}")
+        return None
+    if cached:
+        return {
+            'latitude': cached[0],
+            'longitude': cached[1],
+            'formatted_address': address.strip(),
+            'success': True,
+            'cached': True
+        }
+        
     try:
         api_key = os.getenv('REACT_APP_GOOGLE_MAPS_API_KEY')
         if not api_key:
@@ -11636,10 +12246,13 @@ def geocode_address_google(address):
             }
             
             logger.info(f"✅ Successfully geocoded: {geocoded_data['formatted_address']} -> {location['lat']}, {location['lng']}")
+            geocode_cache.put(address, location['lat'], location['lng'], 'google')
             return geocoded_data
             
         else:
             logger.warning(f"⚠️ Geocoding failed for '{address}': {data['status']}")
+            if data['status'] == 'ZERO_RESULTS':
+                geocode_cache.put_miss(address, 'google')
             return None
             
     except Exception as e:
@@ -11663,6 +12276,11 @@ def build_address_string(city=None, state=None, country=None, address=None, town
         
     return ', '.join(address_parts)
 
+@app.route('/api/geocode/queue', methods=['GET'])
+def geocode_queue_status():
+    """Background geocode worker counters (queued/resolved/failed/cache hits)."""
+    return jsonify({'queue_size': geocode_worker.queue_size(), **geocode_worker.stats}), 200
+
 @app.route('/api/geocode', methods=['POST'])
 def geocode_endpoint():
     """Geocode an address to get latitude/longitude coordinates"""
@@ -12033,14 +12651,15 @@ def get_user_survey_responses(user_id):
                 'country': geo_location.country if geo_location else None,
                 'latitude': geo_location.latitude if geo_location else None,
                 'longitude': geo_location.longitude if geo_location else None,
+                'geo_location_id': geo_location.id if geo_location else None,
                 'education_level': None,  # Not available in current schema
                 'age_group': None  # Not available in current schema
             }
             responses.append(response_data)
             logger.info(f"Added response {survey_response.id} with type {survey_type}, lat={response_data['latitude']}, lng={response_data['longitude']}")
         
-        # Apply geocoding to responses with zero coordinates
-        logger.info("Applying geocoding to user responses with zero coordinates...")
+        # Fill zero coordinates from the geocode cache; misses are geocoded in the background
+        logger.info("Applying cached coordinates to user responses with zero coordinates...")
         responses = geocode_survey_response_locations(responses)
         
         logger.info(f"Returning {len(responses)} responses")
@@ -12092,12 +12711,12 @@ def get_similar_survey_comparison():
         if selected_surveys:
             query = query.filter(SurveyResponse.id.in_(selected_surveys))
         
-        similar_responses = query.all()
-        logger.info(f"Found {len(similar_responses)} similar responses for comparison")
+        similar_ids = query.with_entities(SurveyResponse.id).subquery()
+        comparison_count = db.session.query(db.func.count()).select_from(similar_ids).scalar() or 0
+        logger.info(f"Found {comparison_count} similar responses for comparison")
         
         # Calculate comparison statistics
         target_scores = {}
-        all_scores = {}
         
         if target_response.answers:
             # Extract scores from target response
@@ -12105,24 +12724,17 @@ def get_similar_survey_comparison():
                 if isinstance(answer, (int, float)) and 1 <= answer <= 5:
                     target_scores[question_id] = answer
         
-        # Extract scores from similar responses
-        for response in similar_responses:
-            if response.answers:
-                for question_id, answer in response.answers.items():
-                    if isinstance(answer, (int, float)) and 1 <= answer <= 5:
-                        if question_id not in all_scores:
-                            all_scores[question_id] = []
-                        all_scores[question_id].append(answer)
-        
-        # Calculate averages
-        averages = {}
-        for question_id, scores in all_scores.items():
-            if scores:
-                averages[question_id] = sum(scores) / len(scores)
+        # Averages of native 1-5 numeric answers, grouped in SQL over response_answers
+        aggregates = aggregate_numeric_answers(
+            db.session, ResponseAnswer, VERSION_V1,
+            response_ids=select(similar_ids.c.id),
+            native_only=True, min_value=1, max_value=5,
+        )
+        averages = {question_id: agg['avg'] for question_id, agg in aggregates.items()}
         
         # Calculate comparison stats
         stats = {
-            'total_comparisons': len(similar_responses),
+            'total_comparisons': comparison_count,
             'questions_compared': len(target_scores),
             'average_difference': 0,
             'higher_than_average': 0,
@@ -12182,7 +12794,7 @@ def get_similar_survey_comparison():
             'targetScores': target_scores,
             'averages': averages,
             'stats': stats,
-            'comparison_count': len(similar_responses)
+            'comparison_count': comparison_count
         }), 200
         
     except Exception as e:
@@ -12404,59 +13016,19 @@ def compare_surveys_by_template():
             logger.info(f"Sample question keys: {list(sample_q.keys())}")
             logger.info(f"Sample question: {json.dumps(sample_q, indent=2)}")
         
-        # Get all templates and find those with matching questions
-        all_templates = db.session.query(SurveyTemplate).all()
-        
-        # Build a map of template_id -> set of question identifiers
-        template_question_map = {}
-        
-        # Add target template
-        # Match based on question_text and question_type_id only (exclude question ID which is template-specific)
-        target_q_ids = set()
-        for q in target_questions:
-            # Create identifier without question ID for cross-template matching
-            q_id = str(q.get('question_text', '')) + '|' + str(q.get('question_type_id', ''))
-            target_q_ids.add(q_id)
-        
-        template_question_map[target_template.id] = {
-            'template': target_template,
-            'question_ids': target_q_ids,
-            'matching_count': len(target_q_ids)
-        }
-        
-        # Process all other templates
-        for template in all_templates:
-            if template.id == target_template.id:
-                continue
-            
-            # Parse template questions
-            template_questions = template.questions
-            if isinstance(template_questions, str):
-                template_questions = json.loads(template_questions)
-            
-            # Extract question identifiers (match by text and type only)
-            template_q_ids = set()
-            for q in template_questions:
-                # Create identifier without question ID for cross-template matching
-                q_id = str(q.get('question_text', '')) + '|' + str(q.get('question_type_id', ''))
-                template_q_ids.add(q_id)
-            
-            # Find matching questions (intersection)
-            matching_questions = target_q_ids & template_q_ids
-            
-            # Only include templates that have at least some matching questions
-            if matching_questions:
-                template_question_map[template.id] = {
-                    'template': template,
-                    'question_ids': template_q_ids,
-                    'matching_count': len(matching_questions)
-                }
-                logger.info(f"Template {template.survey_code} (ID: {template.id}) has {len(matching_questions)} matching questions out of {len(target_q_ids)}")
-            else:
-                logger.debug(f"Template {template.survey_code} (ID: {template.id}) has no matching questions")
+        # Find templates sharing at least one question (same normalised text and type) via the
+        # signature index instead of parsing every template's questions JSON
+        target_signatures = signature_lookup(target_questions)
+        matching_counts = templates_sharing_signatures(
+            db.session, QuestionSignatureIndex, target_signatures.values()
+        )
+        matching_counts[target_template.id] = len(set(target_signatures.values()))
+        for template_id, count in matching_counts.items():
+            if template_id != target_template.id:
+                logger.info(f"Template ID {template_id} has {count} matching questions out of {matching_counts[target_template.id]}")
         
         # Get all template IDs that have matching questions
-        matching_template_ids = list(template_question_map.keys())
+        matching_template_ids = list(matching_counts.keys())
         
         logger.info(f"Found {len(matching_template_ids)} templates with matching questions: {matching_template_ids}")
         
@@ -12470,6 +13042,7 @@ def compare_surveys_by_template():
             .filter(SurveyResponse.status == 'completed')
         
         # Filter by organization type if specified
+        db_org_type = None
         if organization_type:
             org_type_map = {
                 'church': 'church',
@@ -12481,8 +13054,8 @@ def compare_surveys_by_template():
                 query = query.filter(OrganizationType.type == db_org_type)
                 logger.info(f"Filtering by organization type: {db_org_type}")
         
-        similar_responses = query.all()
-        logger.info(f"Found {len(similar_responses)} similar responses with matching questions")
+        comparison_count = query.count()
+        logger.info(f"Found {comparison_count} similar responses with matching questions")
         
         # Parse target response answers
         target_answers = target_response.answers
@@ -12542,77 +13115,38 @@ def compare_surveys_by_template():
             # Only process questions deemed numeric by template heuristics
             if not question_meta.get(str(question_id), {}).get('is_numeric', False):
                 continue
-            # Try to convert to numeric
-            numeric_value = None
-            if isinstance(answer, (int, float)):
-                numeric_value = float(answer)
-            elif isinstance(answer, str):
-                # Try to parse numeric strings
-                try:
-                    numeric_value = float(answer)
-                except:
-                    # Try to extract number from range (e.g., "41-50")
-                    import re
-                    range_match = re.match(r'(\d+)\s*-\s*(\d+)', answer)
-                    if range_match:
-                        min_val = float(range_match.group(1))
-                        max_val = float(range_match.group(2))
-                        numeric_value = (min_val + max_val) / 2
-                    else:
-                        # Try to extract first number
-                        number_match = re.search(r'\d+', answer)
-                        if number_match:
-                            numeric_value = float(number_match.group())
-            
+            numeric_value = extract_numeric_value(answer)
             if numeric_value is not None:
                 target_scores[question_id] = numeric_value
         
         logger.info(f"Extracted {len(target_scores)} numeric scores from target response")
         
-        # Extract scores from similar responses
-        all_scores = {}
-        for response in similar_responses:
-            response_answers = response.answers
-            if isinstance(response_answers, str):
-                response_answers = json.loads(response_answers)
-            
-            for question_id, answer in response_answers.items():
-                # Only process questions that are in the comparable set
-                if str(question_id) not in comparable_question_ids:
-                    continue
-                # Only process numeric questions per template metadata
-                if not question_meta.get(str(question_id), {}).get('is_numeric', False):
-                    continue
-                
-                # Try to convert to numeric
-                numeric_value = None
-                if isinstance(answer, (int, float)):
-                    numeric_value = float(answer)
-                elif isinstance(answer, str):
-                    try:
-                        numeric_value = float(answer)
-                    except:
-                        import re
-                        range_match = re.match(r'(\d+)\s*-\s*(\d+)', answer)
-                        if range_match:
-                            min_val = float(range_match.group(1))
-                            max_val = float(range_match.group(2))
-                            numeric_value = (min_val + max_val) / 2
-                        else:
-                            number_match = re.search(r'\d+', answer)
-                            if number_match:
-                                numeric_value = float(number_match.group())
-                
-                if numeric_value is not None:
-                    if question_id not in all_scores:
-                        all_scores[question_id] = []
-                    all_scores[question_id].append(numeric_value)
+        # Peer statistics come from the incrementally maintained question_aggregates
+        # table; the target's own contribution is subtracted so it is not its own peer.
+        target_org_type = target_response.user.organization.organization_type.type \
+            if target_response.user and target_response.user.organization and target_response.user.organization.organization_type else ''
+        exclude = []
+        if target_response.status == 'completed' and (db_org_type is None or db_org_type == target_org_type):
+            exclude = response_contributions(target_answers, target_questions)
+        peer_stats = peer_statistics(
+            db.session, QuestionAggregate, target_signatures.values(),
+            organization_type=db_org_type, exclude=exclude,
+        )
+        
+        averages = {}
+        for question_id, signature in target_signatures.items():
+            if question_id not in comparable_question_ids:
+                continue
+            if not question_meta.get(question_id, {}).get('is_numeric', False):
+                continue
+            if signature in peer_stats:
+                averages[question_id] = peer_stats[signature]['avg']
 
         # Post-validate numeric meta: if marked numeric but no numeric values present anywhere, demote to non-numeric
         for qid, meta in list(question_meta.items()):
             if not meta.get('is_numeric', False):
                 continue
-            if qid not in target_scores and qid not in all_scores:
+            if qid not in target_scores and qid not in averages:
                 question_meta[qid]['is_numeric'] = False
         
         # Generate question labels using NLP
@@ -12637,17 +13171,11 @@ def compare_surveys_by_template():
         section_summary = generate_section_summary(target_questions)
         logger.info(f"Section summary: {section_summary}")
         
-        # Calculate averages for each question
-        averages = {}
-        for question_id, scores in all_scores.items():
-            if scores:
-                averages[question_id] = sum(scores) / len(scores)
-        
         logger.info(f"Calculated averages for {len(averages)} questions")
         
         # Calculate comparison statistics
         stats = {
-            'total_comparisons': len(similar_responses),
+            'total_comparisons': comparison_count,
             'questions_compared': len(target_scores),
             'questions_with_data': len(averages),
             'higher_than_average': 0,
@@ -12730,7 +13258,8 @@ def compare_surveys_by_template():
                 target_texts = extract_text_responses(target_response, target_template)
                 logger.info(f"Found {len(target_texts)} text responses in target survey")
                 
-                # Extract text from similar responses
+                # Extract text from similar responses (only text analysis needs the rows)
+                similar_responses = query.all()
                 comparison_texts = []
                 for resp in similar_responses:
                     texts = extract_text_responses(resp, target_template)
@@ -12801,7 +13330,7 @@ def compare_surveys_by_template():
             'targetScores': target_scores,
             'averages': averages,
             'stats': stats,
-            'comparison_count': len(similar_responses),
+            'comparison_count': comparison_count,
             'template_questions_count': len(template_questions),
             'question_labels': question_labels,
             'question_details': question_details,
@@ -13764,132 +14293,24 @@ def search_organizations_fuzzy():
         
         if not query:
             # If no query, return all organizations (limited)
-            organizations = Organization.query.limit(limit).all()
+            results = org_search_index.first(limit)
+            total_matches = None
+        else:
+            results, total_matches = org_search_index.search(query, limit)
+
+        # One lookup for the type names of the returned organizations
+        type_ids = {org['type_id'] for org in results if org['type_id'] is not None}
+        type_names = dict(db.session.query(OrganizationType.id, OrganizationType.type)
+                          .filter(OrganizationType.id.in_(type_ids)).all()) if type_ids else {}
+        for org in results:
+            org['type_name'] = type_names.get(org['type_id'])
+
+        if not query:
             return jsonify({
                 'success': True,
-                'organizations': [{
-                    'id': org.id,
-                    'name': org.name,
-                    'type_id': org.type,
-                    'type_name': org.organization_type.type if org.organization_type else None,
-                    'match_score': 0,
-                    'match_type': 'none'
-                } for org in organizations]
+                'organizations': results
             }), 200
         
-        # Get all organizations for matching
-        all_orgs = Organization.query.all()
-        
-        def calculate_similarity(query_str, target_str):
-            """
-            Calculate similarity score using multiple algorithms.
-            Returns a tuple of (score, match_type).
-            """
-            if not target_str:
-                return (0, 'none')
-            
-            query_lower = query_str.lower().strip()
-            target_lower = target_str.lower().strip()
-            
-            # Exact match
-            if query_lower == target_lower:
-                return (100, 'exact')
-            
-            # Contains match
-            if query_lower in target_lower or target_lower in query_lower:
-                # Calculate how much of the string matches
-                shorter = min(len(query_lower), len(target_lower))
-                longer = max(len(query_lower), len(target_lower))
-                score = int((shorter / longer) * 95)
-                return (max(score, 75), 'contains')
-            
-            # Starts with match
-            if target_lower.startswith(query_lower) or query_lower.startswith(target_lower):
-                return (90, 'starts_with')
-            
-            # Token-based matching (word overlap)
-            query_tokens = set(query_lower.split())
-            target_tokens = set(target_lower.split())
-            
-            if query_tokens and target_tokens:
-                # Calculate Jaccard similarity
-                intersection = query_tokens & target_tokens
-                union = query_tokens | target_tokens
-                jaccard = len(intersection) / len(union)
-                
-                if jaccard > 0:
-                    token_score = int(jaccard * 85)
-                    return (max(token_score, 50), 'token_match')
-            
-            # Levenshtein-like simple similarity
-            # Using a simple ratio calculation
-            def simple_ratio(s1, s2):
-                """Calculate simple similarity ratio"""
-                if not s1 or not s2:
-                    return 0
-                
-                # Count matching characters at same positions
-                matches = sum(1 for a, b in zip(s1, s2) if a == b)
-                max_len = max(len(s1), len(s2))
-                return matches / max_len
-            
-            ratio = simple_ratio(query_lower, target_lower)
-            
-            # Also try removing common words
-            common_words = {'the', 'of', 'and', 'church', 'organization', 'org', 'inc', 'ltd', 'ministry', 'ministries'}
-            
-            def clean_name(name):
-                words = name.lower().split()
-                return ' '.join(w for w in words if w not in common_words)
-            
-            clean_query = clean_name(query_str)
-            clean_target = clean_name(target_str)
-            
-            if clean_query and clean_target:
-                clean_ratio = simple_ratio(clean_query, clean_target)
-                ratio = max(ratio, clean_ratio)
-            
-            # Trigram matching
-            def get_trigrams(s):
-                s = s.lower().strip()
-                if len(s) < 3:
-                    return set()
-                return set(s[i:i+3] for i in range(len(s) - 2))
-            
-            q_trigrams = get_trigrams(query_str)
-            t_trigrams = get_trigrams(target_str)
-            
-            if q_trigrams and t_trigrams:
-                trigram_intersection = len(q_trigrams & t_trigrams)
-                trigram_union = len(q_trigrams | t_trigrams)
-                trigram_score = (trigram_intersection / trigram_union) if trigram_union > 0 else 0
-                ratio = max(ratio, trigram_score)
-            
-            if ratio > 0.3:
-                return (int(ratio * 80), 'fuzzy')
-            
-            return (0, 'none')
-        
-        # Calculate scores for all organizations
-        scored_orgs = []
-        for org in all_orgs:
-            score, match_type = calculate_similarity(query, org.name)
-            if score > 20:  # Only include organizations with some similarity
-                scored_orgs.append({
-                    'id': org.id,
-                    'name': org.name,
-                    'type_id': org.type,
-                    'type_name': org.organization_type.type if org.organization_type else None,
-                    'match_score': score,
-                    'match_type': match_type
-                })
-        
-        # Sort by score descending
-        scored_orgs.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        # Limit results
-        results = scored_orgs[:limit]
-        
         # Check for exact match
         exact_match = None
         for org in results:
@@ -13902,7 +14323,7 @@ def search_organizations_fuzzy():
             'query': query,
             'exact_match': exact_match,
             'organizations': results,
-            'total_matches': len(scored_orgs)
+            'total_matches': total_matches
         }), 200
         
     except Exception as e:
@@ -14303,6 +14724,7 @@ def parse_document():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
             
+        from document_parser import DocumentParserService
         parser = DocumentParserService()
         
         # 1. Extract Text
@@ -14327,6 +14749,7 @@ def parse_document():
         return jsonify({'error': 'Internal server error processing document'}), 500
 
 @app.route('/api/titles', methods=['POST'])
+@response_cache.invalidates('titles', 'templates')
 def add_title():
     """Add a new title"""
     try:
@@ -14508,6 +14931,47 @@ register_role_request_routes(app, db)
 from kpi_dashboard_routes import register_kpi_dashboard_routes
 register_kpi_dashboard_routes(app, db)
 
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+# The write routes above invalidate their namespaces explicitly; ORM commits from any
+# other writer (route modules, signup, scripts run in-process) do so through these hooks.
+response_cache.watch_models({
+    QuestionType: ('question_types',),
+    OrganizationType: ('organization_types',),
+    Role: ('roles',),
+    Title: ('titles', 'templates'),
+    SurveyTemplate: ('templates',),
+    SurveyTemplateVersion: ('templates',),
+    Organization: ('templates',),
+})
+
+@app.route(RESPONSE_CACHE_STATS_ENDPOINT, methods=['GET'])
+def response_cache_stats():
+    """Hit/miss counters of the response cache for this worker."""
+    return jsonify(response_cache.stats()), 200
+
+@app.route(RESPONSE_CACHE_STATS_ENDPOINT, methods=['POST'])
+def clear_response_cache():
+    """Empty this app's response cache (for every worker, with the shared sqlite backend)."""
+    response_cache.clear()
+    return jsonify(response_cache.stats()), 200
+
+# ============================================================================
+# START SCHEDULER AND EMAIL OUTBOX
+# ============================================================================
+# Every worker polls; the scheduler_jobs lease makes exactly one of them run each tick.
+# Started per request (also covers workers forked from a preloaded app), never at import.
+app.before_request(scheduler.start)
+
+# Dispatches outbox rows left pending by a previous process as well as new ones;
+# SKIP LOCKED claims keep workers from sending the same row twice. Started per request
+# only, so importing app (scripts, shells) never sends mail.
+app.before_request(email_outbox.start)
+
+# Per request only: importing app (scripts, shells) must not start a query on a thread
+app.before_request(org_search_index.start)
+
 # ============================================================================
 # SIGNUP & ONBOARDING ROUTES
 # ============================================================================
@@ -9,7 +9,6 @@ import logging
 from .config.settings import Config, get_database_url
 from .config.database import db, init_database, create_tables
 from .routes import register_blueprints
-from apscheduler.schedulers.background import BackgroundScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -52,6 +51,10 @@ def create_app(config_class=Config):
     # Initialize database
     init_database(app)
     
+    # Per-request SQL count / latency headers (debug); GET /api/debug/perf when PERF_ENDPOINT=1
+    from request_metrics import init_request_metrics
+    init_request_metrics(app)
+    
     # Register blueprints (routes)
     register_blueprints(app)
     
@@ -72,21 +75,27 @@ def create_app(config_class=Config):
 
 
 def _start_reminder_scheduler(app):
-    """Start APScheduler to process due reminders every 5 minutes."""
+    """Register the due-reminder job and start the lease-coordinated scheduler.
+
+    Every worker polls, but the ``scheduler_jobs`` lease row lets exactly one of them run
+    each 5-minute tick; runs are recorded in ``scheduler_runs`` (GET /api/scheduler/runs).
+    """
     import os
-    # Avoid duplicate schedulers when Flask reloader forks a child process
-    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
-        scheduler = BackgroundScheduler(daemon=True)
+    from datetime import timedelta
+    from scheduler_service import SchedulerService
+    from .models import SchedulerJob, SchedulerRun
+    from .routes.reminders import run_due_reminders
 
-        def _tick():
-            with app.app_context():
-                from .routes.reminders import process_due_reminders
-                with app.test_client() as client:
-                    client.post('/api/process-due-reminders')
+    scheduler = SchedulerService(app, db, SchedulerJob, SchedulerRun)
+    scheduler.add_job('due_reminders', run_due_reminders, interval=timedelta(minutes=5))
+    app.extensions['scheduler'] = scheduler
 
-        scheduler.add_job(_tick, 'interval', minutes=5, id='reminder_tick')
+    # Avoid a poller in the Flask reloader's parent process
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
         scheduler.start()
-        logger.info("✅ Reminder scheduler started (every 5 min)")
+        # Workers forked from a preloaded app don't inherit the thread; start it on first request
+        app.before_request(scheduler.start)
+        logger.info("✅ Reminder scheduler started (every 5 min, one worker per tick)")
 
 
 def init_app():
@@ -4,7 +4,7 @@
 from ..config.database import db
 
 # Import base models first (no FK dependencies)
-from .geo_location import GeoLocation
+from .geo_location import GeoLocation, GeocodeCacheEntry
 from .organization import OrganizationType, Organization
 from .user import User, UserDetails, Role, UserOrganizationTitle, Title
 
@@ -28,6 +28,7 @@ from .email_template import EmailTemplate
 from .report import ReportTemplate, SavedReport
 from .contact import ContactReferral, ReferralLink
 from .reminder import SurveyReminderSetting, SurveyReminderLog
+from .scheduler import SchedulerJob, SchedulerRun
 
 
 __all__ = [
@@ -44,6 +45,7 @@ __all__ = [
     'Title',
     # Geo
     'GeoLocation',
+    'GeocodeCacheEntry',
     # Survey
     'SurveyTemplate',
     'SurveyTemplateVersion',
@@ -69,4 +71,7 @@ __all__ = [
     # Reminder
     'SurveyReminderSetting',
     'SurveyReminderLog',
+    # Scheduler
+    'SchedulerJob',
+    'SchedulerRun',
 ]
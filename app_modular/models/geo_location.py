@@ -1,6 +1,8 @@
 """
-Geographic location database model.
+Geographic location database models.
 """
+from datetime import datetime
+
 from ..config.database import db
 
 
@@ -46,3 +48,19 @@ class GeoLocation(db.Model):
             'latitude': float(self.latitude) if self.latitude else 0,
             'longitude': float(self.longitude) if self.longitude else 0
         }
+
+
+class GeocodeCacheEntry(db.Model):
+    """Address -> coordinates cache shared with app.py (see geocode_pipeline.py)."""
+    __tablename__ = 'geocode_cache'
+    
+    address_hash = db.Column(db.String(40), primary_key=True)
+    address = db.Column(db.String(500), nullable=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    provider = db.Column(db.String(20), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<GeocodeCacheEntry {self.address}>'
@@ -0,0 +1,53 @@
+"""
+Scheduler lease and run-history models (see scheduler_service.py).
+"""
+from datetime import datetime
+
+from sqlalchemy.dialects.mysql import JSON
+from ..config.database import db
+
+
+class SchedulerJob(db.Model):
+    """Lease row for one periodic job; only the worker holding it runs the job."""
+    __tablename__ = 'scheduler_jobs'
+
+    name = db.Column(db.String(100), primary_key=True)
+    next_run_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(255), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_run_id = db.Column(db.Integer, nullable=True)
+
+
+class SchedulerRun(db.Model):
+    """One execution of a scheduled job, with its duration and outcome."""
+    __tablename__ = 'scheduler_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    owner = db.Column(db.String(255), nullable=False)
+    trigger = db.Column(db.Enum('schedule', 'manual'), nullable=False, default='schedule')
+    status = db.Column(db.Enum('running', 'succeeded', 'failed'), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+    result = db.Column(JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_scheduler_runs_job_started', 'job_name', 'started_at'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'owner': self.owner,
+            'trigger': self.trigger,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'result': self.result,
+            'error': self.error,
+        }
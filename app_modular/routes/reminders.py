@@ -2,7 +2,7 @@
 Survey reminder settings and execution routes.
 """
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 import logging
 
 from ..config.database import db
@@ -149,32 +149,72 @@ def send_reminders_now(template_id):
 
 @reminders_bp.route('/process-due-reminders', methods=['POST'])
 def process_due_reminders():
-    """Called by the scheduler – find all due reminder settings and send emails."""
+    """Run the due-reminder job now (unless another worker is already running it)."""
     try:
-        now = datetime.utcnow()
-        due_settings = SurveyReminderSetting.query.filter(
-            SurveyReminderSetting.is_active == True,
-            SurveyReminderSetting.next_run_at <= now,
-        ).all()
-
-        results = []
-        for setting in due_settings:
-            result = _execute_reminders(setting)
-            results.append({
-                "template_id": setting.template_id,
-                **result
-            })
-
-        return jsonify({
-            "message": f"Processed {len(due_settings)} due reminder settings",
-            "results": results
-        }), 200
+        run = current_app.extensions['scheduler'].run_now('due_reminders')
+        if run is None:
+            return jsonify({"error": "Due reminders are already being processed"}), 409
+        if run['status'] != 'succeeded':
+            return jsonify({"error": run['error'], "run": run}), 500
+        return jsonify({**run['result'], "run": run}), 200
 
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error processing due reminders: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+
+@reminders_bp.route('/scheduler/jobs', methods=['GET'])
+def get_scheduler_jobs():
+    """Registered periodic jobs with their lease state, next run and duration stats."""
+    try:
+        scheduler = current_app.extensions['scheduler']
+        return jsonify({"owner": scheduler.owner, "jobs": scheduler.status()}), 200
+    except Exception as e:
+        logger.error(f"Error getting scheduler jobs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@reminders_bp.route('/scheduler/runs', methods=['GET'])
+def get_scheduler_runs():
+    """Recent scheduled job runs, newest first (?job=<name>&limit=<n>)."""
+    try:
+        limit = min(request.args.get('limit', 50, type=int) or 50, 500)
+        scheduler = current_app.extensions['scheduler']
+        return jsonify(scheduler.history(request.args.get('job'), limit)), 200
+    except Exception as e:
+        logger.error(f"Error getting scheduler runs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def run_due_reminders():
+    """Send every active reminder setting whose ``next_run_at`` has passed.
+
+    Registered with the app's ``SchedulerService`` as ``due_reminders``, which runs it on
+    one worker at a time and records each run.
+    """
+    now = datetime.utcnow()
+    due_settings = SurveyReminderSetting.query.filter(
+        SurveyReminderSetting.is_active == True,
+        SurveyReminderSetting.next_run_at <= now,
+    ).all()
+
+    results = []
+    for setting in due_settings:
+        result = _execute_reminders(setting)
+        results.append({
+            "template_id": setting.template_id,
+            **result
+        })
+
+    return {
+        "message": f"Processed {len(due_settings)} due reminder settings",
+        "results": results
+    }
+
+
 def _execute_reminders(setting):
     """Core logic: send reminder emails for a single SurveyReminderSetting."""
     template = SurveyTemplate.query.get(setting.template_id)
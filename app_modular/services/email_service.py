@@ -5,13 +5,14 @@ Supports both AWS SES API and SMTP fallback.
 import os
 import logging
 import csv
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 import boto3
 from botocore.exceptions import ClientError
 
+from email_delivery import get_smtp_pool
+
 from ..config.settings import Config
 
 logger = logging.getLogger(__name__)
@@ -78,8 +79,6 @@ class EmailService:
         try:
             smtp_username = self.config.SES_SMTP_USERNAME
             smtp_password = self.config.SES_SMTP_PASSWORD
-            smtp_host = self.config.SES_SMTP_HOST
-            smtp_port = self.config.SES_SMTP_PORT
             source_email = self.config.SES_VERIFIED_EMAIL
             
             if not smtp_username or not smtp_password:
@@ -99,10 +98,7 @@ class EmailService:
             msg.attach(html_part)
             
             # Send the email
-            with smtplib.SMTP(smtp_host, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-                server.sendmail(source_email, to_email, msg.as_string())
+            get_smtp_pool().send(source_email, to_email, msg.as_string())
             
             logger.info(f"Email sent successfully via SMTP to {to_email}")
             return {
@@ -10,6 +10,9 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
 from ..config.settings import Config
+from ..config.database import db
+from ..models.geo_location import GeocodeCacheEntry
+from geocode_pipeline import GeocodeCache, NEGATIVE as GEOCODE_NEGATIVE
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,7 @@ class GeocodingService:
     def __init__(self):
         self.config = Config()
         self._nominatim = None
+        self.cache = GeocodeCache(lambda: db.engine, GeocodeCacheEntry.__table__)
     
     def get_nominatim(self):
         """Get Nominatim geocoder instance."""
@@ -62,17 +66,26 @@ class GeocodingService:
                 return None, None
             
             address_string = ', '.join(parts)
+            
+            # Shared cache (same table as app.py) before any network call
+            cached = self.cache.get(address_string, 'nominatim')
+            if cached is not None and cached != GEOCODE_NEGATIVE:
+                return cached
+            
             logger.info(f"Geocoding address: {address_string}")
             
-            # Try Nominatim first
-            result = self._geocode_nominatim(address_string)
-            if result[0] is not None:
-                return result
+            # Try Nominatim first, unless it recently had no result for this address
+            if cached is None:
+                result = self._geocode_nominatim(address_string)
+                if result[0] is not None:
+                    self.cache.put(address_string, result[0], result[1], 'nominatim')
+                    return result
             
             # Fall back to Google Maps if Nominatim fails and API key is available
-            if self.config.GOOGLE_MAPS_API_KEY:
+            if self.config.GOOGLE_MAPS_API_KEY and self.cache.get(address_string, 'google') != GEOCODE_NEGATIVE:
                 result = self._geocode_google(address_string)
                 if result[0] is not None:
+                    self.cache.put(address_string, result[0], result[1], 'google')
                     return result
             
             logger.warning(f"Failed to geocode address: {address_string}")
@@ -92,6 +105,7 @@ class GeocodingService:
                 logger.info(f"Nominatim geocoding successful: {location.latitude}, {location.longitude}")
                 return location.latitude, location.longitude
             
+            self.cache.put_miss(address_string, 'nominatim')
             return None, None
             
         except GeocoderTimedOut:
@@ -129,6 +143,8 @@ class GeocodingService:
                 return location["lat"], location["lng"]
             
             logger.warning(f"Google geocoding returned status: {data.get('status')}")
+            if data.get("status") == "ZERO_RESULTS":
+                self.cache.put_miss(address_string, 'google')
             return None, None
             
         except Exception as e:
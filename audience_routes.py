@@ -693,7 +693,7 @@ def register_audience_routes(app, db):
     
     @app.route('/api/audiences/<int:audience_id>/send-reminders', methods=['POST'])
     def send_audience_reminders(audience_id):
-        """Send reminder emails to all members of an audience"""
+        """Queue reminder emails for all members of an audience (202 with the email batch ID)"""
         try:
             data = request.get_json()
             
@@ -719,65 +719,29 @@ def register_audience_routes(app, db):
                 }
                 users_for_reminder.append(user_data)
             
-            # Use existing bulk reminder endpoint logic
-            send_reminder_email = app_module.send_reminder_email
-            
-            results = {
-                'total_users': len(users_for_reminder),
-                'successful_sends': 0,
-                'failed_sends': 0,
-                'results': []
-            }
-            
-            for user_data in users_for_reminder:
-                try:
-                    result = send_reminder_email(
-                        to_email=user_data['to_email'],
-                        username=user_data['username'],
-                        survey_code=user_data['survey_code'],
-                        firstname=user_data.get('firstname'),
-                        organization_name=user_data.get('organization_name'),
-                        days_remaining=user_data.get('days_remaining'),
-                        organization_id=user_data.get('organization_id')
-                    )
-                    
-                    if result['success']:
-                        results['successful_sends'] += 1
-                        results['results'].append({
-                            'user': user_data['username'],
-                            'email': user_data['to_email'],
-                            'success': True
-                        })
-                    else:
-                        results['failed_sends'] += 1
-                        results['results'].append({
-                            'user': user_data['username'],
-                            'email': user_data['to_email'],
-                            'success': False,
-                            'error': result.get('error')
-                        })
-                        
-                except Exception as e:
-                    logger.error(f"Error sending reminder to {user_data['username']}: {str(e)}")
-                    results['failed_sends'] += 1
-                    results['results'].append({
-                        'user': user_data['username'],
-                        'email': user_data['to_email'],
-                        'success': False,
-                        'error': str(e)
-                    })
-            
-            success_rate = (results['successful_sends'] / results['total_users'] * 100) if results['total_users'] > 0 else 0
+            # Queue in the shared email outbox; the dispatcher sends them in the background
+            email_outbox = app_module.email_outbox
+            batch_id = email_outbox.enqueue('reminder', [{
+                'recipient': user_data['to_email'],
+                'payload': user_data
+            } for user_data in users_for_reminder])
+            db.session.commit()
+            email_outbox.wake()
             
-            logger.info(f"Sent reminders to audience {audience_id}: {results['successful_sends']}/{results['total_users']} successful")
+            logger.info(f"Queued {len(users_for_reminder)} reminders for audience {audience_id} (batch {batch_id})")
             
             return jsonify({
-                'message': f'Reminders sent: {results["successful_sends"]} successful, {results["failed_sends"]} failed',
-                'success_rate': round(success_rate, 1),
-                'results': results
-            }), 200
+                'message': f'Reminders queued: {len(users_for_reminder)}',
+                'batch_id': batch_id,
+                'status_url': f'/api/email-batches/{batch_id}',
+                'results': {
+                    'total_users': len(users_for_reminder),
+                    'queued': len(users_for_reminder)
+                }
+            }), 202
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error sending audience reminders: {str(e)}")
             logger.error(traceback.format_exc())
             return jsonify({'error': f'Failed to send audience reminders: {str(e)}'}), 500
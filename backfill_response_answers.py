@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Backfill the normalized response_answers table from the answers JSON columns
+of survey_responses (v1) and survey_responses_v2 (v2).
+
+Safe to re-run: every response's rows are replaced, not appended.
+
+Usage:
+    python backfill_response_answers.py                # both versions
+    python backfill_response_answers.py --version v1   # only survey_responses
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from app import app, db, SurveyResponse, SurveyResponseV2, ResponseAnswer
+from response_answer_store import VERSION_V1, VERSION_V2, backfill_response_answers
+
+
+def backfill(versions, batch_size):
+    """Create the table if needed and rebuild rows for the requested versions."""
+    try:
+        with app.app_context():
+            ResponseAnswer.__table__.create(db.engine, checkfirst=True)
+
+            if VERSION_V1 in versions:
+                processed, written = backfill_response_answers(
+                    db.session, ResponseAnswer, SurveyResponse, VERSION_V1,
+                    lambda r: r.template.questions if r.template else None,
+                    batch_size=batch_size,
+                )
+                print(f"v1: {processed} responses -> {written} answer rows")
+
+            if VERSION_V2 in versions:
+                processed, written = backfill_response_answers(
+                    db.session, ResponseAnswer, SurveyResponseV2, VERSION_V2,
+                    lambda r: r.survey.questions if r.survey else None,
+                    batch_size=batch_size,
+                )
+                print(f"v2: {processed} responses -> {written} answer rows")
+
+            print("✅ Backfill completed successfully!")
+            return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error during backfill: {str(e)}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill response_answers from survey response JSON')
+    parser.add_argument('--version', choices=[VERSION_V1, VERSION_V2, 'all'], default='all',
+                        help='Which response table to backfill')
+    parser.add_argument('--batch-size', type=int, default=500, help='Responses per commit')
+    args = parser.parse_args()
+
+    versions = [VERSION_V1, VERSION_V2] if args.version == 'all' else [args.version]
+    return backfill(versions, args.batch_size)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,345 @@
+"""batch_geocoder.py
+
+Resumable, rate-limited backfill of ``geo_locations`` coordinates behind
+``POST /api/geocode/batch-update``.
+
+The old endpoint geocoded rows one at a time inside the HTTP request, slept 0.5 s between
+them, re-fetched every ``GeoLocation`` by ID and committed per row. ``BatchGeocoder``
+instead:
+
+1. records a job row (``geocode_batch_jobs``) and returns its ID immediately;
+2. walks the rows still at 0/0 in ``id`` order, ``chunk_size`` at a time, on a background
+   thread;
+3. de-duplicates identical (normalized) addresses within a chunk and answers what it can
+   from ``GeocodeCache``;
+4. geocodes the remaining addresses on a bounded thread pool, each call first taking a
+   token from the provider's ``TokenBucket`` so the pool size never exceeds the provider's
+   rate limit;
+5. writes the chunk's coordinates with one bulk UPDATE and advances the job's
+   ``last_geo_location_id`` cursor in the same transaction.
+
+Because the cursor moves past rows that could not be geocoded, a job never loops on
+unresolvable addresses, and a failed or interrupted job can be resumed from its cursor by
+posting its ``job_id`` again.
+
+Providers are plain callables ``components -> (lat, lng)`` (``(None, None)`` for no
+result) registered with a requests-per-second rate. ``FakeGeocodeProvider`` answers
+locally with deterministic coordinates so the whole pipeline can be exercised without
+network access or API keys.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from geocode_pipeline import NEGATIVE, address_from_components, normalize_address
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# A job still "active" without progress for this long belongs to a thread that died.
+STALE_JOB_AFTER = timedelta(minutes=30)
+
+GEO_COMPONENT_FIELDS = ('address_line1', 'address_line2', 'town', 'city', 'province', 'postal_code', 'country')
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+
+class GeocodeProvider:
+    """A geocoding callable plus the rate limit it has to respect.
+
+    One bucket per provider is shared by every job, so two concurrent backfills cannot
+    together exceed the provider's limit. Set ``caches_results`` when ``geocode_fn``
+    already writes ``GeocodeCache`` itself (it alone can tell a definitive "no results"
+    from a timeout), so ``BatchGeocoder`` does not write the cache a second time.
+
+    ``geocode_fn`` should make a single request and raise on transient errors: failed
+    calls are retried here, up to ``max_attempts`` in all, each attempt taking its own
+    token so retries count against the rate limit too.
+    """
+
+    def __init__(self, name: str, geocode_fn: Callable, rate: float, burst: Optional[float] = None,
+                 caches_results: bool = False, max_attempts: int = 1):
+        self.name = name
+        self.geocode_fn = geocode_fn
+        self.bucket = TokenBucket(rate, burst)
+        self.caches_results = caches_results
+        self.max_attempts = max(1, max_attempts)
+
+    def geocode(self, components: Dict) -> Tuple:
+        for attempt in range(1, self.max_attempts + 1):
+            self.bucket.acquire()
+            try:
+                result = self.geocode_fn(components)
+                break
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"{self.name} lookup failed on attempt {attempt}, retrying: {str(e)}")
+        if not result or result[0] is None or result[1] is None:
+            return NEGATIVE
+        return float(result[0]), float(result[1])
+
+
+class FakeGeocodeProvider:
+    """Local stand-in for a geocoding service, for tests and dry runs.
+
+    Coordinates are derived from a hash of the normalized address, so the same address
+    always maps to the same point. Addresses containing any of ``unresolvable`` return no
+    result, and ``latency`` simulates the network round-trip. ``calls`` counts lookups.
+    """
+
+    def __init__(self, latency: float = 0.0, unresolvable: Tuple[str, ...] = ()):
+        self.latency = latency
+        self.unresolvable = tuple(s.lower() for s in unresolvable)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, components: Dict) -> Tuple:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        normalized = normalize_address(components)
+        if not normalized or any(s in normalized for s in self.unresolvable):
+            return NEGATIVE
+        digest = hashlib.sha1(normalized.encode('utf-8')).digest()
+        lat = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF * 170.0 - 85.0
+        lng = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF * 360.0 - 180.0
+        return round(lat, 6), round(lng, 6)
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+class BatchGeocoder:
+    """Queue, run, resume and look up geocoding backfill jobs for one Flask app.
+
+    ``providers`` maps provider name -> ``GeocodeProvider``; ``cache`` is the shared
+    ``GeocodeCache`` (or ``None`` to always ask the provider).
+    """
+
+    def __init__(self, app, db, job_model, geo_location_model, providers: Dict[str, GeocodeProvider],
+                 cache=None, max_workers: int = 4, chunk_size: int = 200):
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.geo_location_model = geo_location_model
+        self.providers = providers
+        self.cache = cache
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def ensure_table(self) -> None:
+        if not self._table_ready:
+            self.job_model.__table__.create(self.db.engine, checkfirst=True)
+            self._table_ready = True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get_job(self, job_id: str):
+        return self.job_model.query.get(job_id)
+
+    def _is_stale(self, job) -> bool:
+        last_progress = job.updated_at or job.created_at
+        with self._lock:
+            thread = self._threads.get(job.id)
+        if thread is not None and thread.is_alive():
+            return False
+        return last_progress is None or datetime.utcnow() - last_progress > STALE_JOB_AFTER
+
+    def _missing_coordinates_filter(self):
+        model = self.geo_location_model
+        return (
+            or_(model.latitude == 0, model.latitude.is_(None)),
+            or_(model.longitude == 0, model.longitude.is_(None)),
+        )
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def submit(self, provider: str = 'nominatim', limit: Optional[int] = None, resume_job_id: Optional[str] = None):
+        """Start a new job, or resume ``resume_job_id`` from its cursor. Commits.
+
+        Raises ``ValueError`` for an unknown provider/job or a job that cannot be resumed.
+        """
+        self.ensure_table()
+        if resume_job_id:
+            job = self.get_job(resume_job_id)
+            if job is None:
+                raise ValueError(f"Geocode job {resume_job_id} not found")
+            if job.status == JOB_COMPLETED:
+                raise ValueError(f"Geocode job {resume_job_id} has already completed")
+            if job.status in ACTIVE_STATUSES and not self._is_stale(job):
+                return job
+            job.status = JOB_QUEUED
+            job.error = None
+            job.finished_at = None
+        else:
+            if provider not in self.providers:
+                raise ValueError(f"Unknown geocoding provider '{provider}'")
+            total = self.geo_location_model.query.filter(*self._missing_coordinates_filter()).count()
+            job = self.job_model(
+                status=JOB_QUEUED,
+                provider=provider,
+                row_limit=limit,
+                total=min(total, limit) if limit else total,
+            )
+            self.db.session.add(job)
+        self.db.session.commit()
+
+        thread = threading.Thread(target=self._run, args=(job.id,), name=f'geocode-batch-{job.id[:8]}', daemon=True)
+        with self._lock:
+            self._threads[job.id] = thread
+        thread.start()
+        return job
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _next_chunk(self, after_id: int, size: int) -> List:
+        model = self.geo_location_model
+        columns = [getattr(model, field) for field in GEO_COMPONENT_FIELDS]
+        return self.db.session.query(model.id, *columns) \
+            .filter(model.id > after_id, *self._missing_coordinates_filter()) \
+            .order_by(model.id) \
+            .limit(size) \
+            .all()
+
+    def _resolve(self, provider: GeocodeProvider, pending: Dict[str, Dict], executor) -> Dict[str, Tuple]:
+        """normalized address -> coordinates (or ``NEGATIVE``) for every pending address."""
+        resolved = {}
+        if self.cache is not None:
+            resolved.update(self.cache.get_many(pending, provider.name))
+        misses = [normalized for normalized in pending if normalized not in resolved]
+        if not misses:
+            return resolved
+
+        def lookup(normalized):
+            try:
+                return normalized, provider.geocode(pending[normalized]['components'])
+            except Exception as e:
+                logger.warning(f"Geocoding '{normalized}' via {provider.name} failed: {str(e)}")
+                return normalized, None  # transient: neither cached nor counted as a definitive miss
+
+        for normalized, coordinates in executor.map(lookup, misses):
+            if coordinates is None:
+                continue
+            resolved[normalized] = coordinates
+            if self.cache is not None and not provider.caches_results:
+                if coordinates == NEGATIVE:
+                    self.cache.put_miss(normalized, provider.name)
+                else:
+                    self.cache.put(normalized, coordinates[0], coordinates[1], provider.name)
+        return resolved
+
+    def _run(self, job_id: str) -> None:
+        with self.app.app_context():
+            session = self.db.session
+            job_model = self.job_model
+            try:
+                job = self.get_job(job_id)
+                provider = self.providers[job.provider]
+                job.status = JOB_RUNNING
+                job.started_at = job.started_at or datetime.utcnow()
+                job.updated_at = datetime.utcnow()
+                session.commit()
+
+                with ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix=f'geocode-{job.provider}') as executor:
+                    while True:
+                        size = self.chunk_size
+                        if job.row_limit:
+                            size = min(size, job.row_limit - (job.processed or 0))
+                            if size <= 0:
+                                break
+                        rows = self._next_chunk(job.last_geo_location_id or 0, size)
+                        if not rows:
+                            break
+
+                        pending: Dict[str, Dict] = {}
+                        for row in rows:
+                            components = {field: getattr(row, field) for field in GEO_COMPONENT_FIELDS}
+                            normalized = normalize_address(address_from_components(components))
+                            if not normalized:
+                                continue
+                            entry = pending.setdefault(normalized, {'components': components, 'ids': []})
+                            entry['ids'].append(row.id)
+                        session.rollback()  # release the connection while the pool works
+
+                        resolved = self._resolve(provider, pending, executor)
+                        updates = []
+                        for normalized, entry in pending.items():
+                            coordinates = resolved.get(normalized)
+                            if coordinates and coordinates != NEGATIVE:
+                                updates.extend(
+                                    {'id': geo_id, 'latitude': coordinates[0], 'longitude': coordinates[1]}
+                                    for geo_id in entry['ids']
+                                )
+
+                        if updates:
+                            session.bulk_update_mappings(self.geo_location_model, updates)
+                        job = self.get_job(job_id)
+                        job.processed = (job.processed or 0) + len(rows)
+                        job.updated = (job.updated or 0) + len(updates)
+                        job.failed = (job.failed or 0) + len(rows) - len(updates)
+                        job.unique_addresses = (job.unique_addresses or 0) + len(pending)
+                        job.last_geo_location_id = rows[-1].id
+                        job.updated_at = datetime.utcnow()
+                        session.commit()
+
+                job.status = JOB_COMPLETED
+                job.finished_at = datetime.utcnow()
+                job.updated_at = job.finished_at
+                session.commit()
+                logger.info(f"Geocode job {job_id} completed: {job.updated} updated, {job.failed} failed")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Geocode job {job_id} failed: {str(e)}")
+                try:
+                    job_model.query.filter(job_model.id == job_id).update({
+                        'status': JOB_FAILED,
+                        'error': str(e)[:2000],
+                        'finished_at': datetime.utcnow(),
+                    }, synchronize_session=False)
+                    session.commit()
+                except Exception as status_error:
+                    session.rollback()
+                    logger.error(f"Could not record failure of geocode job {job_id}: {str(status_error)}")
+            finally:
+                with self._lock:
+                    self._threads.pop(job_id, None)
+                self.db.session.remove()
+
+
+__all__ = [
+    'JOB_QUEUED',
+    'JOB_RUNNING',
+    'JOB_COMPLETED',
+    'JOB_FAILED',
+    'GeocodeProvider',
+    'FakeGeocodeProvider',
+    'BatchGeocoder',
+]
@@ -0,0 +1,330 @@
+"""comparison_aggregates.py
+
+Incrementally maintained per-question statistics for ``/api/survey-responses/compare-by-template``.
+
+Peer averages used to be recomputed on every call by loading every completed
+``SurveyResponse`` and re-parsing its answers. Instead, each completed response adds its
+numeric answers to a ``question_aggregates`` row keyed by *(question signature,
+organization type)* holding count, sum, sum of squares and min/max. A comparison then
+reads one grouped row per question.
+
+A *question signature* identifies "the same question" across templates: a SHA-1 of the
+normalised question text plus ``question_type_id``. Answers are mapped to signatures via
+the response's own template, so copies of a template (which keep the question text but
+may renumber IDs) aggregate together.
+
+The same signatures back the ``question_signature_index`` table (signature -> template
+IDs) so finding templates that share questions with a given template is one indexed
+``GROUP BY`` instead of parsing every template's questions JSON.
+
+Min/max cannot be decremented; when a previously counted value is removed the row is
+flagged ``bounds_stale`` until the next ``rebuild_question_aggregates`` run. Averages and
+standard deviations are always exact.
+
+As with ``response_answer_store`` the SQLAlchemy session and models are passed in.
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from response_answer_store import extract_numeric_value
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+# ---------------------------------------------------------------------------
+# Signatures
+# ---------------------------------------------------------------------------
+
+def normalize_question_text(text) -> str:
+    """Lower-case, trim and collapse whitespace so cosmetic edits keep the signature."""
+    return _WHITESPACE_RE.sub(' ', str(text or '')).strip().lower()
+
+
+def question_signature(question_text, question_type_id) -> str:
+    """Stable 40-char hash of normalised question text plus question type."""
+    key = f"{normalize_question_text(question_text)}|{question_type_id if question_type_id is not None else ''}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _parse_json(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def signature_lookup(questions) -> Dict[str, str]:
+    """Map ``str(question id)`` -> signature for a template question list."""
+    lookup = {}
+    for q in _parse_json(questions) or []:
+        if not isinstance(q, dict) or q.get('id') is None:
+            continue
+        lookup[str(q['id'])] = question_signature(q.get('question_text', ''), q.get('question_type_id', ''))
+    return lookup
+
+
+def response_contributions(answers, questions) -> List[Tuple[str, float]]:
+    """``(signature, value)`` pairs a response adds to the aggregates."""
+    answers = _parse_json(answers)
+    if not isinstance(answers, dict):
+        return []
+    lookup = signature_lookup(questions)
+    pairs = []
+    for key, answer in answers.items():
+        signature = lookup.get(str(key))
+        if signature is None:
+            continue
+        value = extract_numeric_value(answer)
+        if value is not None and math.isfinite(value):
+            pairs.append((signature, value))
+    return pairs
+
+
+# ---------------------------------------------------------------------------
+# Signature index (signature -> template IDs)
+# ---------------------------------------------------------------------------
+
+def index_template_signatures(db_session, index_model, template_id: int, questions) -> int:
+    """Replace the indexed signatures of one template. Does not commit."""
+    db_session.query(index_model).filter(
+        index_model.template_id == template_id
+    ).delete(synchronize_session=False)
+
+    signatures = set(signature_lookup(questions).values())
+    if signatures:
+        db_session.bulk_insert_mappings(index_model, [
+            {'signature': signature, 'template_id': template_id} for signature in signatures
+        ])
+    return len(signatures)
+
+
+def drop_template_signatures(db_session, index_model, template_ids: Iterable[int]) -> None:
+    """Remove deleted templates from the index. Does not commit."""
+    template_ids = list(template_ids)
+    if template_ids:
+        db_session.query(index_model).filter(
+            index_model.template_id.in_(template_ids)
+        ).delete(synchronize_session=False)
+
+
+def templates_sharing_signatures(db_session, index_model, signatures: Iterable[str]) -> Dict[int, int]:
+    """Map template_id -> number of the given signatures it contains (only matches > 0)."""
+    signatures = list(set(signatures))
+    if not signatures:
+        return {}
+    rows = db_session.query(
+        index_model.template_id,
+        func.count(index_model.signature),
+    ).filter(
+        index_model.signature.in_(signatures)
+    ).group_by(index_model.template_id).all()
+    return {template_id: int(count) for template_id, count in rows}
+
+
+def rebuild_signature_index(db_session, index_model, template_model) -> Tuple[int, int]:
+    """Re-index every template and commit. Returns ``(templates, index_rows)``."""
+    db_session.query(index_model).delete(synchronize_session=False)
+    templates = 0
+    rows = 0
+    for template_id, questions in db_session.query(template_model.id, template_model.questions).all():
+        rows += index_template_signatures(db_session, index_model, template_id, questions)
+        templates += 1
+    db_session.commit()
+    return templates, rows
+
+
+# ---------------------------------------------------------------------------
+# Write path
+# ---------------------------------------------------------------------------
+
+def _upsert_deltas(db_session, aggregate_model, organization_type: str, removed, added) -> None:
+    removed_by_sig = defaultdict(Counter)
+    added_by_sig = defaultdict(Counter)
+    for signature, value in removed:
+        removed_by_sig[signature][value] += 1
+    for signature, value in added:
+        added_by_sig[signature][value] += 1
+
+    rows = []
+    for signature in set(removed_by_sig) | set(added_by_sig):
+        # Values present both before and after cancel out (e.g. re-saving a completed survey)
+        gone = removed_by_sig[signature] - added_by_sig[signature]
+        new = added_by_sig[signature] - removed_by_sig[signature]
+        if not gone and not new:
+            continue
+        new_values = list(new.elements())
+        gone_values = list(gone.elements())
+        rows.append({
+            'signature': signature,
+            'organization_type': organization_type or '',
+            'value_count': len(new_values) - len(gone_values),
+            'value_sum': sum(new_values) - sum(gone_values),
+            'value_sum_squares': sum(v * v for v in new_values) - sum(v * v for v in gone_values),
+            'min_value': min(new_values) if new_values else None,
+            'max_value': max(new_values) if new_values else None,
+            'bounds_stale': bool(gone_values),
+        })
+    if not rows:
+        return
+
+    table = aggregate_model.__table__
+    stmt = mysql_insert(table).values(rows)
+    stmt = stmt.on_duplicate_key_update(
+        value_count=table.c.value_count + stmt.inserted.value_count,
+        value_sum=table.c.value_sum + stmt.inserted.value_sum,
+        value_sum_squares=table.c.value_sum_squares + stmt.inserted.value_sum_squares,
+        min_value=func.least(
+            func.coalesce(table.c.min_value, stmt.inserted.min_value),
+            func.coalesce(stmt.inserted.min_value, table.c.min_value),
+        ),
+        max_value=func.greatest(
+            func.coalesce(table.c.max_value, stmt.inserted.max_value),
+            func.coalesce(stmt.inserted.max_value, table.c.max_value),
+        ),
+        bounds_stale=func.greatest(table.c.bounds_stale, stmt.inserted.bounds_stale),
+    )
+    db_session.execute(stmt)
+
+
+def record_response_change(db_session, aggregate_model, organization_type: str,
+                           before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Apply the difference between two snapshots of one response. Does not commit.
+
+    A snapshot is ``{'answers': ..., 'questions': ..., 'completed': bool}`` (or ``None``
+    for "did not exist"). Only completed responses contribute to the aggregates.
+    """
+    removed = []
+    added = []
+    if before and before.get('completed'):
+        removed = response_contributions(before.get('answers'), before.get('questions'))
+    if after and after.get('completed'):
+        added = response_contributions(after.get('answers'), after.get('questions'))
+    if removed or added:
+        _upsert_deltas(db_session, aggregate_model, organization_type, removed, added)
+
+
+def rebuild_question_aggregates(db_session, aggregate_model, response_model, questions_for,
+                                organization_type_for, batch_size: int = 500) -> Tuple[int, int]:
+    """Recompute the whole table from completed responses and commit.
+
+    ``questions_for(response)`` returns the response's template questions and
+    ``organization_type_for(response)`` its organization type name.
+    Returns ``(responses_processed, aggregate_rows)``.
+    """
+    totals = defaultdict(lambda: [0, 0.0, 0.0, None, None])
+    processed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db_session.query(response_model)
+            .filter(response_model.id > last_id, response_model.status == 'completed')
+            .order_by(response_model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for response in batch:
+            org_type = organization_type_for(response) or ''
+            for signature, value in response_contributions(response.answers, questions_for(response)):
+                entry = totals[(signature, org_type)]
+                entry[0] += 1
+                entry[1] += value
+                entry[2] += value * value
+                entry[3] = value if entry[3] is None else min(entry[3], value)
+                entry[4] = value if entry[4] is None else max(entry[4], value)
+        processed += len(batch)
+        last_id = batch[-1].id
+        db_session.expunge_all()
+
+    db_session.query(aggregate_model).delete(synchronize_session=False)
+    rows = [{
+        'signature': signature,
+        'organization_type': org_type,
+        'value_count': count,
+        'value_sum': total,
+        'value_sum_squares': squares,
+        'min_value': low,
+        'max_value': high,
+        'bounds_stale': False,
+    } for (signature, org_type), (count, total, squares, low, high) in totals.items()]
+    if rows:
+        db_session.bulk_insert_mappings(aggregate_model, rows)
+    db_session.commit()
+    return processed, len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Read path
+# ---------------------------------------------------------------------------
+
+def peer_statistics(db_session, aggregate_model, signatures: Iterable[str],
+                    organization_type: Optional[str] = None,
+                    exclude: Optional[Iterable[Tuple[str, float]]] = None) -> Dict[str, Dict]:
+    """Per-signature count/avg/stddev/min/max, optionally minus one response's values.
+
+    ``organization_type=None`` sums across all organization types. ``exclude`` takes the
+    ``response_contributions`` of the response being compared so it is not its own peer.
+    """
+    signatures = list(set(signatures))
+    if not signatures:
+        return {}
+
+    query = db_session.query(
+        aggregate_model.signature,
+        func.sum(aggregate_model.value_count),
+        func.sum(aggregate_model.value_sum),
+        func.sum(aggregate_model.value_sum_squares),
+        func.min(aggregate_model.min_value),
+        func.max(aggregate_model.max_value),
+    ).filter(aggregate_model.signature.in_(signatures))
+    if organization_type is not None:
+        query = query.filter(aggregate_model.organization_type == organization_type)
+    rows = query.group_by(aggregate_model.signature).all()
+
+    excluded = defaultdict(list)
+    for signature, value in exclude or []:
+        excluded[signature].append(value)
+
+    stats = {}
+    for signature, count, total, squares, low, high in rows:
+        count = int(count or 0) - len(excluded[signature])
+        total = float(total or 0) - sum(excluded[signature])
+        squares = float(squares or 0) - sum(v * v for v in excluded[signature])
+        if count <= 0:
+            continue
+        mean = total / count
+        variance = max(squares / count - mean * mean, 0.0)
+        stats[signature] = {
+            'count': count,
+            'avg': mean,
+            'stddev': math.sqrt(variance),
+            'min': float(low) if low is not None else None,
+            'max': float(high) if high is not None else None,
+        }
+    return stats
+
+
+__all__ = [
+    'normalize_question_text',
+    'question_signature',
+    'signature_lookup',
+    'response_contributions',
+    'index_template_signatures',
+    'drop_template_signatures',
+    'templates_sharing_signatures',
+    'rebuild_signature_index',
+    'record_response_change',
+    'rebuild_question_aggregates',
+    'peer_statistics',
+]
@@ -0,0 +1,265 @@
+"""email_delivery.py
+
+Connection reuse, rate limiting and concurrency for outgoing email.
+
+Every ``send_*_email_smtp`` helper used to open a new ``smtplib.SMTP`` connection, run
+STARTTLS and log in for a single message, ``get_ses_client()`` built a new boto3 client per
+call, and bulk sends walked their recipients one at a time. This module provides:
+
+* ``SMTPConnectionPool`` -- up to ``size`` authenticated connections that are reused across
+  messages (and threads), recycled after ``max_messages`` or ``idle_timeout``, and replaced
+  transparently when the server has dropped them;
+* ``shared_ses_client`` -- one process-wide SES client (boto3 clients are thread-safe)
+  wrapped so ``send_email``/``send_raw_email`` respect the account's send rate;
+* ``deliver_all`` -- runs a send function for many recipients on a bounded thread pool
+  and returns one result dict per recipient, in input order.
+
+Both transports take a token from their own ``TokenBucket`` before each message, so the
+pool size can be raised for throughput without exceeding the provider quota.
+
+Configuration (environment): ``SES_SMTP_HOST``/``SES_SMTP_PORT``/``SES_SMTP_USERNAME``/
+``SES_SMTP_PASSWORD`` as before, plus ``EMAIL_SMTP_STARTTLS`` (default 1),
+``EMAIL_SMTP_POOL_SIZE`` (4), ``EMAIL_SMTP_RATE`` and ``EMAIL_SES_RATE`` (messages/second,
+default 14, the SES default quota) and ``EMAIL_WORKERS`` (8). To try it locally against a
+stand-in server::
+
+    python -m aiosmtpd -n -l localhost:8025
+    SES_SMTP_HOST=localhost SES_SMTP_PORT=8025 EMAIL_SMTP_STARTTLS=0 python app.py
+
+(login is skipped when the server does not advertise AUTH).
+"""
+
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv('EMAIL_WORKERS', '8'))
+DEFAULT_SES_RATE = float(os.getenv('EMAIL_SES_RATE', '14'))
+
+# Failures that mean the connection (not the message) is bad; the send is retried once
+# on a fresh connection.
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+# ---------------------------------------------------------------------------
+# SMTP
+# ---------------------------------------------------------------------------
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections shared by all threads."""
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, size: int = 4, timeout: float = 30.0, max_messages: int = 100,
+                 idle_timeout: float = 60.0, rate: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.bucket = TokenBucket(rate) if rate else None
+        self._idle: queue.LifoQueue = queue.LifoQueue()  # (server, messages_sent, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+        self.stats = {'connections_opened': 0, 'reconnects': 0, 'sent': 0, 'failed': 0}
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.username and server.has_extn('auth'):
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self.stats['connections_opened'] += 1
+        return server
+
+    @staticmethod
+    def _close(server) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, sent, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect(), 0
+                if time.monotonic() - last_used < self.idle_timeout:
+                    return server, sent
+                self._close(server)  # the server has probably timed it out already
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, server, sent: int, healthy: bool) -> None:
+        if healthy and sent < self.max_messages:
+            self._idle.put((server, sent, time.monotonic()))
+        else:
+            self._close(server)
+        self._slots.release()
+
+    def send(self, from_addr: str, to_addrs, message: str) -> None:
+        """Send one message; raises the ``smtplib`` error if it cannot be delivered."""
+        if self.bucket is not None:
+            self.bucket.acquire()
+        for attempt in (1, 2):
+            server, sent = self._checkout()
+            try:
+                server.sendmail(from_addr, to_addrs, message)
+            except _CONNECTION_ERRORS as e:
+                self._checkin(server, sent, healthy=False)
+                if attempt == 2:
+                    self.stats['failed'] += 1
+                    raise
+                self.stats['reconnects'] += 1
+                logger.warning(f"SMTP connection lost ({str(e)}); retrying on a new connection")
+                continue
+            except Exception:
+                # Message-level rejection (e.g. recipient refused); the connection is still usable
+                self._checkin(server, sent + 1, healthy=True)
+                self.stats['failed'] += 1
+                raise
+            self._checkin(server, sent + 1, healthy=True)
+            self.stats['sent'] += 1
+            return
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+_smtp_pool = None
+_smtp_pool_key = None
+_smtp_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """The process-wide pool for the ``SES_SMTP_*`` settings (rebuilt if they change)."""
+    global _smtp_pool, _smtp_pool_key
+    key = (
+        os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com'),
+        int(os.getenv('SES_SMTP_PORT', '587')),
+        os.getenv('SES_SMTP_USERNAME'),
+        os.getenv('SES_SMTP_PASSWORD'),
+        os.getenv('EMAIL_SMTP_STARTTLS', '1').lower() in ('1', 'true', 'yes'),
+    )
+    with _smtp_pool_lock:
+        if _smtp_pool is None or _smtp_pool_key != key:
+            if _smtp_pool is not None:
+                _smtp_pool.close()
+            host, port, username, password, starttls = key
+            _smtp_pool = SMTPConnectionPool(
+                host, port, username, password, starttls=starttls,
+                size=int(os.getenv('EMAIL_SMTP_POOL_SIZE', '4')),
+                rate=float(os.getenv('EMAIL_SMTP_RATE', '14')),
+            )
+            _smtp_pool_key = key
+        return _smtp_pool
+
+
+# ---------------------------------------------------------------------------
+# SES
+# ---------------------------------------------------------------------------
+
+class ThrottledSESClient:
+    """Proxy for a boto3 SES client that rate-limits the send calls."""
+
+    def __init__(self, client, rate: float = DEFAULT_SES_RATE):
+        self._client = client
+        self.bucket = TokenBucket(rate)
+
+    def send_email(self, **kwargs):
+        self.bucket.acquire()
+        return self._client.send_email(**kwargs)
+
+    def send_raw_email(self, **kwargs):
+        self.bucket.acquire()
+        return self._client.send_raw_email(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_ses_client = None
+_ses_client_lock = threading.Lock()
+
+
+def shared_ses_client(factory: Callable, rate: float = DEFAULT_SES_RATE):
+    """Build the SES client once with ``factory()``; ``None`` results are not cached."""
+    global _ses_client
+    if _ses_client is not None:
+        return _ses_client
+    with _ses_client_lock:
+        if _ses_client is None:
+            client = factory()
+            if client is None:
+                return None
+            _ses_client = ThrottledSESClient(client, rate)
+        return _ses_client
+
+
+# ---------------------------------------------------------------------------
+# Concurrent delivery
+# ---------------------------------------------------------------------------
+
+def deliver_all(items: Iterable, send_fn: Callable, max_workers: int = DEFAULT_WORKERS,
+                context: Optional[Callable] = None) -> List[Dict]:
+    """Call ``send_fn(item)`` for every item on a bounded pool; results in input order.
+
+    ``send_fn`` returns the usual ``{'success': ..., 'error'/'method'/...}`` dict; an
+    exception becomes ``{'success': False, 'error': str(e)}`` for that item only.
+    ``context`` (e.g. ``app.app_context``) is entered around each call so senders can use
+    the database from worker threads.
+    """
+    items = list(items)
+
+    def run(item):
+        try:
+            if context is not None:
+                with context():
+                    return send_fn(item)
+            return send_fn(item)
+        except Exception as e:
+            logger.error(f"Email delivery failed: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='email') as executor:
+        return list(executor.map(run, items))
+
+
+__all__ = [
+    'SMTPConnectionPool',
+    'get_smtp_pool',
+    'ThrottledSESClient',
+    'shared_ses_client',
+    'deliver_all',
+]
@@ -0,0 +1,274 @@
+"""email_outbox.py
+
+Database-backed outbox for emails sent by bulk endpoints.
+
+Bulk routes (reminders, audience reminders, survey-v2 invites, user upload, survey
+assignment) used to send every email inside the request, holding a gunicorn worker for
+minutes. They now add one ``email_outbox`` row per recipient -- in the same transaction
+as their own writes, so an invitation and its email are committed together -- and return
+``202`` with the batch ID.
+
+``EmailOutbox`` runs a dispatcher thread per process that:
+
+1. claims due rows (``pending`` and ``next_attempt_at <= now``, or ``sending`` rows whose
+   lease expired because a worker died) with ``SELECT ... FOR UPDATE SKIP LOCKED``, so
+   several gunicorn workers can dispatch from the same table without sending twice;
+2. sends them through ``email_delivery.deliver_all`` using the sender registered for the
+   row's ``kind`` (``send_fn(**payload) -> {'success': ..., 'error'/'method'/...}``);
+3. marks them ``sent``, or schedules a retry with exponential backoff
+   (``base_backoff * 2**(attempts-1)``, capped) until ``max_attempts`` is reached and the
+   row becomes ``failed``.
+
+The payload (which may contain credentials for welcome/assignment emails) is cleared once
+a message is sent or has failed permanently. ``batch_status`` reports per-recipient progress for the status endpoint.
+"""
+
+import logging
+import os
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_
+
+from email_delivery import deliver_all
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+# A row still "sending" after this long was claimed by a worker that died.
+SENDING_LEASE = timedelta(minutes=10)
+MAX_BACKOFF = timedelta(hours=1)
+
+
+def outbox_enabled() -> bool:
+    """``EMAIL_OUTBOX_ENABLED=0`` keeps the dispatcher out of scripts and shells importing the app."""
+    return os.getenv('EMAIL_OUTBOX_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def new_batch_id() -> str:
+    return str(uuid.uuid4())
+
+
+class EmailOutbox:
+    """Enqueue, dispatch and report on outbox messages for one Flask app."""
+
+    def __init__(self, app, db, model, senders: Optional[Dict[str, Callable]] = None, max_workers: int = 8,
+                 claim_size: int = 50, poll_interval: float = 5.0, max_attempts: int = 5,
+                 base_backoff: float = 30.0):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.senders: Dict[str, Callable] = dict(senders or {})
+        self.max_workers = max_workers
+        self.claim_size = claim_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def register_sender(self, kind: str, send_fn: Callable) -> None:
+        self.senders[kind] = send_fn
+
+    def ensure_table(self) -> None:
+        if not self._table_ready:
+            self.model.__table__.create(self.db.engine, checkfirst=True)
+            self._table_ready = True
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, kind: str, messages: Iterable[Dict], batch_id: Optional[str] = None) -> str:
+        """Add ``{'recipient': ..., 'payload': {...}}`` messages to the session. Does not commit.
+
+        Call ``wake()`` after the caller's commit so the dispatcher picks them up at once.
+        """
+        if kind not in self.senders:
+            raise ValueError(f"No email sender registered for '{kind}'")
+        self.ensure_table()
+        batch_id = batch_id or new_batch_id()
+        now = datetime.utcnow()
+        for message in messages:
+            self.db.session.add(self.model(
+                batch_id=batch_id,
+                kind=kind,
+                recipient=message['recipient'],
+                payload=message['payload'],
+                status=STATUS_PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+            ))
+        return batch_id
+
+    def wake(self) -> None:
+        self.start()
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def batch_status(self, batch_id: str) -> Optional[Dict]:
+        """Counts by status plus one entry per recipient; ``None`` for an unknown batch."""
+        self.ensure_table()
+        model = self.model
+        rows = self.db.session.query(
+            model.id, model.kind, model.recipient, model.status, model.attempts,
+            model.last_error, model.method, model.message_id, model.next_attempt_at,
+            model.sent_at, model.created_at,
+        ).filter(model.batch_id == batch_id).order_by(model.id).all()
+        if not rows:
+            return None
+
+        counts = {STATUS_PENDING: 0, STATUS_SENDING: 0, STATUS_SENT: 0, STATUS_FAILED: 0}
+        for row in rows:
+            counts[row.status] = counts.get(row.status, 0) + 1
+        done = counts[STATUS_SENT] + counts[STATUS_FAILED]
+        return {
+            'batch_id': batch_id,
+            'kind': rows[0].kind,
+            'total': len(rows),
+            'counts': counts,
+            'complete': done == len(rows),
+            'progress': round(done / len(rows) * 100, 1),
+            'created_at': rows[0].created_at.isoformat() if rows[0].created_at else None,
+            'recipients': [{
+                'id': row.id,
+                'recipient': row.recipient,
+                'status': row.status,
+                'attempts': row.attempts,
+                'last_error': row.last_error,
+                'method': row.method,
+                'message_id': row.message_id,
+                'next_attempt_at': row.next_attempt_at.isoformat()
+                if row.next_attempt_at and row.status == STATUS_PENDING else None,
+                'sent_at': row.sent_at.isoformat() if row.sent_at else None,
+            } for row in rows],
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the dispatcher thread for this process if it is not running.
+
+        Safe to call on every request: a thread inherited through ``fork`` is not alive in
+        the child, so each worker starts its own. Rows stay queued while the outbox is
+        disabled (``EMAIL_OUTBOX_ENABLED=0``) and go out once a serving process starts.
+        """
+        if not outbox_enabled():
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='email-outbox', daemon=True)
+                self._thread.start()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        seconds = self.base_backoff * (2 ** max(attempts - 1, 0))
+        seconds = min(seconds, MAX_BACKOFF.total_seconds())
+        return timedelta(seconds=seconds * random.uniform(0.8, 1.2))  # jitter spreads retries out
+
+    def _claim(self) -> List[Dict]:
+        """Lock and mark up to ``claim_size`` due rows as ``sending``; returns plain dicts."""
+        model = self.model
+        session = self.db.session
+        now = datetime.utcnow()
+        rows = session.query(model).filter(or_(
+            and_(model.status == STATUS_PENDING, model.next_attempt_at <= now),
+            and_(model.status == STATUS_SENDING, model.claimed_at < now - SENDING_LEASE),
+        )).order_by(model.id).limit(self.claim_size).with_for_update(skip_locked=True).all()
+
+        claimed = []
+        for row in rows:
+            row.status = STATUS_SENDING
+            row.claimed_at = now
+            claimed.append({
+                'id': row.id,
+                'kind': row.kind,
+                'recipient': row.recipient,
+                'payload': row.payload or {},
+                'attempts': row.attempts or 0,
+            })
+        session.commit()
+        return claimed
+
+    def _send(self, message: Dict) -> Dict:
+        send_fn = self.senders.get(message['kind'])
+        if send_fn is None:
+            return {'success': False, 'error': f"No email sender registered for '{message['kind']}'"}
+        return send_fn(**message['payload']) or {'success': False, 'error': 'Sender returned no result'}
+
+    def dispatch_once(self) -> int:
+        """Claim, send and record one round of due messages. Returns how many were claimed."""
+        claimed = self._claim()
+        if not claimed:
+            return 0
+
+        results = deliver_all(claimed, self._send, max_workers=self.max_workers, context=self.app.app_context)
+        now = datetime.utcnow()
+        updates = []
+        for message, result in zip(claimed, results):
+            attempts = message['attempts'] + 1
+            if result.get('success'):
+                updates.append({
+                    'id': message['id'], 'status': STATUS_SENT, 'attempts': attempts, 'sent_at': now,
+                    'method': result.get('method'), 'message_id': result.get('message_id'),
+                    'last_error': None, 'payload': None,
+                })
+                continue
+            error = str(result.get('error') or 'Unknown email error')[:2000]
+            if attempts >= self.max_attempts:
+                updates.append({'id': message['id'], 'status': STATUS_FAILED, 'attempts': attempts,
+                                'last_error': error, 'payload': None})
+                logger.error(f"Outbox message {message['id']} to {message['recipient']} failed permanently: {error}")
+            else:
+                updates.append({'id': message['id'], 'status': STATUS_PENDING, 'attempts': attempts,
+                                'last_error': error, 'next_attempt_at': now + self._backoff(attempts)})
+
+        self.db.session.bulk_update_mappings(self.model, updates)
+        self.db.session.commit()
+        sent = sum(1 for update in updates if update['status'] == STATUS_SENT)
+        logger.info(f"Email outbox dispatched {len(claimed)} messages ({sent} sent)")
+        return len(claimed)
+
+    def _loop(self) -> None:
+        while True:
+            claimed = 0
+            with self.app.app_context():
+                try:
+                    self.ensure_table()
+                    claimed = self.dispatch_once()
+                except Exception as e:
+                    self.db.session.rollback()
+                    logger.error(f"Email outbox dispatch failed: {str(e)}")
+                finally:
+                    self.db.session.remove()
+            if claimed < self.claim_size:
+                # Drained (or failed): sleep until new work is enqueued or the next retry is due
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+__all__ = [
+    'STATUS_PENDING',
+    'STATUS_SENDING',
+    'STATUS_SENT',
+    'STATUS_FAILED',
+    'outbox_enabled',
+    'new_batch_id',
+    'EmailOutbox',
+]
@@ -0,0 +1,194 @@
+"""email_templates.py
+
+Compiled, cached email templates.
+
+Every send used to resolve its template with up to five ``ilike``/exact-name queries
+(``get_email_template_by_type_and_organization``) and render it with one ``str.replace``
+pass over the whole body per variable. Bulk sends repeated both for every recipient.
+
+* ``compile_template`` tokenizes a body once into literal and ``{{variable}}`` segments;
+  ``render`` is then a single ``''.join`` pass. Placeholders without a value are left in
+  place, as before, and substituted values are never re-scanned for placeholders.
+* ``EmailTemplateCache`` keeps a detached snapshot (``CachedEmailTemplate``) of each
+  template by ID, and memoizes the *(type, organization_id) -> template ID* resolution,
+  including "not found".
+
+Entries expire after ``ttl`` seconds (``EMAIL_TEMPLATE_CACHE_TTL``, default 300) so edits
+made through another worker process are picked up; the process that saves, updates or
+deletes a template calls ``invalidate()`` and sees the change immediately.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER_RE = re.compile(r'\{\{([^{}]+?)\}\}')
+
+DEFAULT_TTL = float(os.getenv('EMAIL_TEMPLATE_CACHE_TTL', '300'))
+
+
+# ---------------------------------------------------------------------------
+# Compilation / rendering
+# ---------------------------------------------------------------------------
+
+class CompiledTemplate:
+    """A template body split into literal strings and ``(name, raw_placeholder)`` pairs."""
+
+    __slots__ = ('segments',)
+
+    def __init__(self, segments: Tuple):
+        self.segments = segments
+
+    def render(self, variables: Dict) -> str:
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            name, raw = segment
+            if name in variables:
+                value = variables[name]
+                parts.append(str(value) if value is not None else '')
+            else:
+                parts.append(raw)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=512)
+def compile_template(content: str) -> CompiledTemplate:
+    """Tokenize ``content`` once; identical bodies share one compiled template."""
+    segments = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(content):
+        if match.start() > position:
+            segments.append(content[position:match.start()])
+        segments.append((match.group(1), match.group(0)))
+        position = match.end()
+    if position < len(content):
+        segments.append(content[position:])
+    return CompiledTemplate(tuple(segments))
+
+
+def render_template(content, variables: Dict):
+    """Render ``{{variable}}`` placeholders in ``content`` in a single pass."""
+    if not content:
+        return content
+    return compile_template(content).render(variables)
+
+
+# ---------------------------------------------------------------------------
+# Template snapshots and cache
+# ---------------------------------------------------------------------------
+
+class CachedEmailTemplate:
+    """Detached, read-only copy of an ``EmailTemplate`` row with compiled bodies.
+
+    Exposes the same attributes callers read from the model (``id``, ``name``,
+    ``subject``, ``html_body``, ``text_body``, ``organization_id``, ``is_public``), so it
+    can be shared between threads and outlive the session it was loaded in.
+    """
+
+    def __init__(self, template):
+        self.id = template.id
+        self.name = template.name
+        self.subject = template.subject
+        self.html_body = template.html_body
+        self.text_body = template.text_body
+        self.organization_id = template.organization_id
+        self.is_public = bool(getattr(template, 'is_public', False))
+        # Compile eagerly so the first recipient of a bulk send doesn't pay for it
+        for body in (self.subject, self.html_body, self.text_body):
+            if body:
+                compile_template(body)
+
+    def render(self, **variables) -> Dict[str, Optional[str]]:
+        return {
+            'subject': render_template(self.subject, variables),
+            'html_body': render_template(self.html_body, variables),
+            'text_body': render_template(self.text_body, variables),
+        }
+
+    def to_template_data(self) -> Dict:
+        return {
+            'name': self.name,
+            'subject': self.subject,
+            'html_body': self.html_body,
+            'text_body': self.text_body,
+        }
+
+
+_MISSING = object()
+
+
+class EmailTemplateCache:
+    """Thread-safe cache of template snapshots by ID and of type/org resolutions."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._by_id: Dict[int, Tuple[Optional[CachedEmailTemplate], float]] = {}
+        self._resolved: Dict[Tuple[str, Optional[int]], Tuple[Optional[int], float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.monotonic() - stored_at < self.ttl
+
+    def get(self, template_id: int, loader: Callable) -> Optional[CachedEmailTemplate]:
+        """Snapshot of template ``template_id``; ``loader(template_id)`` returns the model row."""
+        with self._lock:
+            entry = self._by_id.get(template_id)
+            if entry is not None and self._fresh(entry[1]):
+                self.stats['hits'] += 1
+                return entry[0]
+        self.stats['misses'] += 1
+        row = loader(template_id)
+        snapshot = CachedEmailTemplate(row) if row is not None else None
+        with self._lock:
+            self._by_id[template_id] = (snapshot, time.monotonic())
+        return snapshot
+
+    def resolve(self, template_type: str, organization_id: Optional[int], resolver: Callable):
+        """Memoized ``resolver(template_type, organization_id) -> model row or None``."""
+        key = ((template_type or '').lower(), organization_id)
+        with self._lock:
+            entry = self._resolved.get(key, _MISSING)
+            if entry is not _MISSING and self._fresh(entry[1]):
+                template_id = entry[0]
+                if template_id is None:
+                    self.stats['hits'] += 1
+                    return None
+                cached = self._by_id.get(template_id)
+                if cached is not None and self._fresh(cached[1]):
+                    self.stats['hits'] += 1
+                    return cached[0]
+        self.stats['misses'] += 1
+        row = resolver(template_type, organization_id)
+        snapshot = CachedEmailTemplate(row) if row is not None else None
+        now = time.monotonic()
+        with self._lock:
+            self._resolved[key] = (snapshot.id if snapshot else None, now)
+            if snapshot is not None:
+                self._by_id[snapshot.id] = (snapshot, now)
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop everything; called after any template is created, updated or deleted."""
+        with self._lock:
+            self._by_id.clear()
+            self._resolved.clear()
+            self.stats['invalidations'] += 1
+
+
+__all__ = [
+    'CompiledTemplate',
+    'compile_template',
+    'render_template',
+    'CachedEmailTemplate',
+    'EmailTemplateCache',
+]
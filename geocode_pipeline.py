@@ -0,0 +1,346 @@
+"""geocode_pipeline.py
+
+Shared address -> coordinate cache and the background worker that fills in missing
+``geo_locations`` coordinates.
+
+Admin report endpoints used to call Nominatim inline (3 retries x 10 s timeout) for every
+response without coordinates. They now only read ``GeocodeCache`` and hand misses to
+``GeocodeWorker``, which geocodes them one at a time on a daemon thread, stores the result
+in the cache and writes it back to ``geo_locations``. The next page load is served from
+the cache.
+
+Cache keys are canonical (component-ordered, lower-cased, whitespace/punctuation
+collapsed). Coordinates are shared by every provider; "no results" answers are cached
+per provider for ``NEGATIVE_TTL`` (their rows are keyed by provider and address), so an
+address one provider could not resolve is not retried against it on every request but is
+still tried with the others. An in-process LRU answers the common repeated
+cities/countries without touching the table.
+
+``GeocodeCache`` talks to the database through its own engine connection, never the
+caller's session, so a cache hiccup can never roll back a request's pending changes; all
+cache errors are logged and treated as a miss. The same table is used by ``app.py``
+(``geocode_address``, ``geocode_address_google``) and
+``app_modular/services/geocoding_service.py``.
+"""
+
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+logger = logging.getLogger(__name__)
+
+# Most specific first; used to build one address string from component dicts
+ADDRESS_FIELDS = ('address_line1', 'address_line2', 'town', 'city', 'province', 'postal_code', 'country')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PUNCTUATION_RE = re.compile(r'[.;:!?"()\[\]]+')
+
+# Returned by GeocodeCache.get for addresses the given provider could not resolve
+NEGATIVE = (None, None)
+
+# How long a "no results" answer is trusted before the address is tried again
+NEGATIVE_TTL = timedelta(days=7)
+
+
+# ---------------------------------------------------------------------------
+# Address keys
+# ---------------------------------------------------------------------------
+
+def address_from_components(components: Dict) -> str:
+    """Join the non-empty address components in ``ADDRESS_FIELDS`` order."""
+    parts = []
+    for field in ADDRESS_FIELDS:
+        value = components.get(field)
+        if value is not None and str(value).strip():
+            parts.append(str(value).strip())
+    return ', '.join(parts)
+
+
+def normalize_address(address) -> str:
+    """Canonical cache key for an address string or component dict.
+
+    Component dicts are first ordered by ``ADDRESS_FIELDS`` (so every code path builds
+    the same string); then each comma-separated part is lower-cased, stripped of stray
+    punctuation and whitespace-collapsed, and empty or repeated parts are dropped
+    ("Nairobi, , nairobi ,Kenya." -> "nairobi, kenya").
+    """
+    if isinstance(address, dict):
+        address = address_from_components(address)
+    parts = []
+    for part in str(address or '').split(','):
+        part = _WHITESPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', part)).strip().lower()
+        if part and part not in parts:
+            parts.append(part)
+    return ', '.join(parts)
+
+
+def address_hash(normalized: str, provider: Optional[str] = None) -> str:
+    """Row key: the address alone for coordinates, provider + address for a "no results" entry."""
+    key = normalized if provider is None else f'{provider}\n{normalized}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Persistent cache (+ in-process LRU)
+# ---------------------------------------------------------------------------
+
+class GeocodeCache:
+    """Read-through/write-through cache over the ``geocode_cache`` table.
+
+    ``get(address, provider)`` returns ``(lat, lng)`` for a known address (whichever
+    provider found it), ``NEGATIVE`` when ``provider`` recently said it cannot resolve the
+    address (its row with NULL coordinates is younger than ``negative_ttl``), and ``None``
+    when the address has to be looked up. Without ``provider`` only coordinates are
+    returned. A bounded LRU in front of the table answers repeated cities/countries
+    without a query.
+    """
+
+    def __init__(self, engine_getter: Callable, table, negative_ttl: timedelta = NEGATIVE_TTL,
+                 lru_size: int = 4096):
+        self._engine_getter = engine_getter  # callable so the engine is resolved lazily
+        self.table = table
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        # normalized -> (coordinates, None); (provider, normalized) -> (NEGATIVE, expires_at)
+        self._lru: OrderedDict = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._table_ready = False
+
+    def _engine(self):
+        engine = self._engine_getter()
+        if not self._table_ready:
+            self.table.create(engine, checkfirst=True)
+            self._table_ready = True
+        return engine
+
+    # -- LRU ---------------------------------------------------------------
+
+    def _lru_get(self, key):
+        with self._lru_lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            coordinates, expires_at = entry
+            if expires_at is not None and expires_at <= datetime.utcnow():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return coordinates
+
+    def _lru_put(self, key, coordinates, expires_at=None) -> None:
+        with self._lru_lock:
+            self._lru[key] = (coordinates, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    # -- reads -------------------------------------------------------------
+
+    def get(self, address, provider: Optional[str] = None):
+        normalized = normalize_address(address)
+        if not normalized:
+            return None
+        return self.get_many([normalized], provider).get(normalized)
+
+    def get_many(self, addresses: Iterable, provider: Optional[str] = None) -> Dict[str, Tuple]:
+        """Map normalized address -> (lat, lng), or ``NEGATIVE`` for ``provider``'s recent misses."""
+        found = {}
+        by_hash = {}
+        for address in addresses:
+            normalized = normalize_address(address)
+            if not normalized or normalized in found:
+                continue
+            coordinates = self._lru_get(normalized)
+            if coordinates is None and provider is not None:
+                coordinates = self._lru_get((provider, normalized))
+            if coordinates is not None:
+                found[normalized] = coordinates
+                continue
+            by_hash[address_hash(normalized)] = normalized
+            if provider is not None:
+                by_hash[address_hash(normalized, provider)] = normalized
+        if not by_hash:
+            return found
+
+        t = self.table
+        try:
+            with self._engine().connect() as conn:
+                rows = conn.execute(
+                    select(t.c.address_hash, t.c.latitude, t.c.longitude, t.c.updated_at)
+                    .where(t.c.address_hash.in_(list(by_hash)))
+                ).fetchall()
+        except Exception as e:
+            logger.warning(f"Geocode cache lookup failed: {str(e)}")
+            return found
+
+        now = datetime.utcnow()
+        for row in rows:
+            normalized = by_hash[row.address_hash]
+            if row.latitude is not None and row.longitude is not None:
+                coordinates = (float(row.latitude), float(row.longitude))
+                self._lru_put(normalized, coordinates)
+                found[normalized] = coordinates  # coordinates win over a miss row
+            elif (row.address_hash != address_hash(normalized)  # not a legacy provider-less miss
+                  and row.updated_at and row.updated_at + self.negative_ttl > now):
+                self._lru_put((provider, normalized), NEGATIVE, row.updated_at + self.negative_ttl)
+                found.setdefault(normalized, NEGATIVE)
+        return found
+
+    # -- writes ------------------------------------------------------------
+
+    def _upsert(self, key_hash: str, normalized: str, latitude, longitude, provider: str) -> None:
+        now = datetime.utcnow()
+        stmt = mysql_insert(self.table).values(
+            address_hash=key_hash,
+            address=normalized[:500],
+            latitude=latitude,
+            longitude=longitude,
+            provider=provider,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_duplicate_key_update(
+            latitude=stmt.inserted.latitude,
+            longitude=stmt.inserted.longitude,
+            provider=stmt.inserted.provider,
+            updated_at=stmt.inserted.updated_at,
+        )
+        try:
+            with self._engine().begin() as conn:
+                conn.execute(stmt)
+        except Exception as e:
+            logger.warning(f"Geocode cache write failed for '{normalized}': {str(e)}")
+
+    def put(self, address, latitude: float, longitude: float, provider: str) -> None:
+        normalized = normalize_address(address)
+        if not normalized:
+            return
+        self._lru_put(normalized, (float(latitude), float(longitude)))
+        self._upsert(address_hash(normalized), normalized, latitude, longitude, provider)
+
+    def put_miss(self, address, provider: str) -> None:
+        """Remember that ``provider`` has no result for ``address`` (for ``negative_ttl``).
+
+        Only call this for a definitive "no results" answer, not for timeouts or errors.
+        Other providers are still asked for the address.
+        """
+        normalized = normalize_address(address)
+        if not normalized:
+            return
+        self._lru_put((provider, normalized), NEGATIVE, datetime.utcnow() + self.negative_ttl)
+        self._upsert(address_hash(normalized, provider), normalized, None, None, provider)
+
+
+# ---------------------------------------------------------------------------
+# Background worker
+# ---------------------------------------------------------------------------
+
+class GeocodeWorker:
+    """Single daemon thread that geocodes queued addresses and writes the results back.
+
+    ``geocode_fn(components) -> (lat, lng)`` does the network lookup through ``provider``
+    (and may itself consult the cache); ``write_back(geo_location_ids, lat, lng)``
+    persists coordinates. Addresses ``provider`` recently could not resolve are skipped.
+    Addresses are de-duplicated while queued, and consecutive network lookups are spaced
+    ``min_interval`` seconds apart (Nominatim's usage policy is 1 request/second).
+    """
+
+    def __init__(self, app, cache: GeocodeCache, geocode_fn: Callable, write_back: Callable,
+                 provider: Optional[str] = None, min_interval: float = 1.0, max_queue: int = 10000):
+        self.app = app
+        self.cache = cache
+        self.geocode_fn = geocode_fn
+        self.provider = provider
+        self.write_back = write_back
+        self.min_interval = min_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._pending: Dict[str, Dict] = {}  # normalized address -> {'components', 'geo_location_ids'}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'queued': 0, 'resolved': 0, 'failed': 0, 'cache_hits': 0}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name='geocode-worker', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, components: Dict, geo_location_id: Optional[int] = None) -> bool:
+        """Queue an address (and optionally the geo_locations row to fill). Never blocks."""
+        address = address_from_components(components)
+        normalized = normalize_address(address)
+        if not normalized:
+            return False
+        with self._lock:
+            entry = self._pending.get(normalized)
+            if entry is not None:
+                if geo_location_id is not None:
+                    entry['geo_location_ids'].add(geo_location_id)
+                return True
+            try:
+                self._queue.put_nowait(normalized)
+            except queue.Full:
+                logger.warning("Geocode queue is full; dropping address")
+                return False
+            self._pending[normalized] = {
+                'components': dict(components),
+                'geo_location_ids': {geo_location_id} if geo_location_id is not None else set(),
+            }
+            self.stats['queued'] += 1
+            self._ensure_thread()
+        return True
+
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def _loop(self) -> None:
+        while True:
+            normalized = self._queue.get()
+            with self._lock:
+                entry = self._pending.pop(normalized, None)
+            if entry is None:
+                continue
+            try:
+                with self.app.app_context():
+                    self._process(normalized, entry)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Geocode worker failed for '{normalized}': {str(e)}")
+
+    def _process(self, normalized: str, entry: Dict) -> None:
+        coordinates = self.cache.get(normalized, self.provider)
+        if coordinates == NEGATIVE:
+            self.stats['cache_hits'] += 1
+            self.stats['failed'] += 1
+            return
+        if coordinates is not None:
+            self.stats['cache_hits'] += 1
+        else:
+            coordinates = self.geocode_fn(entry['components'])
+            time.sleep(self.min_interval)
+            if not coordinates or coordinates[0] is None or coordinates[1] is None:
+                self.stats['failed'] += 1
+                return
+        self.stats['resolved'] += 1
+        if entry['geo_location_ids']:
+            self.write_back(sorted(entry['geo_location_ids']), coordinates[0], coordinates[1])
+
+
+__all__ = [
+    'ADDRESS_FIELDS',
+    'NEGATIVE',
+    'NEGATIVE_TTL',
+    'address_from_components',
+    'normalize_address',
+    'address_hash',
+    'GeocodeCache',
+    'GeocodeWorker',
+]
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
 
+from kpi_rollups import SOURCE_USERS, SOURCE_V1, SOURCE_V2
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +38,8 @@ def register_kpi_dashboard_routes(app, db):
     SurveyV2 = app_module.SurveyV2
     SurveyOrganization = app_module.SurveyOrganization
     SurveyResponseV2 = app_module.SurveyResponseV2
+    kpi_rollups = app_module.kpi_rollups
+    org_hierarchy = app_module.org_hierarchy
 
     # ------------------------------------------------------------------
     # Helpers
@@ -52,56 +56,44 @@ def register_kpi_dashboard_routes(app, db):
         if role == 'association':
             if not organization_id:
                 return []
-            child_orgs = db.session.query(Organization).filter_by(
-                parent_organization=organization_id
-            ).all()
-            return [o.id for o in child_orgs]
+            # Every organization below the association, at any depth
+            return org_hierarchy.descendant_ids(organization_id, include_self=False)
 
         return []
 
-    def _build_survey_lifecycle(org_ids):
+    def _totals(rollups, source, statuses=None):
+        """Sum of (item_count, days_total, days_count) over matching rollup rows."""
+        count = days_total = days_count = 0
+        for r in rollups:
+            if r.source == source and (statuses is None or r.status in statuses):
+                count += r.item_count
+                days_total += r.days_total
+                days_count += r.days_count
+        return count, days_total, days_count
+
+    def _build_survey_lifecycle(org_ids, rollups):
         """Survey lifecycle metrics."""
-        q = db.session.query(SurveyV2)
+        q = db.session.query(SurveyV2.status, func.count(SurveyV2.id))
         if org_ids is not None:
             survey_ids_sub = db.session.query(SurveyOrganization.survey_id).filter(
                 SurveyOrganization.organization_id.in_(org_ids)
             ).distinct().subquery()
             q = q.filter(SurveyV2.id.in_(survey_ids_sub))
+        by_status = dict(q.group_by(SurveyV2.status).all())
 
-        total = q.count()
-        draft = q.filter(SurveyV2.status == 'draft').count()
-        open_count = q.filter(SurveyV2.status == 'open').count()
-        closed = q.filter(SurveyV2.status == 'closed').count()
+        total = sum(by_status.values())
+        draft = by_status.get('draft', 0)
+        open_count = by_status.get('open', 0)
+        closed = by_status.get('closed', 0)
 
         # Also count V1 templates
         total += db.session.query(SurveyTemplate).count()
 
-        # Avg days to completion from V2 responses
-        avg_q = db.session.query(
-            func.avg(func.datediff(SurveyResponseV2.end_date, SurveyResponseV2.start_date))
-        ).filter(
-            SurveyResponseV2.start_date.isnot(None),
-            SurveyResponseV2.end_date.isnot(None),
-            SurveyResponseV2.status.in_(['submitted', 'analyzed'])
-        )
-        if org_ids is not None:
-            avg_q = avg_q.filter(SurveyResponseV2.organization_id.in_(org_ids))
-        avg_days = avg_q.scalar()
-
-        # Also factor V1 responses avg
-        avg_v1 = db.session.query(
-            func.avg(func.datediff(SurveyResponse.end_date, SurveyResponse.start_date))
-        ).filter(
-            SurveyResponse.start_date.isnot(None),
-            SurveyResponse.end_date.isnot(None),
-            SurveyResponse.status == 'completed'
-        )
-        if org_ids is not None:
-            user_ids_sub = db.session.query(User.id).filter(
-                User.organization_id.in_(org_ids)
-            ).subquery()
-            avg_v1 = avg_v1.filter(SurveyResponse.user_id.in_(user_ids_sub))
-        avg_days_v1 = avg_v1.scalar()
+        # Avg days to completion from V2 (submitted/analyzed) and V1 (completed) responses
+        _, v2_days, v2_dated = _totals(rollups, SOURCE_V2, ('submitted', 'analyzed'))
+        _, v1_days, v1_dated = _totals(rollups, SOURCE_V1, ('completed',))
+        avg_days = v2_days / v2_dated if v2_dated else None
+        avg_days_v1 = v1_days / v1_dated if v1_dated else None
 
         # Combine averages
         if avg_days and avg_days_v1:
@@ -122,35 +114,37 @@ def register_kpi_dashboard_routes(app, db):
         }
 
     def _build_participation(org_ids):
-        """Participation & invitation metrics based on unique individual users."""
+        """Participation & invitation metrics based on unique individual users.
+
+        Distinct users across V1 and V2 can't be summed from per-organization rollups, so
+        each figure is one COUNT over a UNION of user IDs.
+        """
         # V2 users
-        v2_q = db.session.query(SurveyResponseV2.user_id).filter(SurveyResponseV2.user_id.isnot(None))
+        v2_q = db.session.query(SurveyResponseV2.user_id.label('user_id')).filter(
+            SurveyResponseV2.user_id.isnot(None))
         if org_ids is not None:
             v2_q = v2_q.filter(SurveyResponseV2.organization_id.in_(org_ids))
 
-        v2_invited = v2_q
-        v2_accepted = v2_q.filter(SurveyResponseV2.start_date.isnot(None))
-        v2_responded = v2_q.filter(SurveyResponseV2.status.in_(['submitted', 'analyzed']))
-
         # V1 users
-        v1_q = db.session.query(SurveyResponse.user_id).filter(SurveyResponse.user_id.isnot(None))
+        v1_q = db.session.query(SurveyResponse.user_id.label('user_id')).filter(
+            SurveyResponse.user_id.isnot(None))
         if org_ids is not None:
             user_ids_sub = db.session.query(User.id).filter(
                 User.organization_id.in_(org_ids)
             ).subquery()
             v1_q = v1_q.filter(SurveyResponse.user_id.in_(user_ids_sub))
 
-        v1_invited = v1_q
-        v1_accepted = v1_q.filter(SurveyResponse.status.in_(['in_progress', 'completed']))
-        v1_responded = v1_q.filter(SurveyResponse.status == 'completed')
-
-        logger.info(f"V1 Users invited list count: {v1_invited.count()} | First elements: {[r[0] for r in v1_invited.all()][:5]}")
-        logger.info(f"V2 Users invited list count: {v2_invited.count()} | First elements: {[r[0] for r in v2_invited.all()][:5]}")
+        def _unique_users(v2_filter=None, v1_filter=None):
+            # UNION (not UNION ALL) de-duplicates the user IDs
+            v2 = v2_q.filter(v2_filter) if v2_filter is not None else v2_q
+            v1 = v1_q.filter(v1_filter) if v1_filter is not None else v1_q
+            return v2.union(v1).count()
 
-        total_invited = len(set(r[0] for r in v2_invited.all() + v1_invited.all()))
-        logger.info(f"Unique total_invited computed in Python: {total_invited}")
-        total_accepted = len(set(r[0] for r in v2_accepted.all() + v1_accepted.all()))
-        total_responded = len(set(r[0] for r in v2_responded.all() + v1_responded.all()))
+        total_invited = _unique_users()
+        total_accepted = _unique_users(SurveyResponseV2.start_date.isnot(None),
+                                       SurveyResponse.status.in_(['in_progress', 'completed']))
+        total_responded = _unique_users(SurveyResponseV2.status.in_(['submitted', 'analyzed']),
+                                        SurveyResponse.status == 'completed')
 
         return {
             'total_invited': total_invited,
@@ -160,30 +154,17 @@ def register_kpi_dashboard_routes(app, db):
             'response_rate': round(total_responded / total_invited * 100, 1) if total_invited > 0 else 0
         }
 
-    def _build_completion(org_ids):
+    def _build_completion(rollups):
         """Completion metrics."""
         # V2
-        v2_q = db.session.query(SurveyResponseV2)
-        if org_ids is not None:
-            v2_q = v2_q.filter(SurveyResponseV2.organization_id.in_(org_ids))
-
-        v2_total = v2_q.count()
-        v2_submitted = v2_q.filter(
-            SurveyResponseV2.status.in_(['submitted', 'analyzed'])
-        ).count()
-        v2_draft = v2_q.filter(SurveyResponseV2.status == 'draft').count()
+        v2_total, _, _ = _totals(rollups, SOURCE_V2)
+        v2_submitted, _, _ = _totals(rollups, SOURCE_V2, ('submitted', 'analyzed'))
+        v2_draft, _, _ = _totals(rollups, SOURCE_V2, ('draft',))
 
         # V1 (pending/in_progress/completed)
-        v1_q = db.session.query(SurveyResponse)
-        if org_ids is not None:
-            user_ids_sub = db.session.query(User.id).filter(
-                User.organization_id.in_(org_ids)
-            ).subquery()
-            v1_q = v1_q.filter(SurveyResponse.user_id.in_(user_ids_sub))
-
-        v1_total = v1_q.count()
-        v1_submitted = v1_q.filter(SurveyResponse.status == 'completed').count()
-        v1_draft = v1_q.filter(SurveyResponse.status.in_(['pending', 'in_progress'])).count()
+        v1_total, _, _ = _totals(rollups, SOURCE_V1)
+        v1_submitted, _, _ = _totals(rollups, SOURCE_V1, ('completed',))
+        v1_draft, _, _ = _totals(rollups, SOURCE_V1, ('pending', 'in_progress'))
 
         total = v2_total + v1_total
         submitted = v2_submitted + v1_submitted
@@ -225,29 +206,14 @@ def register_kpi_dashboard_routes(app, db):
 
         return {'countries': dict(countries)}
 
-    def _build_completion_trend(org_ids):
+    def _build_completion_trend(rollups):
         """Overall completion status — 3 totals: completed, in_progress, pending.
         Responses with empty answers ({}) are counted as pending regardless of status.
         """
-        # Fetch all V2 responses
-        v2_q = db.session.query(SurveyResponseV2)
-        if org_ids is not None:
-            v2_q = v2_q.filter(SurveyResponseV2.organization_id.in_(org_ids))
-        v2_rows = v2_q.all()
-
-        # Fetch all V1 responses
-        v1_q = db.session.query(SurveyResponse)
-        if org_ids is not None:
-            user_ids_sub = db.session.query(User.id).filter(
-                User.organization_id.in_(org_ids)
-            ).subquery()
-            v1_q = v1_q.filter(SurveyResponse.user_id.in_(user_ids_sub))
-        v1_rows = v1_q.all()
-
         totals = {'completed': 0, 'in_progress': 0, 'pending': 0}
 
-        def _classify(status, answers):
-            if not answers or answers == {} or str(answers) == '{}':
+        def _classify(status, answered):
+            if not answered:
                 return 'pending'
             if status in ('submitted', 'analyzed', 'completed'):
                 return 'completed'
@@ -255,56 +221,44 @@ def register_kpi_dashboard_routes(app, db):
                 return 'in_progress'
             return 'pending'
 
-        for r in v2_rows:
-            totals[_classify(r.status, r.answers)] += 1
-        for r in v1_rows:
-            totals[_classify(r.status, r.answers)] += 1
+        for r in rollups:
+            if r.source in (SOURCE_V1, SOURCE_V2):
+                totals[_classify(r.status, r.has_answers)] += r.item_count
 
         return totals
 
-    def _build_org_breakdown(org_ids):
+    def _build_org_breakdown(org_ids, rollups):
         """Per-organization breakdown. Only Church, Institution, Non-formal orgs."""
         # Only show concrete org types (exclude associations/denominations/etc.)
-        allowed_types = db.session.query(OrganizationType).filter(
+        query = db.session.query(Organization.id, Organization.name).join(
+            OrganizationType, OrganizationType.id == Organization.type
+        ).filter(
             OrganizationType.type.in_(['church', 'Institution', 'Non_formal_organizations'])
-        ).all()
-        allowed_type_ids = [t.id for t in allowed_types]
-
-        query = db.session.query(Organization).filter(Organization.type.in_(allowed_type_ids))
+        )
         if org_ids is not None:
             query = query.filter(Organization.id.in_(org_ids))
         orgs = query.all()
 
+        counts = defaultdict(lambda: {'users': 0, 'total': 0, 'submitted': 0})
+        for r in rollups:
+            org_counts = counts[r.organization_id]
+            if r.source == SOURCE_USERS:
+                org_counts['users'] += r.item_count
+                continue
+            org_counts['total'] += r.item_count
+            if (r.source == SOURCE_V2 and r.status in ('submitted', 'analyzed')) or \
+                    (r.source == SOURCE_V1 and r.status == 'completed'):
+                org_counts['submitted'] += r.item_count
+
         breakdown = []
-        for org in orgs:
-            user_count = db.session.query(User).filter_by(organization_id=org.id).count()
-
-            # V2 responses
-            v2_total = db.session.query(SurveyResponseV2).filter_by(organization_id=org.id).count()
-            v2_submitted = db.session.query(SurveyResponseV2).filter(
-                SurveyResponseV2.organization_id == org.id,
-                SurveyResponseV2.status.in_(['submitted', 'analyzed'])
-            ).count()
-
-            # V1 responses
-            user_ids = [u.id for u in db.session.query(User).filter_by(organization_id=org.id).all()]
-            v1_total = 0
-            v1_submitted = 0
-            if user_ids:
-                v1_total = db.session.query(SurveyResponse).filter(
-                    SurveyResponse.user_id.in_(user_ids)
-                ).count()
-                v1_submitted = db.session.query(SurveyResponse).filter(
-                    SurveyResponse.user_id.in_(user_ids),
-                    SurveyResponse.status == 'completed'
-                ).count()
-
-            total = v2_total + v1_total
-            submitted = v2_submitted + v1_submitted
+        for org_id, name in orgs:
+            org_counts = counts.get(org_id, {'users': 0, 'total': 0, 'submitted': 0})
+            total = org_counts['total']
+            submitted = org_counts['submitted']
 
             breakdown.append({
-                'name': org.name,
-                'total_users': user_count,
+                'name': name,
+                'total_users': org_counts['users'],
                 'total_responses': total,
                 'submitted': submitted,
                 'completion_rate': round(submitted / total * 100, 1) if total > 0 else 0
@@ -324,14 +278,15 @@ def register_kpi_dashboard_routes(app, db):
             organization_id = request.args.get('organization_id', type=int)
 
             org_ids = _get_scoped_org_ids(role, organization_id)
+            rollups = kpi_rollups.rows(db.session, org_ids)
 
             return jsonify({
-                'survey_lifecycle': _build_survey_lifecycle(org_ids),
+                'survey_lifecycle': _build_survey_lifecycle(org_ids, rollups),
                 'participation': _build_participation(org_ids),
-                'completion': _build_completion(org_ids),
+                'completion': _build_completion(rollups),
                 'geographic': _build_geographic(org_ids),
-                'completion_trend': _build_completion_trend(org_ids),
-                'organization_breakdown': _build_org_breakdown(org_ids),
+                'completion_trend': _build_completion_trend(rollups),
+                'organization_breakdown': _build_org_breakdown(org_ids, rollups),
             }), 200
 
         except Exception as e:
@@ -0,0 +1,373 @@
+"""kpi_rollups.py
+
+Per-organization rollups behind ``/api/kpi/dashboard``.
+
+The dashboard used to recount everything on each request: five queries per organization
+for the breakdown, and every v1/v2 response row loaded just to classify its status. The
+``kpi_org_rollups`` table instead holds one row per *(organization, source, status,
+has_answers)* with
+
+* ``item_count`` -- users (``source='users'``, empty status) or responses
+  (``source='v1'``/``'v2'``) in that bucket;
+* ``days_total``/``days_count`` -- the sum and number of ``DATEDIFF(end_date,
+  start_date)`` values, so average completion time needs no response scan.
+
+A v2 response belongs to its own ``organization_id``; a v1 response to its user's
+organization. Responses and users without an organization are kept under
+``NO_ORGANIZATION`` (0) so the unscoped totals still include them.
+
+``KpiRollups.watch()`` keeps the table current: ``before_flush`` subtracts the previous
+bucket of every changed ``User``/``SurveyResponse``/``SurveyResponseV2`` (attribute
+history, users' organizations as still stored), ``after_flush`` adds the new one (once
+IDs and foreign keys are assigned) and applies the deltas with one ``INSERT ... ON
+DUPLICATE KEY UPDATE`` on the flushing connection, so they commit or roll back with the
+change itself.
+When a user moves organization their untouched v1 responses move with them. Bulk
+statements (``query.update()``/``delete()``, raw SQL) bypass the listener; run
+``rebuild_kpi_rollups.py`` after such maintenance.
+
+The table is created on the first read in a process and rebuilt there when it is new or
+empty (including after a build that failed part way); importing the app does no work.
+
+As with ``comparison_aggregates`` the session and models are passed in.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+SOURCE_USERS = 'users'
+SOURCE_V1 = 'v1'
+SOURCE_V2 = 'v2'
+
+# organization_id used for users/responses without an organization
+NO_ORGANIZATION = 0
+
+_UNSET = object()
+
+# Bucket key: (organization_id, source, status, has_answers)
+Key = Tuple[int, str, str, bool]
+
+
+def has_answers(answers) -> bool:
+    """False for the empty answers the dashboard counts as "pending" whatever the status."""
+    return not (not answers or answers == {} or str(answers) == '{}')
+
+
+def days_between(start, end) -> Optional[int]:
+    """MySQL ``DATEDIFF(end, start)``: whole calendar days, ignoring the time of day."""
+    if start is None or end is None:
+        return None
+    start = start.date() if isinstance(start, datetime) else start
+    end = end.date() if isinstance(end, datetime) else end
+    return (end - start).days
+
+
+def _organization(org_id) -> int:
+    return org_id if org_id is not None else NO_ORGANIZATION
+
+
+class _Deltas:
+    """Accumulates per-bucket changes for one flush."""
+
+    def __init__(self):
+        self.buckets: Dict[Key, List[int]] = defaultdict(lambda: [0, 0, 0])
+
+    def add(self, key: Key, days: Optional[int], sign: int) -> None:
+        bucket = self.buckets[key]
+        bucket[0] += sign
+        if days is not None:
+            bucket[1] += sign * days
+            bucket[2] += sign
+
+    def rows(self) -> List[Dict]:
+        return [{
+            'organization_id': key[0], 'source': key[1], 'status': key[2], 'has_answers': key[3],
+            'item_count': values[0], 'days_total': values[1], 'days_count': values[2],
+        } for key, values in self.buckets.items() if any(values)]
+
+
+class KpiRollups:
+    """Maintain and read ``rollup_model`` for the given user and response models."""
+
+    def __init__(self, db, rollup_model, user_model, v1_model, v2_model):
+        self.db = db
+        self.rollup_model = rollup_model
+        self.user_model = user_model
+        self.v1_model = v1_model
+        self.v2_model = v2_model
+        self._build_lock = threading.Lock()
+        self._table_exists = False
+        self._table_ready = False
+
+    def ensure_table(self) -> bool:
+        """Create the table if needed; returns True when it was just created (and is empty)."""
+        if self._table_exists:
+            return False
+        created = not inspect(self.db.engine).has_table(self.rollup_model.__tablename__)
+        self.rollup_model.__table__.create(self.db.engine, checkfirst=True)
+        self._table_exists = True
+        return created
+
+    def _has_table(self, connection) -> bool:
+        if not self._table_exists:
+            self._table_exists = inspect(connection).has_table(self.rollup_model.__tablename__)
+        return self._table_exists
+
+    def ensure_ready(self) -> None:
+        """Create the table and build it if it is new or empty; free once done in this process.
+
+        Builds in a session of its own, so the caller's pending work is not committed. A
+        failed build leaves the table empty and is retried by the next call.
+        """
+        if self._table_ready:
+            return
+        with self._build_lock:
+            if self._table_ready:
+                return
+            created = self.ensure_table()
+            with Session(self.db.engine) as session:
+                if created or session.query(self.rollup_model.organization_id).first() is None:
+                    rows = self.rebuild(session)
+                    logger.info(f"KPI rollup table built ({rows} rows)")
+            self._table_ready = True
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _upsert(self, connection, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        table = self.rollup_model.__table__
+        stmt = mysql_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            item_count=table.c.item_count + stmt.inserted.item_count,
+            days_total=table.c.days_total + stmt.inserted.days_total,
+            days_count=table.c.days_count + stmt.inserted.days_count,
+        )
+        connection.execute(stmt)
+
+    def rebuild(self, session, batch_size: int = 1000) -> int:
+        """Recompute every rollup row from users and responses. Commits; returns rows written."""
+        self.ensure_table()
+        users, v1, v2 = self.user_model, self.v1_model, self.v2_model
+        deltas = _Deltas()
+
+        user_orgs = {}
+        for user_id, org_id in session.query(users.id, users.organization_id).yield_per(batch_size):
+            user_orgs[user_id] = _organization(org_id)
+            deltas.add((user_orgs[user_id], SOURCE_USERS, '', False), None, 1)
+
+        for row in session.query(v1.user_id, v1.status, v1.answers, v1.start_date, v1.end_date) \
+                .yield_per(batch_size):
+            key = (user_orgs.get(row.user_id, NO_ORGANIZATION), SOURCE_V1, row.status or '', has_answers(row.answers))
+            deltas.add(key, days_between(row.start_date, row.end_date), 1)
+
+        for row in session.query(v2.organization_id, v2.status, v2.answers, v2.start_date, v2.end_date) \
+                .yield_per(batch_size):
+            key = (_organization(row.organization_id), SOURCE_V2, row.status or '', has_answers(row.answers))
+            deltas.add(key, days_between(row.start_date, row.end_date), 1)
+
+        rows = deltas.rows()
+        session.query(self.rollup_model).delete(synchronize_session=False)
+        for start in range(0, len(rows), batch_size):
+            session.bulk_insert_mappings(self.rollup_model, rows[start:start + batch_size])
+        session.commit()
+        self._table_ready = True
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _previous(obj, attr):
+        """Value of ``attr`` before the pending change. Call from ``before_flush``."""
+        history = inspect(obj).attrs[attr].history
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        if history.added:
+            return _UNSET  # replaced without the old value being loaded
+        return getattr(obj, attr)  # unchanged but expired: the row still holds it
+
+    def _response_state(self, obj, read) -> Dict:
+        state = {field: read(field) for field in ('status', 'answers', 'start_date', 'end_date')}
+        state['owner'] = read('user_id') if isinstance(obj, self.v1_model) else read('organization_id')
+        return state
+
+    @staticmethod
+    def _bucket(org: int, source: str, state: Dict) -> Tuple[Key, Optional[int]]:
+        key = (org, source, state['status'] or '', has_answers(state['answers']))
+        return key, days_between(state['start_date'], state['end_date'])
+
+    def _user_organizations(self, session, user_ids) -> Dict[int, int]:
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return {}
+        users = self.user_model
+        return {user_id: _organization(org_id) for user_id, org_id in session.query(
+            users.id, users.organization_id).filter(users.id.in_(user_ids)).all()}
+
+    def _before(self, session, deltas: _Deltas) -> Dict:
+        """Subtract the pre-flush buckets of changed rows; returns what ``_after`` needs."""
+        users, v1 = self.user_model, self.v1_model
+        responses = []
+        moved_from: Dict[int, int] = {}
+        for obj in session.dirty | session.deleted:
+            if isinstance(obj, users):
+                before = self._previous(obj, 'organization_id')
+                if before is _UNSET:
+                    logger.warning(f"KPI rollups: previous organization of user {obj.id} unknown; rebuild needed")
+                    continue
+                moved_from[obj.id] = _organization(before)
+            elif isinstance(obj, (v1, self.v2_model)):
+                state = self._response_state(obj, lambda attr: self._previous(obj, attr))
+                if _UNSET in state.values():
+                    logger.warning(f"KPI rollups: previous state of {type(obj).__name__} {obj.id} unknown; "
+                                   f"rebuild needed")
+                    continue
+                responses.append((obj, state))
+
+        # The database still holds every user's previous organization
+        user_orgs = self._user_organizations(
+            session, [state['owner'] for obj, state in responses if isinstance(obj, v1)])
+        for obj, state in responses:
+            if isinstance(obj, v1):
+                org, source = user_orgs.get(state['owner'], NO_ORGANIZATION), SOURCE_V1
+            else:
+                org, source = _organization(state['owner']), SOURCE_V2
+            key, days = self._bucket(org, source, state)
+            deltas.add(key, days, -1)
+        for org in moved_from.values():
+            deltas.add((org, SOURCE_USERS, '', False), None, -1)
+        return {'moved_from': moved_from}
+
+    def _after(self, session, deltas: _Deltas, moved_from: Dict[int, int]) -> None:
+        """Add the post-flush buckets of changed rows; the flush has assigned IDs and FKs."""
+        users, v1 = self.user_model, self.v1_model
+        deleted = session.deleted
+        moved_to: Dict[int, int] = {}
+        responses = []
+        touched_v1 = set()
+        for obj in session.new | session.dirty | deleted:
+            if isinstance(obj, v1):
+                touched_v1.add(obj.id)
+            if obj in deleted:
+                continue
+            if isinstance(obj, users):
+                if obj.id in moved_from or obj in session.new:
+                    moved_to[obj.id] = _organization(obj.organization_id)
+            elif isinstance(obj, (v1, self.v2_model)):
+                responses.append((obj, self._response_state(obj, lambda attr: getattr(obj, attr))))
+
+        user_orgs = self._user_organizations(
+            session, [state['owner'] for obj, state in responses if isinstance(obj, v1)])
+        for obj, state in responses:
+            if isinstance(obj, v1):
+                org, source = user_orgs.get(state['owner'], NO_ORGANIZATION), SOURCE_V1
+            else:
+                org, source = _organization(state['owner']), SOURCE_V2
+            key, days = self._bucket(org, source, state)
+            deltas.add(key, days, 1)
+        for org in moved_to.values():
+            deltas.add((org, SOURCE_USERS, '', False), None, 1)
+
+        # Responses a moved user already had go with them
+        moved = {user_id: (moved_from[user_id], org) for user_id, org in moved_to.items()
+                 if user_id in moved_from and moved_from[user_id] != org}
+        if moved:
+            rows = session.query(v1.id, v1.user_id, v1.status, v1.answers, v1.start_date, v1.end_date) \
+                .filter(v1.user_id.in_(list(moved))).all()
+            for row in rows:
+                if row.id in touched_v1:
+                    continue
+                state = {'status': row.status, 'answers': row.answers,
+                         'start_date': row.start_date, 'end_date': row.end_date}
+                before, after = moved[row.user_id]
+                key, days = self._bucket(before, SOURCE_V1, state)
+                deltas.add(key, days, -1)
+                key, days = self._bucket(after, SOURCE_V1, state)
+                deltas.add(key, days, 1)
+
+    def watch(self) -> None:
+        """Apply rollup deltas in the same transaction as every ORM flush."""
+        tracked = (self.user_model, self.v1_model, self.v2_model)
+        pending_key = 'kpi_rollup_pending'
+
+        # Load previous values on assignment so the old bucket is always known
+        for model, attrs in ((self.user_model, ('organization_id',)),
+                             (self.v1_model, ('user_id', 'status', 'answers', 'start_date', 'end_date')),
+                             (self.v2_model, ('organization_id', 'status', 'answers', 'start_date', 'end_date'))):
+            for attr in attrs:
+                event.listen(getattr(model, attr), 'set', lambda *args: None, active_history=True)
+
+        def before_flush(session, flush_context, instances):
+            if not any(isinstance(obj, tracked) for obj in session.new | session.dirty | session.deleted):
+                return
+            # Without the table there is nothing to keep current; its first build counts
+            # the rows as committed by then.
+            if not self._has_table(session.connection()):
+                return
+            try:
+                deltas = _Deltas()
+                context = self._before(session, deltas)
+                session.info[pending_key] = (deltas, context)
+            except Exception as e:
+                logger.error(f"KPI rollup update failed; run rebuild_kpi_rollups.py: {str(e)}")
+
+        def after_flush(session, flush_context):
+            pending = session.info.pop(pending_key, None)
+            if pending is None:
+                return
+            deltas, context = pending
+            try:
+                self._after(session, deltas, context['moved_from'])
+                self._upsert(session.connection(), deltas.rows())
+            except Exception as e:
+                logger.error(f"KPI rollup update failed; run rebuild_kpi_rollups.py: {str(e)}")
+
+        def after_rollback(session, previous_transaction):
+            session.info.pop(pending_key, None)
+
+        event.listen(Session, 'before_flush', before_flush)
+        event.listen(Session, 'after_flush', after_flush)
+        event.listen(Session, 'after_soft_rollback', after_rollback)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def rows(self, session, org_ids: Optional[Iterable[int]] = None) -> List:
+        """Rollup rows for ``org_ids`` (``None`` for all organizations)."""
+        self.ensure_ready()
+        model = self.rollup_model
+        query = session.query(model.organization_id, model.source, model.status, model.has_answers,
+                              model.item_count, model.days_total, model.days_count)
+        if org_ids is not None:
+            org_ids = list(org_ids)
+            if not org_ids:
+                return []
+            query = query.filter(model.organization_id.in_(org_ids))
+        return query.all()
+
+
+__all__ = [
+    'SOURCE_USERS',
+    'SOURCE_V1',
+    'SOURCE_V2',
+    'NO_ORGANIZATION',
+    'has_answers',
+    'days_between',
+    'KpiRollups',
+]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Add organizations.updated_at on databases created before the column was mapped.
+
+Organization maps updated_at (refreshed on every update) and the admin response feed
+uses it in its ETag, so renaming an organization invalidates cached feeds. Existing
+rows get the migration time as their first stamp.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_organizations_updated_at.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from sqlalchemy import inspect, text
+
+from app import app, db, Organization
+
+
+def migrate():
+    """Add the column if it is missing."""
+    try:
+        with app.app_context():
+            engine = db.engine
+            table = Organization.__tablename__
+            columns = {column['name'] for column in inspect(engine).get_columns(table)}
+
+            if 'updated_at' in columns:
+                print(f"{table}.updated_at already exists")
+            else:
+                print(f"Adding updated_at to {table}...")
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME NULL "
+                        "DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+                    ))
+
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if migrate() else 1)
@@ -6,6 +6,9 @@ Database migration script to add missing columns to question_types table.
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
 
 from app import app, db
 
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Upgrade the text analysis tables to the layout used by the background job runner
+(text_analysis_jobs.py).
+
+- text_analysis_jobs gets the active_key column and its unique index. Jobs still
+  queued/running from before the upgrade are marked failed; the next request queues
+  a fresh one.
+- text_answer_analytics from the old create_analysis_table layout (no job_id) only
+  holds derived data; it is dropped and recreated empty, and refilled by the next
+  analysis job.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_text_analysis_tables.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from sqlalchemy import inspect, text
+
+from app import app, db, TextAnalysisJob, TextAnswerAnalytics
+
+
+def _columns(engine, table):
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def migrate():
+    """Bring both tables up to date, creating them if missing."""
+    try:
+        with app.app_context():
+            engine = db.engine
+            jobs_table = TextAnalysisJob.__tablename__
+            results_table = TextAnswerAnalytics.__tablename__
+
+            if inspect(engine).has_table(jobs_table) and 'active_key' not in _columns(engine, jobs_table):
+                print(f"Adding active_key to {jobs_table}...")
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        f"UPDATE {jobs_table} SET status = 'failed', finished_at = UTC_TIMESTAMP(), "
+                        "error = 'Interrupted by the text analysis table migration' "
+                        "WHERE status IN ('queued', 'running')"
+                    ))
+                    conn.execute(text(f"ALTER TABLE {jobs_table} ADD COLUMN active_key SMALLINT NULL"))
+                    conn.execute(text(
+                        f"CREATE UNIQUE INDEX uq_text_analysis_jobs_active ON {jobs_table} (active_key)"
+                    ))
+            else:
+                TextAnalysisJob.__table__.create(engine, checkfirst=True)
+                print(f"{jobs_table} is up to date")
+
+            if inspect(engine).has_table(results_table) and 'job_id' not in _columns(engine, results_table):
+                print(f"Recreating legacy {results_table} table for job snapshots...")
+                TextAnswerAnalytics.__table__.drop(engine)
+            TextAnswerAnalytics.__table__.create(engine, checkfirst=True)
+            print(f"{results_table} is up to date")
+
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if migrate() else 1)
@@ -0,0 +1,310 @@
+"""org_hierarchy.py
+
+Organization closure table and the scope resolver built on it.
+
+Scoped endpoints resolved "the organizations under X" ad hoc; the KPI dashboard only
+followed one level of ``parent_organization``, so a denomination -> association -> church
+hierarchy lost everything below the first level. ``organization_closure`` stores one row
+per *(ancestor, descendant)* pair with the shortest ``depth`` between them (including
+``depth = 0`` self rows), so every descendant of an organization is one indexed lookup.
+
+Edges run from an organization to its parents:
+
+* ``organizations.parent_organization``;
+* ``organization_relationships`` rows (``organization_id`` -> ``related_organization_id``)
+  whose ``relationship_type`` is one of ``SCOPE_RELATIONSHIP_TYPES`` (``ORG_SCOPE_
+  RELATIONSHIP_TYPES``, comma-separated, default denomination/association/umbrella
+  association). Accreditation or looser affiliations do not grant scope by default.
+
+An organization may have several parents (a DAG); cycles in bad data are tolerated and
+simply stop the walk. ``OrganizationHierarchy.watch()`` recomputes the closure rows of
+the organizations whose parents changed in a flush, and of everything below them, on the
+flushing connection, so the table commits or rolls back with the change. The affected
+sub-graph is usually a handful of rows; ``rebuild`` recomputes the whole table.
+
+Nothing happens at import: the first scope lookup in a process creates the table if it
+is missing and fills it when it is empty (a new install, or a build that failed part way),
+so the table heals itself without a deploy step.
+
+``descendant_ids`` is cached per process for ``cache_ttl`` seconds (``ORG_SCOPE_CACHE_TTL``,
+default 60) and cleared when this process commits a hierarchy change.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+SCOPE_RELATIONSHIP_TYPES = tuple(
+    t.strip().lower() for t in os.getenv(
+        'ORG_SCOPE_RELATIONSHIP_TYPES', 'denomination,association,umbrella_association,umbrella association'
+    ).split(',') if t.strip()
+)
+
+DEFAULT_CACHE_TTL = float(os.getenv('ORG_SCOPE_CACHE_TTL', '60'))
+
+
+def compute_closure(nodes: Iterable[int], parents: Dict[int, Set[int]],
+                    known: Optional[Dict[int, Dict[int, int]]] = None) -> Dict[int, Dict[int, int]]:
+    """``{descendant: {ancestor: depth}}`` for ``nodes``.
+
+    ``parents`` gives each node's direct parents; ancestors of parents outside ``nodes``
+    are taken from ``known`` (their existing closure rows) when given. Depth is the
+    shortest path; a cycle is cut where the walk meets a node still being resolved.
+    """
+    nodes = set(nodes)
+    known = known or {}
+    resolved: Dict[int, Dict[int, int]] = {}
+    visiting: Set[int] = set()
+
+    def ancestors_of(node: int) -> Dict[int, int]:
+        if node in resolved:
+            return resolved[node]
+        if node not in nodes:
+            return known.get(node, {node: 0})
+        visiting.add(node)
+        result = {node: 0}
+        for parent in parents.get(node, ()):
+            if parent in visiting:
+                continue
+            for ancestor, depth in ancestors_of(parent).items():
+                if ancestor != node and depth + 1 < result.get(ancestor, depth + 2):
+                    result[ancestor] = depth + 1
+        visiting.discard(node)
+        resolved[node] = result
+        return result
+
+    for node in nodes:
+        ancestors_of(node)
+    return resolved
+
+
+class OrganizationHierarchy:
+    """Maintain ``closure_model`` for ``org_model``/``relationship_model`` and resolve scopes."""
+
+    def __init__(self, db, closure_model, org_model, relationship_model, cache_ttl: float = DEFAULT_CACHE_TTL):
+        self.db = db
+        self.closure_model = closure_model
+        self.org_model = org_model
+        self.relationship_model = relationship_model
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Tuple[int, bool], Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._table_exists = False
+        self._table_ready = False
+
+    def ensure_table(self) -> bool:
+        """Create the table if needed; returns True when it was just created (and is empty)."""
+        if self._table_exists:
+            return False
+        created = not inspect(self.db.engine).has_table(self.closure_model.__tablename__)
+        self.closure_model.__table__.create(self.db.engine, checkfirst=True)
+        self._table_exists = True
+        return created
+
+    def _has_table(self, connection) -> bool:
+        if not self._table_exists:
+            self._table_exists = inspect(connection).has_table(self.closure_model.__tablename__)
+        return self._table_exists
+
+    def ensure_ready(self) -> None:
+        """Create the table and build it if it is new or empty; free once done in this process.
+
+        A failed build leaves the table empty and is retried by the next call.
+        """
+        if self._table_ready:
+            return
+        with self._build_lock:
+            if self._table_ready:
+                return
+            table = self.closure_model.__table__
+            created = self.ensure_table()
+            with self.db.engine.begin() as connection:
+                if created or connection.execute(select(table.c.ancestor_id).limit(1)).first() is None:
+                    rows = self._rebuild(connection)
+                    logger.info(f"Organization closure table built ({rows} rows)")
+            self.clear_cache()
+            self._table_ready = True
+
+    # ------------------------------------------------------------------
+    # Edges
+    # ------------------------------------------------------------------
+
+    def _parents(self, connection, org_ids: Optional[Set[int]] = None) -> Tuple[Set[int], Dict[int, Set[int]]]:
+        """Existing organization IDs among ``org_ids`` (all if ``None``) and their parents."""
+        org = self.org_model.__table__
+        rel = self.relationship_model.__table__
+        org_query = select(org.c.id, org.c.parent_organization)
+        rel_query = select(rel.c.organization_id, rel.c.related_organization_id).where(
+            func.lower(rel.c.relationship_type).in_(SCOPE_RELATIONSHIP_TYPES))
+        if org_ids is not None:
+            org_query = org_query.where(org.c.id.in_(org_ids))
+            rel_query = rel_query.where(rel.c.organization_id.in_(org_ids))
+
+        existing = set()
+        parents: Dict[int, Set[int]] = defaultdict(set)
+        for org_id, parent_id in connection.execute(org_query):
+            existing.add(org_id)
+            if parent_id is not None and parent_id != org_id:
+                parents[org_id].add(parent_id)
+        for org_id, related_id in connection.execute(rel_query):
+            if related_id is not None and related_id != org_id:
+                parents[org_id].add(related_id)
+        return existing, parents
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _rows(closure: Dict[int, Dict[int, int]]) -> List[Dict]:
+        return [{'ancestor_id': ancestor, 'descendant_id': descendant, 'depth': depth}
+                for descendant, ancestors in closure.items() for ancestor, depth in ancestors.items()]
+
+    def _insert(self, connection, rows: List[Dict], batch_size: int = 1000) -> None:
+        table = self.closure_model.__table__
+        for start in range(0, len(rows), batch_size):
+            connection.execute(table.insert(), rows[start:start + batch_size])
+
+    def _rebuild(self, connection, batch_size: int = 1000) -> int:
+        existing, parents = self._parents(connection)
+        closure = compute_closure(existing, {k: v & existing for k, v in parents.items()})
+        rows = self._rows(closure)
+        connection.execute(self.closure_model.__table__.delete())
+        self._insert(connection, rows, batch_size)
+        return len(rows)
+
+    def rebuild(self, session, batch_size: int = 1000) -> int:
+        """Recompute the whole closure table. Commits; returns rows written."""
+        self.ensure_table()
+        rows = self._rebuild(session.connection(), batch_size)
+        session.commit()
+        self.clear_cache()
+        self._table_ready = True
+        return rows
+
+    def refresh(self, connection, changed: Iterable[int]) -> int:
+        """Recompute closure rows for ``changed`` organizations and all their descendants."""
+        changed = {org_id for org_id in changed if org_id is not None}
+        if not changed:
+            return 0
+        table = self.closure_model.__table__
+
+        # Everything below a changed organization (per the closure as it was) is affected
+        affected = set(changed)
+        affected.update(row[0] for row in connection.execute(
+            select(table.c.descendant_id).where(table.c.ancestor_id.in_(changed))))
+
+        existing, parents = self._parents(connection, affected)
+        outside = {parent for node in existing for parent in parents.get(node, ()) if parent not in affected}
+        known: Dict[int, Dict[int, int]] = defaultdict(dict)
+        if outside:
+            for ancestor, descendant, depth in connection.execute(
+                    select(table.c.ancestor_id, table.c.descendant_id, table.c.depth)
+                    .where(table.c.descendant_id.in_(outside))):
+                known[descendant][ancestor] = depth
+        # A parent with no closure rows no longer exists; drop the edge
+        parents = {node: {p for p in ps if p in affected and p in existing or p in known}
+                   for node, ps in parents.items()}
+
+        closure = compute_closure(existing, parents, known)
+        connection.execute(table.delete().where(table.c.descendant_id.in_(affected)))
+        deleted = affected - existing
+        if deleted:
+            connection.execute(table.delete().where(table.c.ancestor_id.in_(deleted)))
+        rows = self._rows(closure)
+        self._insert(connection, rows)
+        return len(rows)
+
+    def watch(self) -> None:
+        """Refresh the closure in the same transaction as every ORM flush that changes edges."""
+        org_model, rel_model = self.org_model, self.relationship_model
+        pending_key = 'org_hierarchy_changed'
+
+        def _previous(obj, attr):
+            history = inspect(obj).attrs[attr].history
+            return history.deleted[0] if history.deleted else None
+
+        def after_flush(session, flush_context):
+            changed = set()
+            for obj in session.new | session.deleted:
+                if isinstance(obj, org_model):
+                    changed.add(obj.id)
+                elif isinstance(obj, rel_model):
+                    changed.add(obj.organization_id)
+            for obj in session.dirty:
+                if isinstance(obj, org_model) and inspect(obj).attrs.parent_organization.history.has_changes():
+                    changed.add(obj.id)
+                elif isinstance(obj, rel_model) and session.is_modified(obj):
+                    changed.update((obj.organization_id, _previous(obj, 'organization_id')))
+            changed.discard(None)
+            # Without the table there is nothing to keep current; its first build reads
+            # the hierarchy as committed by then.
+            if not changed or not self._has_table(session.connection()):
+                return
+            try:
+                self.refresh(session.connection(), changed)
+                session.info[pending_key] = True
+            except Exception as e:
+                logger.error(f"Organization closure refresh failed; run rebuild_org_closure.py: {str(e)}")
+
+        def after_commit(session):
+            if session.info.pop(pending_key, False):
+                self.clear_cache()
+
+        def after_rollback(session, previous_transaction):
+            session.info.pop(pending_key, None)
+
+        event.listen(Session, 'after_flush', after_flush)
+        event.listen(Session, 'after_commit', after_commit)
+        event.listen(Session, 'after_soft_rollback', after_rollback)
+
+    # ------------------------------------------------------------------
+    # Scope resolution
+    # ------------------------------------------------------------------
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def descendant_ids(self, org_id: int, include_self: bool = True) -> List[int]:
+        """Every organization at any depth below ``org_id`` (and ``org_id`` itself)."""
+        key = (org_id, include_self)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.cache_ttl:
+                return entry[0]
+
+        self.ensure_ready()
+        model = self.closure_model
+        query = self.db.session.query(model.descendant_id).filter(model.ancestor_id == org_id)
+        if not include_self:
+            query = query.filter(model.depth > 0)
+        ids = sorted(row[0] for row in query.all())
+        with self._lock:
+            self._cache[key] = (ids, time.monotonic())
+        return ids
+
+    def ancestor_ids(self, org_id: int, include_self: bool = True) -> List[int]:
+        """Every organization ``org_id`` belongs to, nearest first."""
+        self.ensure_ready()
+        model = self.closure_model
+        query = self.db.session.query(model.ancestor_id).filter(model.descendant_id == org_id)
+        if not include_self:
+            query = query.filter(model.depth > 0)
+        return [row[0] for row in query.order_by(model.depth, model.ancestor_id).all()]
+
+
+__all__ = [
+    'SCOPE_RELATIONSHIP_TYPES',
+    'compute_closure',
+    'OrganizationHierarchy',
+]
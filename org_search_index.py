@@ -0,0 +1,384 @@
+"""org_search_index.py
+
+In-memory inverted index behind ``GET /api/organizations/search``.
+
+The endpoint used to load every ``Organization`` on each keystroke, score every name with
+a nested Python function (rebuilding trigram/token sets for each target on every call) and
+lazily load ``organization_type`` for each match. ``OrganizationSearchIndex`` keeps one
+pre-processed entry per organization plus posting lists, so a query only touches
+organizations that can possibly score:
+
+* ``contains`` -- names containing the query come from the intersection of the posting
+  lists of the query's n-grams (1- to 3-grams); names contained in the query are looked
+  up by exact lower-cased name for each substring of the query;
+* ``token_match`` -- the union of the posting lists of the query's words;
+* ``fuzzy`` -- a ratio above 0.3 needs at least ``m`` positional character matches (or
+  shared trigrams) out of ``n``, so by pigeonhole any candidate appears in the postings
+  of any ``n - m + 1`` query positions (trigrams); the rarest ones are probed.
+
+Candidates are scored with ``score_name``, which reproduces the original
+``calculate_similarity`` exactly (its unreachable ``starts_with`` branch is omitted), and
+the top ``limit`` are picked with a heap. ``total_matches`` is still exact because the
+candidate set is a superset of every name scoring above ``MIN_SCORE``.
+
+The index is warmed in the background on a worker's first request (``start`` is a
+``before_request`` hook, never called at import, so scripts importing the app do no DB
+work); a search arriving first builds it synchronously. It is kept current for changes
+made through this process by session events (applied on commit, discarded on rollback),
+and rebuilt in the background every ``max_age`` seconds (``ORG_SEARCH_INDEX_TTL``,
+default 300) to pick up changes made by other workers or raw SQL.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Only names scoring above this are returned (as before)
+MIN_SCORE = 20
+FUZZY_THRESHOLD = 0.3
+
+DEFAULT_MAX_AGE = float(os.getenv('ORG_SEARCH_INDEX_TTL', '300'))
+
+COMMON_WORDS = frozenset({'the', 'of', 'and', 'church', 'organization', 'org', 'inc', 'ltd', 'ministry', 'ministries'})
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def clean_name(name: str) -> str:
+    return ' '.join(w for w in name.lower().split() if w not in COMMON_WORDS)
+
+
+def get_trigrams(s: str) -> frozenset:
+    s = s.lower().strip()
+    if len(s) < 3:
+        return frozenset()
+    return frozenset(s[i:i + 3] for i in range(len(s) - 2))
+
+
+def simple_ratio(s1: str, s2: str) -> float:
+    """Share of positions holding the same character, over the longer length."""
+    if not s1 or not s2:
+        return 0
+    matches = sum(1 for a, b in zip(s1, s2) if a == b)
+    return matches / max(len(s1), len(s2))
+
+
+class NameFeatures:
+    """Everything ``score_name`` needs about one string, computed once."""
+
+    __slots__ = ('lower', 'tokens', 'clean', 'trigrams')
+
+    def __init__(self, name: str):
+        self.lower = name.lower().strip()
+        self.tokens = frozenset(self.lower.split())
+        self.clean = clean_name(name)
+        self.trigrams = get_trigrams(name)
+
+
+def score_name(query: NameFeatures, target: NameFeatures) -> Tuple[int, str]:
+    """``(score, match_type)`` for ``target`` against ``query``."""
+    q, t = query.lower, target.lower
+    if q == t:
+        return 100, 'exact'
+
+    if q in t or t in q:
+        shorter = min(len(q), len(t))
+        longer = max(len(q), len(t))
+        return max(int((shorter / longer) * 95), 75), 'contains'
+
+    if query.tokens and target.tokens:
+        intersection = query.tokens & target.tokens
+        if intersection:
+            jaccard = len(intersection) / len(query.tokens | target.tokens)
+            return max(int(jaccard * 85), 50), 'token_match'
+
+    ratio = simple_ratio(q, t)
+    if query.clean and target.clean:
+        ratio = max(ratio, simple_ratio(query.clean, target.clean))
+    if query.trigrams and target.trigrams:
+        union = len(query.trigrams | target.trigrams)
+        ratio = max(ratio, len(query.trigrams & target.trigrams) / union if union > 0 else 0)
+
+    if ratio > FUZZY_THRESHOLD:
+        return int(ratio * 80), 'fuzzy'
+    return 0, 'none'
+
+
+def _required_matches(n: int) -> int:
+    """Fewest matches ``m`` out of ``n`` with ``m / n`` above the fuzzy threshold.
+
+    Both fuzzy ratios divide by at least ``n`` (the query's length / trigram count), so a
+    name with fewer positional (trigram) matches cannot score.
+    """
+    for m in range(1, n + 1):
+        if m / n > FUZZY_THRESHOLD:
+            return m
+    return n
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class _Entry:
+    __slots__ = ('id', 'name', 'type_id', 'features')
+
+    def __init__(self, org_id: int, name: str, type_id):
+        self.id = org_id
+        self.name = name
+        self.type_id = type_id
+        self.features = NameFeatures(name)
+
+
+class OrganizationSearchIndex:
+    """Thread-safe search index over ``(id, name, type)`` of ``model`` rows."""
+
+    def __init__(self, app, db, model, max_age: float = DEFAULT_MAX_AGE):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._entries: Dict[int, _Entry] = {}
+        self._grams: Dict[str, Set[int]] = {}          # 1- to 3-grams of the lower-cased name
+        self._by_lower: Dict[str, Set[int]] = {}       # exact lower-cased name
+        self._lengths: Set[int] = set()                # distinct lower-cased name lengths
+        self._tokens: Dict[str, Set[int]] = {}         # whitespace-separated words
+        self._positions: Dict[Tuple[int, str], Set[int]] = {}        # (index, char) of lower
+        self._clean_positions: Dict[Tuple[int, str], Set[int]] = {}  # (index, char) of clean
+        self._built_at: Optional[float] = None
+        self._refreshing = False
+        self.stats = {'builds': 0, 'searches': 0, 'candidates': 0}
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _post(postings: Dict, key, org_id: int) -> None:
+        postings.setdefault(key, set()).add(org_id)
+
+    @staticmethod
+    def _unpost(postings: Dict, key, org_id: int) -> None:
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(org_id)
+            if not ids:
+                del postings[key]
+
+    def _keys(self, entry: _Entry):
+        f = entry.features
+        grams = {f.lower[i:i + n] for n in (1, 2, 3) for i in range(len(f.lower) - n + 1)}
+        return (
+            (self._grams, grams),
+            (self._by_lower, (f.lower,)),
+            (self._tokens, f.tokens),
+            (self._positions, set(enumerate(f.lower))),
+            (self._clean_positions, set(enumerate(f.clean))),
+        )
+
+    def _add(self, entry: _Entry) -> None:
+        self._entries[entry.id] = entry
+        self._lengths.add(len(entry.features.lower))
+        for postings, keys in self._keys(entry):
+            for key in keys:
+                self._post(postings, key, entry.id)
+
+    def _discard(self, org_id: int) -> None:
+        entry = self._entries.pop(org_id, None)
+        if entry is None:
+            return
+        for postings, keys in self._keys(entry):
+            for key in keys:
+                self._unpost(postings, key, org_id)
+
+    def upsert(self, org_id: int, name, type_id) -> None:
+        with self._lock:
+            self._discard(org_id)
+            if name:  # blank names never match (as before)
+                self._add(_Entry(org_id, name, type_id))
+
+    def remove(self, org_id: int) -> None:
+        with self._lock:
+            self._discard(org_id)
+
+    def build(self) -> None:
+        """(Re)load every organization. Call within an app context."""
+        model = self.model
+        rows = self.db.session.query(model.id, model.name, model.type).all()
+        fresh = OrganizationSearchIndex(self.app, self.db, model, self.max_age)
+        for org_id, name, type_id in rows:
+            if name:
+                fresh._add(_Entry(org_id, name, type_id))
+        with self._lock:
+            for attr in ('_entries', '_grams', '_by_lower', '_lengths', '_tokens', '_positions',
+                         '_clean_positions'):
+                setattr(self, attr, getattr(fresh, attr))
+            self._built_at = time.monotonic()
+            self.stats['builds'] += 1
+        logger.info(f"Organization search index built ({len(rows)} organizations)")
+
+    def _refresh_in_background(self) -> None:
+        def run():
+            with self.app.app_context():
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.error(f"Organization search index rebuild failed: {str(e)}")
+                finally:
+                    self._refreshing = False
+                    self.db.session.remove()
+
+        self._refreshing = True
+        threading.Thread(target=run, name='org-search-index', daemon=True).start()
+
+    def ensure_fresh(self) -> None:
+        """Build synchronously the first time; later, rebuild in the background when old."""
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        if not self._refreshing and time.monotonic() - self._built_at > self.max_age:
+            self._refresh_in_background()
+
+    def start(self) -> None:
+        """Warm the index in the background; a no-op once built. Cheap enough to call per request."""
+        if self._built_at is None and not self._refreshing:
+            self._refresh_in_background()
+
+    def watch(self) -> None:
+        """Keep the index in step with ``model`` rows committed through any ORM session."""
+        model = self.model
+        key = 'org_search_index_changes'
+
+        def after_flush(session, flush_context):
+            changes = session.info.setdefault(key, {})
+            for obj in session.new | session.dirty:
+                if isinstance(obj, model) and obj.id is not None:
+                    changes[obj.id] = (obj.name, obj.type)
+            for obj in session.deleted:
+                if isinstance(obj, model) and obj.id is not None:
+                    changes[obj.id] = None
+
+        def after_commit(session):
+            changes = session.info.pop(key, None)
+            if not changes or self._built_at is None:
+                return
+            for org_id, values in changes.items():
+                if values is None:
+                    self.remove(org_id)
+                else:
+                    self.upsert(org_id, *values)
+
+        def after_rollback(session):
+            session.info.pop(key, None)
+
+        event.listen(Session, 'after_flush', after_flush)
+        event.listen(Session, 'after_commit', after_commit)
+        event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: after_rollback(session))
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _probe(self, postings: Dict, keys: List, required: int) -> Set[int]:
+        """Ids sharing at least one of the ``len(keys) - required + 1`` rarest keys."""
+        if not keys:
+            return set()
+        keys = sorted(keys, key=lambda k: len(postings.get(k, ())))
+        found: Set[int] = set()
+        for k in keys[:len(keys) - required + 1]:
+            found.update(postings.get(k, ()))
+        return found
+
+    def _candidates(self, query: NameFeatures) -> Set[int]:
+        q = query.lower
+        candidates: Set[int] = set()
+
+        # Names containing the query: every n-gram of the query is in the name
+        gram_size = min(3, len(q))
+        grams = sorted({q[i:i + gram_size] for i in range(len(q) - gram_size + 1)},
+                       key=lambda g: len(self._grams.get(g, ())))
+        if grams:
+            containing = set(self._grams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not containing:
+                    break
+                containing &= self._grams.get(gram, set())
+            candidates.update(org_id for org_id in containing if q in self._entries[org_id].features.lower)
+
+        # Names contained in the query (including whitespace-only names)
+        for length in self._lengths:
+            if length > len(q):
+                continue
+            for i in range(len(q) - length + 1):
+                candidates.update(self._by_lower.get(q[i:i + length], ()))
+
+        # Shared words
+        for token in query.tokens:
+            candidates.update(self._tokens.get(token, ()))
+
+        # Fuzzy: positional characters (raw and cleaned) and trigrams
+        positions = list(enumerate(q))
+        candidates |= self._probe(self._positions, positions, _required_matches(len(positions)))
+        clean_positions = list(enumerate(query.clean))
+        candidates |= self._probe(self._clean_positions, clean_positions, _required_matches(len(clean_positions)))
+        trigrams = list(query.trigrams)
+        candidates |= self._probe(self._grams, trigrams, _required_matches(len(trigrams)))
+        return candidates
+
+    def search(self, query: str, limit: int = 10) -> Tuple[List[Dict], int]:
+        """Top ``limit`` matches (score desc, then id) and the total number of matches."""
+        self.ensure_fresh()
+        features = NameFeatures(query)
+        with self._lock:
+            candidate_ids = self._candidates(features)
+            scored = []
+            for org_id in candidate_ids:
+                entry = self._entries[org_id]
+                score, match_type = score_name(features, entry.features)
+                if score > MIN_SCORE:
+                    scored.append((score, org_id, match_type, entry))
+        self.stats['searches'] += 1
+        self.stats['candidates'] += len(candidate_ids)
+
+        top = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1]))
+        return [{
+            'id': entry.id,
+            'name': entry.name,
+            'type_id': entry.type_id,
+            'match_score': score,
+            'match_type': match_type,
+        } for score, _, match_type, entry in top], len(scored)
+
+    def first(self, limit: int) -> List[Dict]:
+        """The ``limit`` lowest-id organizations (the empty-query listing)."""
+        self.ensure_fresh()
+        with self._lock:
+            entries = heapq.nsmallest(limit, self._entries.values(), key=lambda entry: entry.id)
+        return [{
+            'id': entry.id,
+            'name': entry.name,
+            'type_id': entry.type_id,
+            'match_score': 0,
+            'match_type': 'none',
+        } for entry in entries]
+
+
+__all__ = [
+    'MIN_SCORE',
+    'NameFeatures',
+    'score_name',
+    'OrganizationSearchIndex',
+]
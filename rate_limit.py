@@ -0,0 +1,42 @@
+"""rate_limit.py
+
+Thread-safe token bucket shared by the background workers that call rate-limited
+external services (geocoding providers in ``batch_geocoder``, SES/SMTP in
+``email_delivery``). Worker pools size for throughput; the bucket keeps the aggregate
+request rate within the provider's quota no matter how many threads are calling.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+__all__ = [
+    'TokenBucket',
+]
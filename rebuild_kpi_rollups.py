@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Rebuild the kpi_org_rollups table used by /api/kpi/dashboard.
+
+The table is created and filled on first use and kept current on every
+ORM write; run this after bulk/raw SQL changes to users or survey responses, or if the
+application log reports a failed KPI rollup update.
+
+Usage:
+    python rebuild_kpi_rollups.py [--batch-size 1000]
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from app import app, db, kpi_rollups
+
+
+def rebuild(batch_size):
+    """Recount users and v1/v2 responses per organization, status and answered-ness."""
+    try:
+        with app.app_context():
+            rows = kpi_rollups.rebuild(db.session, batch_size=batch_size)
+            print(f"{rows} KPI rollup rows written")
+            print("✅ Rebuild completed successfully!")
+            return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error during rebuild: {str(e)}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild kpi_org_rollups from users and survey responses')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows fetched per round trip')
+    args = parser.parse_args()
+    return rebuild(args.batch_size)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Rebuild the organization_closure table used for organization scope resolution.
+
+The table is created and filled on first use and kept current on every
+ORM write to organizations and organization relationships; run this after bulk/raw SQL
+changes to either, after changing ORG_SCOPE_RELATIONSHIP_TYPES, or if the application
+log reports a failed organization closure refresh.
+
+Usage:
+    python rebuild_org_closure.py [--batch-size 1000]
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from app import app, db, org_hierarchy
+
+
+def rebuild(batch_size):
+    """Recompute every (ancestor, descendant, depth) row from the current hierarchy."""
+    try:
+        with app.app_context():
+            rows = org_hierarchy.rebuild(db.session, batch_size=batch_size)
+            print(f"{rows} organization closure rows written")
+            print("✅ Rebuild completed successfully!")
+            return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error during rebuild: {str(e)}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild organization_closure from organizations and relationships')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per statement')
+    args = parser.parse_args()
+    return rebuild(args.batch_size)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
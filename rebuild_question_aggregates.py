@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Rebuild the question_aggregates and question_signature_index tables used by
+/api/survey-responses/compare-by-template.
+
+Run once after deploying, and whenever min/max bounds are flagged stale or users
+have been moved between organizations of different types.
+
+Usage:
+    python rebuild_question_aggregates.py [--batch-size 500]
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# One-off run: keep the app's background workers out of this process
+os.environ.setdefault('EMAIL_OUTBOX_ENABLED', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+from app import (app, db, SurveyResponse, SurveyTemplate, QuestionAggregate,
+                 QuestionSignatureIndex, _organization_type_names)
+from comparison_aggregates import rebuild_question_aggregates, rebuild_signature_index
+
+
+def rebuild(batch_size):
+    """Re-index template signatures and recompute all per-(signature, organization type) aggregates."""
+    try:
+        with app.app_context():
+            QuestionAggregate.__table__.create(db.engine, checkfirst=True)
+            QuestionSignatureIndex.__table__.create(db.engine, checkfirst=True)
+
+            templates, index_rows = rebuild_signature_index(db.session, QuestionSignatureIndex, SurveyTemplate)
+            print(f"{templates} templates -> {index_rows} signature index rows")
+
+            org_types = {}
+
+            def organization_type_for(response):
+                if response.user_id not in org_types:
+                    org_types.update(_organization_type_names([response.user_id]))
+                return org_types.get(response.user_id, '')
+
+            processed, rows = rebuild_question_aggregates(
+                db.session, QuestionAggregate, SurveyResponse,
+                lambda r: r.template.questions if r.template else None,
+                organization_type_for,
+                batch_size=batch_size,
+            )
+            print(f"{processed} completed responses -> {rows} aggregate rows")
+            print("✅ Rebuild completed successfully!")
+            return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error during rebuild: {str(e)}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild question_aggregates from completed survey responses')
+    parser.add_argument('--batch-size', type=int, default=500, help='Responses loaded per query')
+    args = parser.parse_args()
+    return rebuild(args.batch_size)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -9,8 +9,13 @@ from flask import jsonify, request
 from datetime import datetime, timedelta
 import logging
 
+from email_delivery import deliver_all
+
 logger = logging.getLogger(__name__)
 
+# How often the scheduler looks for due reminder settings
+REMINDER_INTERVAL = timedelta(minutes=5)
+
 
 def register_reminder_settings_routes(app, db):
     """Register all reminder-settings routes with the Flask app."""
@@ -28,6 +33,7 @@ def register_reminder_settings_routes(app, db):
     SurveyResponse = app_module.SurveyResponse
     Organization = app_module.Organization
     send_reminder_email = app_module.send_reminder_email
+    scheduler = app_module.scheduler
 
     # ------------------------------------------------------------------
     # Models – column names match the existing DB schema exactly
@@ -67,7 +73,11 @@ def register_reminder_settings_routes(app, db):
 
     class SurveyReminderLog(db.Model):
         __tablename__ = 'survey_reminder_logs'
-        __table_args__ = {'extend_existing': True}
+        __table_args__ = (
+            # Backs the per-user sent-count aggregate in _plan_reminders
+            db.Index('idx_reminder_logs_setting_user', 'reminder_setting_id', 'invitation_id', 'status'),
+            {'extend_existing': True},
+        )
 
         id = db.Column(db.Integer, primary_key=True)
         reminder_setting_id = db.Column(db.Integer, nullable=False)
@@ -106,8 +116,13 @@ def register_reminder_settings_routes(app, db):
             return now + timedelta(days=30)
         return now + timedelta(weeks=1)
 
-    def _execute_reminders(setting):
-        """Core logic: send reminder emails for a single SurveyReminderSetting."""
+    def _plan_reminders(setting):
+        """One query for everyone due a reminder under ``setting``.
+
+        Joins responses -> users -> organizations with the per-user count of reminders
+        already sent for this setting, and applies the ``max_reminders`` cap in SQL.
+        Returns one row per user (a user with several open responses gets one reminder).
+        """
         # Determine which statuses to target
         target = setting.target_audience
         if target == 'not_started':
@@ -117,86 +132,95 @@ def register_reminder_settings_routes(app, db):
         else:  # all_pending
             target_statuses = ['pending', 'in_progress']
 
-        responses = SurveyResponse.query.filter(
+        sent_counts = db.session.query(
+            SurveyReminderLog.invitation_id.label('user_id'),
+            db.func.count(SurveyReminderLog.id).label('sent_count'),
+        ).filter(
+            SurveyReminderLog.reminder_setting_id == setting.id,
+            SurveyReminderLog.status == 'sent',
+        ).group_by(SurveyReminderLog.invitation_id).subquery()
+
+        rows = db.session.query(
+            User.id.label('user_id'),
+            User.email,
+            User.username,
+            User.survey_code,
+            User.firstname,
+            User.password,
+            Organization.name.label('organization_name'),
+            SurveyResponse.end_date,
+        ).join(
+            User, User.id == SurveyResponse.user_id
+        ).outerjoin(
+            Organization, Organization.id == User.organization_id
+        ).outerjoin(
+            sent_counts, sent_counts.c.user_id == User.id
+        ).filter(
             SurveyResponse.template_id == setting.survey_id,
             SurveyResponse.status.in_(target_statuses),
-        ).all()
-
-        sent = []
-        errors = []
+            User.email.isnot(None),
+            User.email != '',
+            db.func.coalesce(sent_counts.c.sent_count, 0) < setting.max_reminders,
+        ).order_by(SurveyResponse.id).all()
 
-        for response in responses:
-            user = User.query.get(response.user_id)
-            if not user or not user.email:
-                continue
+        planned = {}
+        for row in rows:
+            planned.setdefault(row.user_id, row)
+        return list(planned.values())
 
-            # Check max_reminders cap
-            already_sent = SurveyReminderLog.query.filter_by(
-                reminder_setting_id=setting.id,
-                invitation_id=user.id,
-                status='sent',
-            ).count()
+    def _execute_reminders(setting):
+        """Core logic: send reminder emails for a single SurveyReminderSetting.
 
-            if already_sent >= setting.max_reminders:
-                continue
+        Recipients come from a single planner query, emails go out concurrently through
+        the shared delivery pool, and the log rows are bulk-inserted with the setting's
+        timestamps in one commit.
+        """
+        recipients = _plan_reminders(setting)
+        now = datetime.utcnow()
 
+        def send(row):
             # Calculate days remaining
             days_remaining = None
-            if response.end_date:
-                delta = response.end_date - datetime.utcnow()
-                days_remaining = max(0, delta.days)
-
-            try:
-                org_name = None
-                if user.organization_id:
-                    org = Organization.query.get(user.organization_id)
-                    if org:
-                        org_name = org.name
-
-                result = send_reminder_email(
-                    to_email=user.email,
-                    username=user.username,
-                    survey_code=getattr(user, 'survey_code', None),
-                    firstname=getattr(user, 'firstname', None),
-                    organization_name=org_name,
-                    days_remaining=days_remaining,
-                    password=user.password,
-                )
-
-                log_status = 'sent' if result.get('success') else 'failed'
-                log = SurveyReminderLog(
-                    reminder_setting_id=setting.id,
-                    survey_id=setting.survey_id,
-                    invitation_id=user.id,
-                    respondent_email=user.email,
-                    status=log_status,
-                    error_message=result.get('error') if not result.get('success') else None,
-                )
-                db.session.add(log)
-
-                if result.get('success'):
-                    sent.append(user.email)
-                else:
-                    errors.append(f"Failed: {user.email} - {result.get('error')}")
-
-            except Exception as exc:
-                log = SurveyReminderLog(
-                    reminder_setting_id=setting.id,
-                    survey_id=setting.survey_id,
-                    invitation_id=user.id,
-                    respondent_email=user.email,
-                    status='failed',
-                    error_message=str(exc),
-                )
-                db.session.add(log)
-                errors.append(f"Error: {user.email} - {str(exc)}")
+            if row.end_date:
+                days_remaining = max(0, (row.end_date - now).days)
+            return send_reminder_email(
+                to_email=row.email,
+                username=row.username,
+                survey_code=row.survey_code,
+                firstname=row.firstname,
+                organization_name=row.organization_name,
+                days_remaining=days_remaining,
+                password=row.password,
+            )
+
+        results = deliver_all(recipients, send, context=app.app_context)
+
+        sent = 0
+        errors = []
+        logs = []
+        for row, result in zip(recipients, results):
+            if result.get('success'):
+                sent += 1
+            else:
+                errors.append(f"Failed: {row.email} - {result.get('error')}")
+            logs.append({
+                'reminder_setting_id': setting.id,
+                'survey_id': setting.survey_id,
+                'invitation_id': row.user_id,
+                'respondent_email': row.email,
+                'status': 'sent' if result.get('success') else 'failed',
+                'error_message': result.get('error') if not result.get('success') else None,
+            })
+        if logs:
+            db.session.bulk_insert_mappings(SurveyReminderLog, logs)
 
         # Update setting timestamps
         setting.last_run_at = datetime.utcnow()
         setting.next_run_at = _compute_next_run(setting.frequency)
         db.session.commit()
 
-        return {"sent": len(sent), "errors": errors}
+        logger.info(f"Reminder setting {setting.id}: {sent}/{len(recipients)} reminders sent")
+        return {"sent": sent, "errors": errors}
 
     # ------------------------------------------------------------------
     # Routes
@@ -305,30 +329,46 @@ def register_reminder_settings_routes(app, db):
             logger.error(f"Error sending reminders: {e}")
             return jsonify({"error": str(e)}), 500
 
+    def run_due_reminders():
+        """Send every active reminder setting whose ``next_run_at`` has passed.
+
+        Registered with the app's ``SchedulerService`` as ``due_reminders``, which runs it
+        on one worker at a time and records each run.
+        """
+        now = datetime.utcnow()
+        due_settings = SurveyReminderSetting.query.filter(
+            SurveyReminderSetting.is_active == True,
+            SurveyReminderSetting.next_run_at <= now,
+        ).all()
+
+        results = []
+        for setting in due_settings:
+            result = _execute_reminders(setting)
+            results.append({
+                "template_id": setting.survey_id,
+                **result
+            })
+
+        return {
+            "message": f"Processed {len(due_settings)} due reminder settings",
+            "results": results
+        }
+
+    scheduler.add_job('due_reminders', run_due_reminders, interval=REMINDER_INTERVAL)
+
     @app.route('/api/process-due-reminders', methods=['POST'])
     def process_due_reminders():
-        """Called by the scheduler - find all due reminder settings and send emails."""
+        """Run the due-reminder job now (unless another worker is already running it)."""
         try:
-            now = datetime.utcnow()
-            due_settings = SurveyReminderSetting.query.filter(
-                SurveyReminderSetting.is_active == True,
-                SurveyReminderSetting.next_run_at <= now,
-            ).all()
-
-            results = []
-            for setting in due_settings:
-                result = _execute_reminders(setting)
-                results.append({
-                    "template_id": setting.survey_id,
-                    **result
-                })
-
-            return jsonify({
-                "message": f"Processed {len(due_settings)} due reminder settings",
-                "results": results
-            }), 200
+            run = scheduler.run_now('due_reminders')
+            if run is None:
+                return jsonify({"error": "Due reminders are already being processed"}), 409
+            if run['status'] != 'succeeded':
+                return jsonify({"error": run['error'], "run": run}), 500
+            return jsonify({**run['result'], "run": run}), 200
 
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error processing due reminders: {e}")
             return jsonify({"error": str(e)}), 500
 
@@ -337,6 +377,8 @@ def register_reminder_settings_routes(app, db):
         try:
             SurveyReminderSetting.__table__.create(db.engine, checkfirst=True)
             SurveyReminderLog.__table__.create(db.engine, checkfirst=True)
+            for index in SurveyReminderLog.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
             logger.info("Reminder settings tables verified/created")
         except Exception as e:
             logger.warning(f"Could not create reminder tables (may already exist): {e}")
@@ -0,0 +1,212 @@
+"""request_metrics.py
+
+Per-request SQL/latency instrumentation shared by ``app.py`` and ``app_modular``.
+
+For every request it records:
+
+* SQL statement count and time spent in the DB driver
+  (``before_cursor_execute`` / ``after_cursor_execute`` engine events);
+* wall time, and "Python" time (wall time minus SQL time);
+* response size in bytes (when known; streamed bodies report 0).
+
+The numbers are returned as ``X-SQL-Count`` / ``X-SQL-Time-ms`` / ``X-Python-Time-ms`` /
+``X-Response-Bytes`` plus a ``Server-Timing`` header when the app runs in debug mode (or
+``PERF_HEADERS=1``), and kept in a rolling window per route that ``GET /api/debug/perf``
+summarises as p50/p95/p99 (``POST`` there clears the window). Routes with a high
+``sql_count`` are the N+1 candidates. The endpoint is unauthenticated, so it is only
+registered when ``PERF_ENDPOINT_ENABLED`` is set in the app config (or ``PERF_ENDPOINT=1``
+in the environment).
+
+Usage::
+
+    from request_metrics import init_request_metrics
+    init_request_metrics(app)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 500  # samples kept per route
+PERF_ENDPOINT = '/api/debug/perf'
+
+_engine_listeners_installed = False
+_engine_listeners_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# SQL timing (global engine events; only counted inside a request)
+# ---------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded even when the statement raises
+    if context is not None:
+        context._perf_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_perf_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context():
+        stats = g.get('_perf')
+        if stats is not None:
+            stats['sql_count'] += 1
+            stats['sql_time'] += elapsed
+
+
+def _install_engine_listeners() -> None:
+    global _engine_listeners_installed
+    with _engine_listeners_lock:
+        if not _engine_listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _engine_listeners_installed = True
+
+
+# ---------------------------------------------------------------------------
+# Rolling per-route store
+# ---------------------------------------------------------------------------
+
+def _flag(value) -> bool:
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class RequestMetricsStore:
+    """Thread-safe ring buffer of request samples keyed by ``"METHOD /rule"``."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, route: str, sample: Dict) -> None:
+        with self._lock:
+            self._samples[route].append(sample)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            snapshot = {route: list(samples) for route, samples in self._samples.items()}
+
+        rows = []
+        for route, samples in snapshot.items():
+            total = sorted(s['total_ms'] for s in samples)
+            sql_ms = sorted(s['sql_ms'] for s in samples)
+            python_ms = sorted(s['python_ms'] for s in samples)
+            sql_count = [s['sql_count'] for s in samples]
+            rows.append({
+                'route': route,
+                'samples': len(samples),
+                'total_ms': {p: round(_percentile(total, q), 2) for p, q in (('p50', 50), ('p95', 95), ('p99', 99))},
+                'sql_ms': {p: round(_percentile(sql_ms, q), 2) for p, q in (('p50', 50), ('p95', 95), ('p99', 99))},
+                'python_ms': {p: round(_percentile(python_ms, q), 2) for p, q in (('p50', 50), ('p95', 95), ('p99', 99))},
+                'sql_count': {
+                    'avg': round(sum(sql_count) / len(sql_count), 1),
+                    'max': max(sql_count),
+                },
+                'avg_response_bytes': int(sum(s['bytes'] for s in samples) / len(samples)),
+                'error_rate': round(sum(1 for s in samples if s['status'] >= 500) / len(samples), 3),
+            })
+        rows.sort(key=lambda row: row['total_ms']['p95'], reverse=True)
+        return rows
+
+
+# ---------------------------------------------------------------------------
+# Flask wiring
+# ---------------------------------------------------------------------------
+
+def init_request_metrics(app, window: int = DEFAULT_WINDOW) -> RequestMetricsStore:
+    """Attach the hooks (and, when enabled, the ``/api/debug/perf`` endpoint) to ``app``.
+
+    Set ``PERF_METRICS=0`` to disable entirely, ``PERF_HEADERS=1`` to emit the headers
+    outside debug mode, and ``PERF_ENDPOINT_ENABLED`` (config) or ``PERF_ENDPOINT=1``
+    (environment) to expose the summary endpoint.
+    """
+    store = RequestMetricsStore(window)
+    app.extensions['request_metrics'] = store
+    if os.getenv('PERF_METRICS', '1').lower() in ('0', 'false', 'no'):
+        logger.info("Request metrics disabled (PERF_METRICS=0)")
+        return store
+
+    _install_engine_listeners()
+    force_headers = _flag(os.getenv('PERF_HEADERS', '0'))
+    expose_endpoint = _flag(app.config.get('PERF_ENDPOINT_ENABLED', os.getenv('PERF_ENDPOINT', '0')))
+
+    @app.before_request
+    def _perf_start():
+        g._perf = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0}
+
+    @app.after_request
+    def _perf_finish(response):
+        stats = g.get('_perf')
+        if stats is None or request.path == PERF_ENDPOINT:
+            return response
+        total = time.perf_counter() - stats['start']
+        sql_time = stats['sql_time']
+        size = 0 if response.is_streamed else (response.calculate_content_length() or 0)
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        store.record(f"{request.method} {rule}", {
+            'total_ms': total * 1000,
+            'sql_ms': sql_time * 1000,
+            'python_ms': max(total - sql_time, 0.0) * 1000,
+            'sql_count': stats['sql_count'],
+            'bytes': size,
+            'status': response.status_code,
+        })
+        if app.debug or force_headers:
+            response.headers['X-SQL-Count'] = str(stats['sql_count'])
+            response.headers['X-SQL-Time-ms'] = f"{sql_time * 1000:.1f}"
+            response.headers['X-Python-Time-ms'] = f"{max(total - sql_time, 0.0) * 1000:.1f}"
+            response.headers['X-Response-Bytes'] = str(size)
+            response.headers['Server-Timing'] = (
+                f"sql;dur={sql_time * 1000:.1f}, app;dur={max(total - sql_time, 0.0) * 1000:.1f}"
+            )
+        return response
+
+    if not expose_endpoint:
+        logger.info(f"✅ Request metrics enabled ({PERF_ENDPOINT} not exposed; set PERF_ENDPOINT=1)")
+        return store
+
+    @app.route(PERF_ENDPOINT, methods=['GET'])
+    def debug_perf_summary():
+        """Rolling p50/p95/p99 latency and SQL counts per route."""
+        return jsonify({'window': store.window, 'routes': store.summary()}), 200
+
+    @app.route(PERF_ENDPOINT, methods=['POST'])
+    def reset_perf_summary():
+        """Return the summary and clear the rolling window."""
+        routes = store.summary()
+        store.reset()
+        return jsonify({'window': store.window, 'routes': routes}), 200
+
+    logger.info(f"✅ Request metrics enabled (GET/POST {PERF_ENDPOINT})")
+    return store
+
+
+__all__ = [
+    'RequestMetricsStore',
+    'init_request_metrics',
+]
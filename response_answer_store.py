@@ -0,0 +1,248 @@
+"""response_answer_store.py
+
+Write-through normalisation of survey answers into the ``response_answers`` table.
+
+``SurveyResponse.answers`` and ``SurveyResponseV2.answers`` are JSON blobs keyed by
+question ID. Analytics code used to load whole response rows and walk those dicts in
+Python; this module keeps a one-row-per-answer copy next to the JSON column so that
+aggregates can be expressed as indexed SQL ``GROUP BY`` queries instead.
+
+Like ``text_analytics`` the helpers are framework-agnostic: the SQLAlchemy session and
+model classes are passed in by the caller so there is no import cycle with ``app.py``.
+
+Row semantics
+-------------
+* ``numeric_value`` – float for native numbers/booleans, or the number extracted from a
+  string answer (``"41-50"`` -> ``45.5``, ``"about 12"`` -> ``12``).
+* ``text_value`` – the stripped string for string answers, JSON for lists/dicts and
+  ``NULL`` for native numbers. ``text_value IS NULL AND numeric_value IS NOT NULL``
+  therefore identifies answers that were stored as real numbers in the JSON blob.
+* ``section`` – taken from the template/survey question list when available.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+VERSION_V1 = 'v1'
+VERSION_V2 = 'v2'
+
+MAX_QUESTION_KEY_LENGTH = 255
+
+_RANGE_RE = re.compile(r'(\d+)\s*-\s*(\d+)')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+# ---------------------------------------------------------------------------
+# Normalisation
+# ---------------------------------------------------------------------------
+
+def extract_numeric_value(answer) -> Optional[float]:
+    """Best-effort numeric interpretation of a single answer value.
+
+    Mirrors the extraction used by the compare-by-template endpoint: plain numbers,
+    numeric strings, ranges (mid-point) and finally the first integer in the string.
+    """
+    if isinstance(answer, bool):
+        return float(answer)
+    if isinstance(answer, (int, float)):
+        return float(answer)
+    if not isinstance(answer, str):
+        return None
+
+    try:
+        return float(answer)
+    except ValueError:
+        pass
+
+    range_match = _RANGE_RE.match(answer)
+    if range_match:
+        return (float(range_match.group(1)) + float(range_match.group(2))) / 2
+
+    number_match = _NUMBER_RE.search(answer)
+    if number_match:
+        return float(number_match.group())
+    return None
+
+
+def _parse_json(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def build_section_lookup(questions) -> Dict[str, str]:
+    """Map ``str(question id)`` -> section name from a template/survey question list."""
+    questions = _parse_json(questions) or []
+    lookup = {}
+    for q in questions:
+        if not isinstance(q, dict):
+            continue
+        qid = q.get('id')
+        if qid is None:
+            continue
+        section = q.get('section')
+        if section:
+            lookup[str(qid)] = str(section)[:255]
+    return lookup
+
+
+def flatten_answers(answers, section_lookup: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """Turn an ``answers`` JSON blob into ``response_answers`` row dicts (sans IDs)."""
+    answers = _parse_json(answers)
+    if not isinstance(answers, dict):
+        return []
+    section_lookup = section_lookup or {}
+
+    rows = []
+    for key, value in answers.items():
+        if value is None:
+            continue
+        key = str(key)[:MAX_QUESTION_KEY_LENGTH]
+
+        if isinstance(value, (bool, int, float)):
+            text_value = None
+        elif isinstance(value, str):
+            text_value = value.strip()
+            if not text_value:
+                continue
+        else:
+            text_value = json.dumps(value)
+
+        rows.append({
+            'question_key': key,
+            'numeric_value': extract_numeric_value(value),
+            'text_value': text_value,
+            'section': section_lookup.get(key),
+        })
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Write path
+# ---------------------------------------------------------------------------
+
+def sync_response_answers(db_session, answer_model, response_id: int, version: str,
+                          answers, questions=None) -> int:
+    """Replace the normalised rows of one response. Does not commit.
+
+    Call this in the same transaction that writes ``answers`` so the JSON column and
+    the normalised copy never diverge. Returns the number of rows written.
+    """
+    db_session.query(answer_model).filter(
+        answer_model.version == version,
+        answer_model.response_id == response_id,
+    ).delete(synchronize_session=False)
+
+    rows = flatten_answers(answers, build_section_lookup(questions))
+    if rows:
+        for row in rows:
+            row['response_id'] = response_id
+            row['version'] = version
+        db_session.bulk_insert_mappings(answer_model, rows)
+    return len(rows)
+
+
+def delete_response_answers(db_session, answer_model, response_ids: Iterable[int], version: str) -> None:
+    """Drop the normalised rows of deleted responses. Does not commit."""
+    response_ids = list(response_ids)
+    if not response_ids:
+        return
+    db_session.query(answer_model).filter(
+        answer_model.version == version,
+        answer_model.response_id.in_(response_ids),
+    ).delete(synchronize_session=False)
+
+
+def backfill_response_answers(db_session, answer_model, response_model, version: str,
+                              questions_for, batch_size: int = 500) -> Tuple[int, int]:
+    """Rebuild ``response_answers`` for every row of ``response_model``.
+
+    ``questions_for`` is a callable ``response -> questions`` used for section lookup.
+    Commits once per batch and returns ``(responses_processed, rows_written)``.
+    """
+    processed = 0
+    written = 0
+    last_id = 0
+    while True:
+        batch = (
+            db_session.query(response_model)
+            .filter(response_model.id > last_id)
+            .order_by(response_model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for response in batch:
+            written += sync_response_answers(
+                db_session, answer_model, response.id, version,
+                response.answers, questions_for(response),
+            )
+        db_session.commit()
+        processed += len(batch)
+        last_id = batch[-1].id
+    return processed, written
+
+
+# ---------------------------------------------------------------------------
+# Read path
+# ---------------------------------------------------------------------------
+
+def aggregate_numeric_answers(db_session, answer_model, version: str, response_ids=None,
+                              native_only: bool = False, min_value=None, max_value=None) -> Dict[str, Dict]:
+    """Per-question ``COUNT/SUM/AVG/MIN/MAX`` of numeric answers as a single ``GROUP BY``.
+
+    ``response_ids`` may be a list or a SQL subquery/select of response IDs.
+    ``native_only`` restricts to answers stored as JSON numbers (not parsed strings).
+    """
+    query = db_session.query(
+        answer_model.question_key,
+        func.count(answer_model.numeric_value),
+        func.sum(answer_model.numeric_value),
+        func.min(answer_model.numeric_value),
+        func.max(answer_model.numeric_value),
+    ).filter(
+        answer_model.version == version,
+        answer_model.numeric_value.isnot(None),
+    )
+    if response_ids is not None:
+        query = query.filter(answer_model.response_id.in_(response_ids))
+    if native_only:
+        query = query.filter(answer_model.text_value.is_(None))
+    if min_value is not None:
+        query = query.filter(answer_model.numeric_value >= min_value)
+    if max_value is not None:
+        query = query.filter(answer_model.numeric_value <= max_value)
+
+    result = {}
+    for key, count, total, low, high in query.group_by(answer_model.question_key).all():
+        if not count:
+            continue
+        total = float(total or 0)
+        result[key] = {
+            'count': int(count),
+            'sum': total,
+            'avg': total / count,
+            'min': float(low),
+            'max': float(high),
+        }
+    return result
+
+
+__all__ = [
+    'VERSION_V1',
+    'VERSION_V2',
+    'extract_numeric_value',
+    'build_section_lookup',
+    'flatten_answers',
+    'sync_response_answers',
+    'delete_response_answers',
+    'backfill_response_answers',
+    'aggregate_numeric_answers',
+]
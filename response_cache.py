@@ -0,0 +1,396 @@
+"""response_cache.py
+
+Decorator-based HTTP response cache for read-heavy reference endpoints.
+
+Question types, organization types, titles, roles, the template list and a few stub
+lists are fetched on nearly every frontend page load and each fetch queried the
+database. ``ResponseCache`` stores the rendered body of successful ``GET`` responses:
+
+* ``@response_cache.cached('question_types', ttl=300)`` under ``@app.route`` caches a
+  view per *namespace*, keyed by path and sorted query string. Namespaces are prefixed
+  with a hash of the cache's ``scope`` (app.py passes its database URI), so deployments
+  sharing a host -- or a cache file -- never serve each other's entries;
+* every cached response carries a strong ``ETag`` (SHA-1 of the body) and
+  ``Cache-Control`` (``no-cache`` by default, i.e. revalidate each time -- with
+  ``If-None-Match`` that costs a ``304`` and no query). ``X-Cache`` says ``HIT``/``MISS``;
+* ``@response_cache.invalidates('question_types')`` on write routes, or
+  ``response_cache.invalidate(...)``, drops a namespace once the write succeeded.
+  ``watch_models`` additionally invalidates namespaces whenever a commit touched one of
+  the given models, for writers outside the decorated routes. Bulk ``query.delete()``
+  bypasses the ORM events, which is why the write routes are decorated as well;
+* invalidation bumps the namespace's *generation*. A response computed while an
+  invalidation happened is not stored, because it is stored against the generation
+  read before the view ran.
+
+Backends (``RESPONSE_CACHE_BACKEND``):
+
+* ``sqlite`` (default) -- ``SQLiteBackend``, a WAL-mode SQLite file shared by all
+  gunicorn workers of the app, so an invalidation in one worker is seen by all of them.
+  ``RESPONSE_CACHE_PATH`` overrides the path the app passes (its instance folder);
+* ``lru`` -- ``LRUBackend``, in-process; invalidations only reach the worker that made
+  them, other workers serve their copy until the TTL expires;
+* ``off`` -- no caching (the decorators pass through).
+
+Hit/miss/store/invalidation/304 counters per namespace are kept per process and returned
+by ``stats()`` (``GET /api/debug/cache``; ``POST`` there empties the cache).
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Tuple
+
+from flask import make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '300'))
+DEFAULT_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'sqlite').lower()
+FALLBACK_PATH = os.path.join(tempfile.gettempdir(), 'response_cache.sqlite3')
+DEFAULT_LRU_SIZE = 1024
+
+STATS_ENDPOINT = '/api/debug/cache'
+
+
+# ---------------------------------------------------------------------------
+# Cached responses
+# ---------------------------------------------------------------------------
+
+class CachedResponse:
+    """Body, status, mimetype and ETag of a rendered response."""
+
+    __slots__ = ('body', 'status', 'mimetype', 'etag')
+
+    def __init__(self, body: bytes, status: int, mimetype: str, etag: Optional[str] = None):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag or hashlib.sha1(body).hexdigest()
+
+    def encode(self) -> bytes:
+        meta = json.dumps({'status': self.status, 'mimetype': self.mimetype, 'etag': self.etag})
+        return meta.encode('utf-8') + b'\n' + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'CachedResponse':
+        meta, body = data.split(b'\n', 1)
+        meta = json.loads(meta)
+        return cls(body, meta['status'], meta['mimetype'], meta['etag'])
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class LRUBackend:
+    """In-process, thread-safe LRU of ``(namespace, key)`` entries."""
+
+    name = 'lru'
+
+    def __init__(self, max_entries: int = DEFAULT_LRU_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # (namespace, key) -> (value, expires_at, generation)
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        """``(value or None, current generation of namespace)``."""
+        with self._lock:
+            generation = self._generations[namespace]
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None, generation
+            value, expires_at, entry_generation = entry
+            if entry_generation != generation or expires_at <= time.time():
+                del self._entries[(namespace, key)]
+                return None, generation
+            self._entries.move_to_end((namespace, key))
+            return value, generation
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float, generation: int) -> bool:
+        """Store unless ``namespace`` was invalidated since ``generation`` was read."""
+        with self._lock:
+            if self._generations[namespace] != generation:
+                return False
+            self._entries[(namespace, key)] = (value, time.time() + ttl, generation)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] += 1
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+    def clear(self, prefix: str = '') -> None:
+        """Invalidate every namespace starting with ``prefix``."""
+        with self._lock:
+            for namespace in {k[0] for k in self._entries if k[0].startswith(prefix)}:
+                self._generations[namespace] += 1
+            for entry_key in [k for k in self._entries if k[0].startswith(prefix)]:
+                del self._entries[entry_key]
+
+
+class SQLiteBackend:
+    """Entries in a SQLite file shared by every process on the host.
+
+    One connection per thread (re-opened after ``fork``); WAL mode lets readers proceed
+    while another worker writes.
+    """
+
+    name = 'sqlite'
+    PURGE_EVERY = 200  # sets between purges of expired rows
+
+    def __init__(self, path: str = FALLBACK_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS generations ('
+                         'namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                         'namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+                         'expires_at REAL NOT NULL, generation INTEGER NOT NULL, '
+                         'PRIMARY KEY (namespace, key))')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        row = self._connection().execute(
+            'SELECT COALESCE((SELECT generation FROM generations WHERE namespace = ?), 0), '
+            '(SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ? '
+            ' AND generation = COALESCE((SELECT generation FROM generations WHERE namespace = ?), 0))',
+            (namespace, namespace, key, time.time(), namespace),
+        ).fetchone()
+        return row[1], row[0]
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float, generation: int) -> bool:
+        conn = self._connection()
+        cursor = conn.execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, generation) '
+            'SELECT ?, ?, ?, ?, ? WHERE COALESCE((SELECT generation FROM generations WHERE namespace = ?), 0) = ?',
+            (namespace, key, sqlite3.Binary(value), time.time() + ttl, generation, namespace, generation),
+        )
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),))
+        return cursor.rowcount > 0
+
+    def invalidate(self, namespace: str) -> None:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT INTO generations (namespace, generation) VALUES (?, 1) '
+                         'ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1', (namespace,))
+            conn.execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self, prefix: str = '') -> None:
+        """Invalidate every namespace starting with ``prefix``."""
+        conn = self._connection()
+        rows = conn.execute('SELECT DISTINCT namespace FROM entries WHERE substr(namespace, 1, ?) = ?',
+                            (len(prefix), prefix)).fetchall()
+        for (namespace,) in rows:
+            self.invalidate(namespace)
+
+
+def make_backend(name: str = DEFAULT_BACKEND, path: Optional[str] = None):
+    """Backend for ``RESPONSE_CACHE_BACKEND``; ``None`` disables caching.
+
+    ``path`` is the SQLite file (``RESPONSE_CACHE_PATH`` takes precedence); pass an
+    app-specific location such as one under ``app.instance_path``.
+    """
+    if name in ('off', 'none', '0', 'false'):
+        return None
+    if name == 'lru':
+        return LRUBackend()
+    if name != 'sqlite':
+        logger.warning(f"Unknown RESPONSE_CACHE_BACKEND '{name}', using sqlite")
+    return SQLiteBackend(os.getenv('RESPONSE_CACHE_PATH') or path or FALLBACK_PATH)
+
+
+# ---------------------------------------------------------------------------
+# Cache / decorators
+# ---------------------------------------------------------------------------
+
+class ResponseCache:
+    """Cache rendered GET responses per namespace on ``backend`` (``None`` = disabled).
+
+    ``scope`` identifies the deployment (e.g. its database URI); only its hash is stored.
+    """
+
+    def __init__(self, backend=None, default_ttl: float = DEFAULT_TTL, scope: str = ''):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.scope = hashlib.sha1(scope.encode('utf-8')).hexdigest()[:12] if scope else ''
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'hits': 0, 'misses': 0, 'stores': 0, 'not_modified': 0, 'invalidations': 0, 'errors': 0})
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, counter: str) -> None:
+        with self._lock:
+            self._counters[namespace][counter] += 1
+
+    def _namespace(self, namespace: str) -> str:
+        """Backend namespace: ``namespace`` within this cache's scope."""
+        return f'{self.scope}/{namespace}' if self.scope else namespace
+
+    @staticmethod
+    def _key() -> str:
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        return f'{request.path}?{args}'
+
+    def _respond(self, namespace: str, cached: CachedResponse, max_age: int, hit: bool):
+        if request.if_none_match.contains_weak(cached.etag):
+            self._count(namespace, 'not_modified')
+            response = make_response('', 304)
+        else:
+            response = make_response(cached.body, cached.status)
+            response.mimetype = cached.mimetype
+        response.set_etag(cached.etag)
+        response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'no-cache'
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def cached(self, namespace: str, ttl: Optional[float] = None, max_age: int = 0):
+        """Cache a view's successful GET responses under ``namespace`` for ``ttl`` seconds.
+
+        ``max_age`` is sent as ``Cache-Control: max-age`` (browsers then skip even the
+        revalidation); keep it 0 for data that must reflect writes immediately.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method != 'GET':
+                    return view(*args, **kwargs)
+                key = self._key()
+                try:
+                    value, generation = self.backend.get(self._namespace(namespace), key)
+                except Exception as e:
+                    self._count(namespace, 'errors')
+                    logger.warning(f"Response cache read failed for {namespace}: {str(e)}")
+                    return view(*args, **kwargs)
+                if value is not None:
+                    self._count(namespace, 'hits')
+                    return self._respond(namespace, CachedResponse.decode(value), max_age, hit=True)
+
+                self._count(namespace, 'misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                cached = CachedResponse(response.get_data(), response.status_code, response.mimetype)
+                try:
+                    if self.backend.set(self._namespace(namespace), key, cached.encode(), ttl, generation):
+                        self._count(namespace, 'stores')
+                except Exception as e:
+                    self._count(namespace, 'errors')
+                    logger.warning(f"Response cache write failed for {namespace}: {str(e)}")
+                return self._respond(namespace, cached, max_age, hit=False)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces: str) -> None:
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                self.backend.invalidate(self._namespace(namespace))
+                self._count(namespace, 'invalidations')
+            except Exception as e:
+                self._count(namespace, 'errors')
+                logger.error(f"Response cache invalidation failed for {namespace}: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop every entry in this cache's scope; other deployments sharing the backend keep theirs."""
+        if self.backend is not None:
+            self.backend.clear(self._namespace(''))
+
+    def invalidates(self, *namespaces: str):
+        """Invalidate ``namespaces`` after the decorated write view returns a non-error response."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code < 400:
+                    self.invalidate(*namespaces)
+                return response
+            return wrapper
+        return decorator
+
+    def watch_models(self, model_namespaces: Dict) -> None:
+        """Invalidate namespaces when a committed flush created, changed or deleted the models.
+
+        ``model_namespaces`` maps model class -> iterable of namespaces.
+        """
+        pending_key = 'response_cache_namespaces'
+
+        def after_flush(session, flush_context):
+            touched = set()
+            for obj in session.new | session.dirty | session.deleted:
+                for model, namespaces in model_namespaces.items():
+                    if isinstance(obj, model):
+                        touched.update(namespaces)
+            if touched:
+                session.info.setdefault(pending_key, set()).update(touched)
+
+        def after_commit(session):
+            namespaces = session.info.pop(pending_key, None)
+            if namespaces:
+                self.invalidate(*sorted(namespaces))
+
+        def after_rollback(session, previous_transaction):
+            session.info.pop(pending_key, None)
+
+        event.listen(Session, 'after_flush', after_flush)
+        event.listen(Session, 'after_commit', after_commit)
+        event.listen(Session, 'after_soft_rollback', after_rollback)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            namespaces = {name: dict(counters) for name, counters in self._counters.items()}
+        for counters in namespaces.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / lookups, 3) if lookups else None
+        return {
+            'backend': self.backend.name if self.backend is not None else 'off',
+            'scope': self.scope,
+            'default_ttl': self.default_ttl,
+            'pid': os.getpid(),
+            'namespaces': namespaces,
+        }
+
+
+__all__ = [
+    'CachedResponse',
+    'LRUBackend',
+    'SQLiteBackend',
+    'make_backend',
+    'ResponseCache',
+    'STATS_ENDPOINT',
+]
@@ -0,0 +1,302 @@
+"""scheduler_service.py
+
+In-process periodic jobs that run on exactly one worker per tick.
+
+The modular app used to start an APScheduler ``BackgroundScheduler`` in every process and
+have it POST to ``/api/process-due-reminders`` through ``app.test_client()`` every five
+minutes; under gunicorn each worker did so, so every due reminder went out once per
+worker. The monolithic app had no scheduler at all. ``SchedulerService`` replaces both:
+
+* jobs are plain callables (``fn() -> dict``) run inside an app context -- the due-reminder
+  job calls the reminder planner directly, no HTTP loopback;
+* every process runs a light poller, but a job only runs where its lease row in
+  ``scheduler_jobs`` was acquired. Acquisition is a single conditional UPDATE
+  (``next_run_at <= now`` and no unexpired ``locked_until``), so one worker wins each tick
+  and the others see ``rowcount == 0``. A worker that dies mid-run releases the lease when
+  ``locked_until`` (``lease_ttl``) passes;
+* each run is recorded in ``scheduler_runs`` with its owner, start/finish time,
+  ``duration_ms``, status and the job's result or error, for ``history()``.
+
+``run_now`` triggers a job immediately (still under the lease, so it never overlaps a
+scheduled run). Set ``SCHEDULER_ENABLED=0`` to keep a process from polling, e.g. for
+one-off scripts; manual runs still work.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, or_
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+RUN_RUNNING = 'running'
+RUN_SUCCEEDED = 'succeeded'
+RUN_FAILED = 'failed'
+
+DEFAULT_POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', '30'))
+DEFAULT_LEASE_TTL = timedelta(minutes=15)
+
+
+def scheduler_enabled() -> bool:
+    return os.getenv('SCHEDULER_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def default_owner() -> str:
+    """``host:pid:random`` -- unique per process, readable in the run history."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class ScheduledJob:
+    """A registered callable and how often it should run."""
+
+    def __init__(self, name: str, fn: Callable, interval: timedelta, lease_ttl: timedelta = DEFAULT_LEASE_TTL):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        # The lease must outlive the longest expected run, or a second worker could start
+        self.lease_ttl = max(lease_ttl, interval)
+
+
+class SchedulerService:
+    """Lease-coordinated periodic jobs plus their run history for one Flask app.
+
+    ``lease_model`` maps ``scheduler_jobs`` (``name`` PK, ``next_run_at``, ``locked_by``,
+    ``locked_until``, ``last_run_id``); ``run_model`` maps ``scheduler_runs``.
+    """
+
+    def __init__(self, app, db, lease_model, run_model, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 owner: Optional[str] = None):
+        self.app = app
+        self.db = db
+        self.lease_model = lease_model
+        self.run_model = run_model
+        self.poll_interval = poll_interval
+        self.owner = owner or default_owner()
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._tables_ready = False
+
+    def add_job(self, name: str, fn: Callable, interval, lease_ttl=DEFAULT_LEASE_TTL) -> ScheduledJob:
+        """Register ``fn`` to run every ``interval`` (a ``timedelta`` or seconds)."""
+        if not isinstance(interval, timedelta):
+            interval = timedelta(seconds=interval)
+        job = ScheduledJob(name, fn, interval, lease_ttl)
+        self.jobs[name] = job
+        return job
+
+    def ensure_tables(self) -> None:
+        if not self._tables_ready:
+            self.lease_model.__table__.create(self.db.engine, checkfirst=True)
+            self.run_model.__table__.create(self.db.engine, checkfirst=True)
+            self._tables_ready = True
+
+    # ------------------------------------------------------------------
+    # Leases
+    # ------------------------------------------------------------------
+
+    def _acquire(self, job: ScheduledJob, force: bool = False) -> bool:
+        """Take ``job``'s lease if it is due (or ``force``) and not held. Commits."""
+        model = self.lease_model
+        session = self.db.session
+        now = datetime.utcnow()
+        conditions = [
+            model.name == job.name,
+            or_(model.locked_until.is_(None), model.locked_until < now),
+        ]
+        if not force:
+            conditions.append(or_(model.next_run_at.is_(None), model.next_run_at <= now))
+        acquired = session.query(model).filter(and_(*conditions)).update({
+            'locked_by': self.owner,
+            'locked_until': now + job.lease_ttl,
+        }, synchronize_session=False)
+        session.commit()
+        if acquired:
+            return True
+
+        if session.query(model.name).filter(model.name == job.name).first() is not None:
+            return False
+        # First run anywhere: whoever inserts the row owns the lease
+        session.add(model(name=job.name, locked_by=self.owner, locked_until=now + job.lease_ttl, next_run_at=now))
+        try:
+            session.commit()
+            return True
+        except IntegrityError:
+            session.rollback()
+            return False
+
+    def _release(self, job: ScheduledJob, started_at: datetime, run_id: Optional[int]) -> None:
+        self.lease_model.query.filter(
+            self.lease_model.name == job.name,
+            self.lease_model.locked_by == self.owner,
+        ).update({
+            'locked_by': None,
+            'locked_until': None,
+            'next_run_at': started_at + job.interval,
+            'last_run_id': run_id,
+        }, synchronize_session=False)
+        self.db.session.commit()
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _execute(self, job: ScheduledJob, trigger: str) -> Dict:
+        """Run ``job`` (whose lease this process holds) and record the run. Commits."""
+        session = self.db.session
+        started_at = datetime.utcnow()
+        run = self.run_model(job_name=job.name, owner=self.owner, trigger=trigger,
+                             status=RUN_RUNNING, started_at=started_at)
+        session.add(run)
+        try:
+            session.commit()
+        except Exception:
+            session.rollback()
+            self._release(job, started_at, None)
+            raise
+        run_id = run.id
+
+        status, result, error = RUN_SUCCEEDED, None, None
+        try:
+            result = job.fn()
+        except Exception as e:
+            session.rollback()
+            status, error = RUN_FAILED, str(e)[:2000]
+            logger.error(f"Scheduled job '{job.name}' failed: {str(e)}")
+
+        finished_at = datetime.utcnow()
+        try:
+            self.run_model.query.filter(self.run_model.id == run_id).update({
+                'status': status,
+                'finished_at': finished_at,
+                'duration_ms': int((finished_at - started_at).total_seconds() * 1000),
+                'result': result if isinstance(result, dict) else None,
+                'error': error,
+            }, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self._release(job, started_at, run_id)
+        logger.info(f"Scheduled job '{job.name}' {status} in {finished_at - started_at}")
+        return self.run_model.query.get(run_id).to_dict()
+
+    def run_now(self, name: str) -> Optional[Dict]:
+        """Run ``name`` immediately. Returns the run, or ``None`` if another worker holds it.
+
+        Raises ``KeyError`` for an unknown job. Call from within an app context.
+        """
+        job = self.jobs[name]
+        self.ensure_tables()
+        if not self._acquire(job, force=True):
+            return None
+        return self._execute(job, trigger='manual')
+
+    def tick(self) -> List[Dict]:
+        """Run every due job this process wins the lease for. Call within an app context."""
+        self.ensure_tables()
+        runs = []
+        for job in list(self.jobs.values()):
+            try:
+                if self._acquire(job):
+                    runs.append(self._execute(job, trigger='schedule'))
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Scheduler tick for '{job.name}' failed: {str(e)}")
+        return runs
+
+    def start(self) -> None:
+        """Start this process's poller (no-op if running or ``SCHEDULER_ENABLED=0``).
+
+        Safe to call on every request: a thread inherited through ``fork`` (gunicorn
+        ``--preload``) is not alive in the child, so each worker starts its own.
+        """
+        if not scheduler_enabled() or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+                self._thread.start()
+                logger.info(f"Scheduler started as {self.owner} with jobs: {', '.join(self.jobs) or '-'}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    self.db.session.rollback()
+                    logger.error(f"Scheduler poll failed: {str(e)}")
+                finally:
+                    self.db.session.remove()
+            self._stop.wait(self.poll_interval)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def history(self, name: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Most recent runs first, optionally for one job."""
+        self.ensure_tables()
+        query = self.run_model.query
+        if name:
+            query = query.filter(self.run_model.job_name == name)
+        runs = query.order_by(self.run_model.started_at.desc(), self.run_model.id.desc()).limit(limit).all()
+        return [run.to_dict() for run in runs]
+
+    def status(self) -> List[Dict]:
+        """One entry per registered job: interval, lease state and duration stats."""
+        self.ensure_tables()
+        session = self.db.session
+        leases = {lease.name: lease for lease in self.lease_model.query.filter(
+            self.lease_model.name.in_(list(self.jobs))).all()} if self.jobs else {}
+        run = self.run_model
+        stats = {row.job_name: row for row in session.query(
+            run.job_name,
+            self.db.func.count(run.id).label('runs'),
+            self.db.func.sum(case((run.status == RUN_FAILED, 1), else_=0)).label('failures'),
+            self.db.func.avg(run.duration_ms).label('avg_duration_ms'),
+            self.db.func.max(run.duration_ms).label('max_duration_ms'),
+        ).filter(run.job_name.in_(list(self.jobs))).group_by(run.job_name).all()} if self.jobs else {}
+
+        jobs = []
+        for name, job in self.jobs.items():
+            lease = leases.get(name)
+            row = stats.get(name)
+            last_run = run.query.get(lease.last_run_id) if lease is not None and lease.last_run_id else None
+            jobs.append({
+                'name': name,
+                'interval_seconds': int(job.interval.total_seconds()),
+                'next_run_at': lease.next_run_at.isoformat() if lease is not None and lease.next_run_at else None,
+                'locked_by': lease.locked_by if lease is not None else None,
+                'locked_until': lease.locked_until.isoformat()
+                if lease is not None and lease.locked_until else None,
+                'runs': int(row.runs) if row else 0,
+                'failures': int(row.failures or 0) if row else 0,
+                'avg_duration_ms': round(float(row.avg_duration_ms), 1) if row and row.avg_duration_ms is not None else None,
+                'max_duration_ms': row.max_duration_ms if row else None,
+                'last_run': last_run.to_dict() if last_run else None,
+            })
+        return jobs
+
+
+__all__ = [
+    'RUN_RUNNING',
+    'RUN_SUCCEEDED',
+    'RUN_FAILED',
+    'scheduler_enabled',
+    'ScheduledJob',
+    'SchedulerService',
+]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Report how long importing the app takes, grouped by subsystem.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and sums each
+module's self time into buckets (web, database, ML, AWS, geocoding, ...), so a change
+that drags the ML stack back into app.py's import path shows up immediately.
+
+The DB startup probe is disabled for the run (DB_STARTUP_PROBE=0) so the numbers
+reflect imports only, not network round-trips.
+
+Usage:
+    python startup_report.py                         # report for app.py
+    python startup_report.py --module app_modular.app
+    python startup_report.py --budget 1.0 --forbid ml,aws
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Top-level package -> subsystem bucket
+SUBSYSTEMS = {
+    'ml': {'torch', 'sentence_transformers', 'transformers', 'tokenizers', 'huggingface_hub',
+           'safetensors', 'bertopic', 'sklearn', 'scipy', 'umap', 'hdbscan', 'pynndescent',
+           'numba', 'llvmlite', 'nltk', 'numpy', 'pandas', 'pyarrow'},
+    'aws': {'boto3', 'botocore', 's3transfer', 'jmespath'},
+    'geocoding': {'geopy', 'geographiclib'},
+    'documents': {'pypdf', 'docx', 'lxml', 'bs4'},
+    'web': {'flask', 'werkzeug', 'jinja2', 'markupsafe', 'itsdangerous', 'click', 'blinker',
+            'flask_cors', 'flask_sqlalchemy', 'dotenv', 'requests', 'urllib3', 'certifi',
+            'charset_normalizer', 'idna'},
+    'database': {'sqlalchemy', 'pymysql', 'greenlet'},
+    'scheduler': {'apscheduler', 'tzlocal', 'pytz'},
+}
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def local_modules(root=ROOT):
+    """Top-level modules and packages of this repository (so new helper modules count too)."""
+    names = set()
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry.endswith('.py'):
+            names.add(entry[:-3])
+        elif os.path.isfile(os.path.join(path, '__init__.py')):
+            names.add(entry)
+    return names
+
+
+LOCAL_MODULES = local_modules()
+
+
+def subsystem_for(module_name):
+    top = module_name.split('.')[0]
+    if top in LOCAL_MODULES:
+        return 'application'
+    for subsystem, packages in SUBSYSTEMS.items():
+        if top in packages:
+            return subsystem
+    if top in sys.stdlib_module_names or top.startswith('_'):
+        return 'stdlib'
+    return 'other'
+
+
+def measure(module):
+    """Return ``[(module_name, self_us, cumulative_us)]`` for a clean import of ``module``."""
+    env = dict(os.environ, DB_STARTUP_PROBE='0')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['unknown error']
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def report(module, budget=None, forbid=()):
+    """Print the per-subsystem table; return False if the budget or a forbidden subsystem is hit."""
+    try:
+        rows = measure(module)
+    except Exception as e:
+        print(f"❌ {str(e)}")
+        return False
+
+    totals = defaultdict(int)
+    counts = defaultdict(int)
+    slowest = defaultdict(lambda: ('', 0))
+    for name, self_us, _ in rows:
+        subsystem = subsystem_for(name)
+        totals[subsystem] += self_us
+        counts[subsystem] += 1
+        top = name.split('.')[0]
+        if self_us > slowest[subsystem][1]:
+            slowest[subsystem] = (top, self_us)
+
+    total_s = sum(totals.values()) / 1e6
+    print(f"Import of '{module}': {total_s:.3f}s across {len(rows)} modules\n")
+    print(f"{'subsystem':<12} {'seconds':>8} {'share':>6} {'modules':>8}  slowest")
+    for subsystem, us in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        share = (us / 1e6) / total_s * 100 if total_s else 0
+        print(f"{subsystem:<12} {us / 1e6:>8.3f} {share:>5.1f}% {counts[subsystem]:>8}  {slowest[subsystem][0]}")
+
+    ok = True
+    loaded_forbidden = [s for s in forbid if counts.get(s)]
+    if loaded_forbidden:
+        print(f"\n❌ Subsystems that should be lazy were imported: {', '.join(loaded_forbidden)}")
+        ok = False
+    if budget is not None and total_s > budget:
+        print(f"\n❌ Import took {total_s:.3f}s, budget is {budget:.3f}s")
+        ok = False
+    if ok:
+        print("\n✅ Import report completed")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-subsystem import-time report')
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--budget', type=float, help='Fail if total import time exceeds this many seconds')
+    parser.add_argument('--forbid', default='', help='Comma-separated subsystems that must not be imported (e.g. ml,aws)')
+    args = parser.parse_args()
+    forbid = [s.strip() for s in args.forbid.split(',') if s.strip()]
+    return report(args.module, budget=args.budget, forbid=forbid)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
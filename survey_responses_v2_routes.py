@@ -9,10 +9,12 @@ from flask import jsonify, request
 from datetime import datetime
 import logging
 import os
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from email_delivery import get_smtp_pool
+from response_answer_store import VERSION_V2, sync_response_answers
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,6 +33,7 @@ def register_survey_responses_v2_routes(app, db):
     User = app_module.User
     SurveyV2 = app_module.SurveyV2
     SurveyResponseV2 = app_module.SurveyResponseV2
+    ResponseAnswer = app_module.ResponseAnswer
 
     # ------------------------------------------------------------------
     # Routes
@@ -107,6 +110,10 @@ def register_survey_responses_v2_routes(app, db):
                 existing.status = data.get('status', existing.status)
                 if 'organization_id' in data:
                     existing.organization_id = data['organization_id']
+                sync_response_answers(
+                    db.session, ResponseAnswer, existing.id, VERSION_V2,
+                    existing.answers, survey.questions,
+                )
                 db.session.commit()
 
                 return jsonify({
@@ -123,6 +130,11 @@ def register_survey_responses_v2_routes(app, db):
                     start_date=datetime.utcnow()
                 )
                 db.session.add(response)
+                db.session.flush()
+                sync_response_answers(
+                    db.session, ResponseAnswer, response.id, VERSION_V2,
+                    response.answers, survey.questions,
+                )
                 db.session.commit()
 
                 return jsonify({
@@ -150,6 +162,11 @@ def register_survey_responses_v2_routes(app, db):
                     response.end_date = datetime.utcnow()
             if 'organization_id' in data:
                 response.organization_id = data['organization_id']
+            if 'answers' in data:
+                sync_response_answers(
+                    db.session, ResponseAnswer, response.id, VERSION_V2,
+                    response.answers, response.survey.questions if response.survey else None,
+                )
 
             db.session.commit()
 
@@ -290,8 +307,6 @@ def register_survey_responses_v2_routes(app, db):
         try:
             smtp_username = os.getenv('SES_SMTP_USERNAME')
             smtp_password = os.getenv('SES_SMTP_PASSWORD')
-            smtp_host = os.getenv('SES_SMTP_HOST', 'email-smtp.us-east-1.amazonaws.com')
-            smtp_port = int(os.getenv('SES_SMTP_PORT', '587'))
             source_email = os.getenv('SES_VERIFIED_EMAIL', 'noreply@saurara.org')
 
             if not smtp_username or not smtp_password:
@@ -346,23 +361,24 @@ def register_survey_responses_v2_routes(app, db):
             msg.attach(MIMEText(body_text, 'plain', 'utf-8'))
             msg.attach(MIMEText(body_html, 'html', 'utf-8'))
 
-            with smtplib.SMTP(smtp_host, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-                server.sendmail(source_email, [to_email], msg.as_string())
+            get_smtp_pool().send(source_email, [to_email], msg.as_string())
 
-            return {'success': True}
+            return {'success': True, 'method': 'SMTP'}
         except Exception as e:
             logger.error(f"Error sending v2 invite email to {to_email}: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    email_outbox = app_module.email_outbox
+    email_outbox.register_sender('v2_invite', _send_v2_invite_email)
+
     @app.route('/api/v2/surveys/<int:survey_id>/invite', methods=['POST'])
     def invite_users_to_v2_survey(survey_id):
         """Bulk-invite users to a survey-v2.
 
         Expects JSON: { user_ids: [int], admin_id: int (optional) }
-        Creates SurveyResponseV2 records with status='pending' and sends
-        invitation emails.
+        Creates SurveyResponseV2 records with status='pending' and queues the
+        invitation emails in the outbox (committed together); returns 202 with
+        the email batch ID.
         """
         data = request.json or {}
         user_ids = data.get('user_ids', [])
@@ -386,13 +402,13 @@ def register_survey_responses_v2_routes(app, db):
             'total': len(user_ids),
             'invited': 0,
             'skipped': 0,
-            'email_sent': 0,
-            'email_failed': 0,
+            'email_queued': 0,
             'details': [],
         }
+        invite_emails = []
 
         for uid in user_ids:
-            detail = {'user_id': uid, 'invited': False, 'email_sent': False, 'error': None}
+            detail = {'user_id': uid, 'invited': False, 'email_queued': False, 'error': None}
 
             user = User.query.get(uid)
             if not user:
@@ -427,38 +443,53 @@ def register_survey_responses_v2_routes(app, db):
                 results['invited'] += 1
             except Exception as e:
                 db.session.rollback()
+                # The rollback discarded the invitations flushed so far; don't email or report them
+                invite_emails.clear()
+                for earlier in results['details']:
+                    if earlier['invited']:
+                        earlier.update({'invited': False, 'email_queued': False,
+                                        'error': 'Rolled back after a later invitation failed'})
+                        results['invited'] -= 1
+                        results['skipped'] += 1
                 detail['error'] = str(e)
                 results['skipped'] += 1
                 results['details'].append(detail)
                 continue
 
-            # Send email
-            email_result = _send_v2_invite_email(
-                to_email=user.email,
-                firstname=user.firstname,
-                survey_name=survey.name,
-                assigned_by=admin_name,
-            )
-            if email_result.get('success'):
-                detail['email_sent'] = True
-                results['email_sent'] += 1
-            else:
-                detail['email_error'] = email_result.get('error')
-                results['email_failed'] += 1
+            invite_emails.append({
+                'recipient': user.email,
+                'payload': {
+                    'to_email': user.email,
+                    'firstname': user.firstname,
+                    'survey_name': survey.name,
+                    'assigned_by': admin_name,
+                },
+            })
+            detail['email_queued'] = True
+            results['email_queued'] += 1
 
             results['details'].append(detail)
 
-        # Commit all new invitations
+        # Commit all new invitations together with their queued emails
+        batch_id = None
+        results['email_queued'] = len(invite_emails)
         try:
+            if invite_emails:
+                batch_id = email_outbox.enqueue('v2_invite', invite_emails)
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error committing v2 invitations: {str(e)}")
             return jsonify({'error': f'Failed to save invitations: {str(e)}'}), 500
 
+        if batch_id:
+            email_outbox.wake()
+
         return jsonify({
-            'message': f"Invited {results['invited']}/{results['total']} users ({results['skipped']} skipped, {results['email_sent']} emails sent)",
+            'message': f"Invited {results['invited']}/{results['total']} users ({results['skipped']} skipped, {results['email_queued']} emails queued)",
+            'batch_id': batch_id,
+            'status_url': f'/api/email-batches/{batch_id}' if batch_id else None,
             'results': results,
-        }), 200
+        }), 202 if batch_id else 200
 
     logger.info("Survey Responses V2 routes registered successfully")
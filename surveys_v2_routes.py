@@ -9,6 +9,8 @@ from flask import jsonify, request
 from sqlalchemy import text
 import logging
 
+from response_answer_store import VERSION_V2, delete_response_answers
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,6 +33,8 @@ def register_surveys_v2_routes(app, db):
     Organization = app_module.Organization
     SurveyV2 = app_module.SurveyV2
     SurveyOrganization = app_module.SurveyOrganization
+    SurveyResponseV2 = app_module.SurveyResponseV2
+    ResponseAnswer = app_module.ResponseAnswer
 
     # ------------------------------------------------------------------
     # Surveys CRUD
@@ -215,6 +219,13 @@ def register_surveys_v2_routes(app, db):
         survey = SurveyV2.query.get_or_404(survey_id)
 
         try:
+            # Responses go with the survey; drop their normalised answers in the same transaction
+            response_ids = [row.id for row in db.session.query(SurveyResponseV2.id)
+                            .filter(SurveyResponseV2.survey_id == survey_id)]
+            delete_response_answers(db.session, ResponseAnswer, response_ids, VERSION_V2)
+            if response_ids:
+                SurveyResponseV2.query.filter(SurveyResponseV2.id.in_(response_ids)) \
+                    .delete(synchronize_session=False)
             db.session.delete(survey)
             db.session.commit()
             return jsonify({"message": "Survey deleted successfully"}), 200
@@ -0,0 +1,239 @@
+"""text_analysis_jobs.py
+
+Background jobs for the open-ended answer analysis behind ``/api/reports/analytics/text``.
+
+``run_full_analysis`` (MiniLM embeddings, BERTopic, KMeans) takes far longer than an HTTP
+request should, and its result used to be cached on ``flask.g`` which dies with the request.
+``TextAnalysisJobRunner`` instead:
+
+1. records a job row (``text_analysis_jobs``) and returns immediately. Queued/running jobs
+   hold ``active_key = 1`` under a unique index, so concurrent submissions from several
+   workers cannot start two analyses: the losing insert returns the winner's job;
+2. fetches the answers on a background thread inside the app context;
+3. runs ``text_analytics.analyze_answers`` in a *spawned* process pool so the ML stack is
+   never imported into the web worker and the GIL is not held for minutes;
+4. writes the rows to ``text_answer_analytics`` tagged with the job ID, marks the job
+   completed and drops older snapshots in the same transaction.
+
+Readers serve the latest completed snapshot straight from the table. Only plain dicts cross
+the process boundary; models and the session are passed in, as with the other helpers.
+
+Tables from before the job runner (``text_answer_analytics`` without ``job_id``, or
+``text_analysis_jobs`` without ``active_key``) are not altered at request time; run
+``migrate_text_analysis_tables.py`` once to upgrade them.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import inspect, or_
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# A job still "active" after this long belongs to a worker that died mid-run.
+STALE_JOB_AFTER = timedelta(hours=2)
+
+MIGRATION_SCRIPT = 'migrate_text_analysis_tables.py'
+
+
+def _analyze_in_worker(records: List[Dict], num_clusters: int) -> List[Dict]:
+    """Process-pool entry point. Imports the ML stack in the child process only."""
+    import pandas as pd
+    from text_analytics import analyze_answers
+
+    df = analyze_answers(pd.DataFrame(records), num_clusters=num_clusters)
+    return df.drop(columns=['clean_text'], errors='ignore').to_dict(orient='records')
+
+
+class TextAnalysisJobRunner:
+    """Queue, run and look up text-analysis jobs for one Flask app."""
+
+    def __init__(self, app, db, job_model, result_model, survey_response_model, question_model,
+                 max_workers: int = 1):
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.result_model = result_model
+        self.survey_response_model = survey_response_model
+        self.question_model = question_model
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._tables_ready = False
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    def legacy_tables(self, engine) -> List[str]:
+        """Existing tables still in a pre-job-runner layout (see ``MIGRATION_SCRIPT``)."""
+        inspector = inspect(engine)
+        legacy = []
+        for model, column in ((self.job_model, 'active_key'), (self.result_model, 'job_id')):
+            table = model.__tablename__
+            if inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}:
+                legacy.append(table)
+        return legacy
+
+    def ensure_tables(self) -> None:
+        """Create the job/result tables on first use.
+
+        Raises ``RuntimeError`` if they exist in an older layout; those are upgraded by
+        ``MIGRATION_SCRIPT``, never dropped here.
+        """
+        if self._tables_ready:
+            return
+        engine = self.db.engine
+        legacy = self.legacy_tables(engine)
+        if legacy:
+            raise RuntimeError(f"Outdated table(s) {', '.join(legacy)}; run python {MIGRATION_SCRIPT}")
+        self.job_model.__table__.create(engine, checkfirst=True)
+        self.result_model.__table__.create(engine, checkfirst=True)
+        self._tables_ready = True
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the parent holds DB connections and request threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def active_job(self):
+        """The queued/running job, if any; stale ones are marked failed first."""
+        job_model = self.job_model
+        job = job_model.query.filter(job_model.status.in_(ACTIVE_STATUSES)) \
+            .order_by(job_model.created_at.desc()).first()
+        if job and job.created_at and datetime.utcnow() - job.created_at > STALE_JOB_AFTER:
+            job.status = JOB_FAILED
+            job.active_key = None
+            job.error = 'Job did not finish (worker restarted?)'
+            job.finished_at = datetime.utcnow()
+            self.db.session.commit()
+            return None
+        return job
+
+    def get_job(self, job_id: str):
+        return self.job_model.query.get(job_id)
+
+    def latest_completed_job(self):
+        job_model = self.job_model
+        return job_model.query.filter(job_model.status == JOB_COMPLETED) \
+            .order_by(job_model.finished_at.desc()).first()
+
+    def snapshot_query(self, job):
+        """Query for the result rows of a completed job."""
+        return self.result_model.query.filter(self.result_model.job_id == job.id) \
+            .order_by(self.result_model.response_id, self.result_model.question_id)
+
+    # ------------------------------------------------------------------
+    # Submission / execution
+    # ------------------------------------------------------------------
+
+    def submit(self, num_clusters: int = 10):
+        """Queue a new analysis, or return the one already queued/running. Commits."""
+        self.ensure_tables()
+        existing = self.active_job()
+        if existing:
+            return existing
+
+        job = self.job_model(status=JOB_QUEUED, num_clusters=num_clusters, active_key=1)
+        self.db.session.add(job)
+        try:
+            self.db.session.commit()
+        except IntegrityError:
+            # Another worker queued one between our check and insert
+            self.db.session.rollback()
+            existing = self.active_job()
+            if existing:
+                return existing
+            raise
+
+        thread = threading.Thread(
+            target=self._run, args=(job.id, num_clusters),
+            name=f'text-analysis-{job.id[:8]}', daemon=True,
+        )
+        thread.start()
+        return job
+
+    def _set_status(self, job_id: str, **fields) -> None:
+        self.job_model.query.filter(self.job_model.id == job_id).update(fields, synchronize_session=False)
+        self.db.session.commit()
+
+    def _run(self, job_id: str, num_clusters: int) -> None:
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                self._set_status(job_id, status=JOB_RUNNING, started_at=datetime.utcnow())
+
+                from text_analytics import iter_open_ended_answers
+                records = [
+                    row
+                    for batch in iter_open_ended_answers(session, self.survey_response_model, self.question_model)
+                    for row in batch
+                ]
+                session.rollback()  # release the connection while the pool works
+
+                results = []
+                if records:
+                    future = self._get_executor().submit(_analyze_in_worker, records, num_clusters)
+                    results = future.result()
+
+                from text_analytics import store_analysis
+                written = store_analysis(session, self.result_model, results, job_id=job_id)
+                session.query(self.result_model).filter(or_(
+                    self.result_model.job_id != job_id,
+                    self.result_model.job_id.is_(None),
+                )).delete(synchronize_session=False)
+                self.job_model.query.filter(self.job_model.id == job_id).update({
+                    'status': JOB_COMPLETED,
+                    'active_key': None,
+                    'answer_count': written,
+                    'finished_at': datetime.utcnow(),
+                }, synchronize_session=False)
+                session.commit()
+                logger.info(f"Text analysis job {job_id} completed with {written} rows")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Text analysis job {job_id} failed: {str(e)}")
+                try:
+                    self._set_status(job_id, status=JOB_FAILED, active_key=None, error=str(e)[:2000],
+                                     finished_at=datetime.utcnow())
+                except Exception as status_error:
+                    session.rollback()
+                    logger.error(f"Could not record failure of job {job_id}: {str(status_error)}")
+            finally:
+                self.db.session.remove()
+
+
+__all__ = [
+    'JOB_QUEUED',
+    'JOB_RUNNING',
+    'JOB_COMPLETED',
+    'JOB_FAILED',
+    'MIGRATION_SCRIPT',
+    'TextAnalysisJobRunner',
+]
@@ -13,7 +13,8 @@ Key points
 2. **Lightweight models** – uses ``sentence-transformers/all-MiniLM-L6-v2`` (22 MB) which is fast
    enough for CPU inference. If the host is truly resource-constrained, swap the encoder name for
    ``'paraphrase-MiniLM-L3-v2'`` (11 MB).
-3. **Caching** – embeddings are persisted to ``embeddings/{hash}.npy`` so repeat runs are cheap.
+3. **Caching** – embeddings are cached per answer in ``embeddings/store`` (memory-mapped
+   float32 matrix + hash index, see ``EmbeddingStore``) so only new answers are encoded.
 4. **No CSV export** – results are returned as a ``pandas.DataFrame`` and can optionally be pushed
    into a dedicated table (see ``create_analysis_table``).
 5. **Public helpers** – ``run_full_analysis`` and ``get_analysis`` can be imported directly by
@@ -29,43 +30,76 @@ Dependencies (add to requirements.txt)
     beautifulsoup4>=4.12.0
 
 Remember to run ``python -m nltk.downloader stopwords vader_lexicon`` once.
+
+Importing this module is cheap: pandas, NLTK, sentence-transformers, BERTopic and
+scikit-learn are only imported (and NLTK corpora only downloaded) on first use, so
+``from text_analytics import classify_question_type`` does not load the ML stack.
 """
 
+from contextlib import contextmanager
 from pathlib import Path
+import fcntl
 import hashlib
 import json
-from typing import List, Dict, Tuple, Iterable
+from typing import TYPE_CHECKING, List, Dict, Tuple, Iterable, Iterator
 
-import pandas as pd
-from bs4 import BeautifulSoup
-from nltk.corpus import stopwords  # type: ignore
-from nltk.sentiment import SentimentIntensityAnalyzer  # type: ignore
-from nltk import download as nltk_download  # type: ignore
-from sentence_transformers import SentenceTransformer  # type: ignore
-from sklearn.cluster import KMeans  # type: ignore
-from bertopic import BERTopic  # type: ignore
+if TYPE_CHECKING:  # heavy imports are deferred to first use, see module docstring
+    import numpy as np
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer  # type: ignore
 
 # Database imports will be passed as parameters to avoid circular imports
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_embedding_model: SentenceTransformer | None = None  # lazy loaded
+
+EMBED_DIR = Path(__file__).with_suffix("").parent / "embeddings"
+
+OPEN_ENDED_TYPES = {"short_text", "paragraph"}
+
 # ---------------------------------------------------------------------------
-# NLTK one-time setup (idempotent)
+# NLTK resources (downloaded on first use, then cached)
 # ---------------------------------------------------------------------------
-for pkg in ("stopwords", "vader_lexicon"):
+_stopwords: set | None = None
+_sentiment_analyzer = None
+
+
+def nltk_download(pkg: str, quiet: bool = True) -> None:
+    """Download an NLTK resource, ignoring network issues in production environments."""
+    from nltk import download  # type: ignore
+
     try:
-        nltk_download(pkg, quiet=True)
+        download(pkg, quiet=quiet)
     except Exception:  # pragma: no cover  # noqa: BLE001
-        pass  # ignore network issues in production environments
+        pass
 
-STOPWORDS = set(stopwords.words("english"))
-SIA = SentimentIntensityAnalyzer()
 
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-_embedding_model: SentenceTransformer | None = None  # lazy loaded
+def _get_stopwords() -> set:
+    """English stop-word set, downloading the corpus only if it is missing."""
+    global _stopwords  # noqa: PLW0603
+    if _stopwords is None:
+        from nltk.corpus import stopwords  # type: ignore
 
-EMBED_DIR = Path(__file__).with_suffix("").parent / "embeddings"
-EMBED_DIR.mkdir(exist_ok=True)
+        try:
+            _stopwords = set(stopwords.words("english"))
+        except LookupError:
+            nltk_download("stopwords")
+            _stopwords = set(stopwords.words("english"))
+    return _stopwords
 
-OPEN_ENDED_TYPES = {"short_text", "paragraph"}
+
+def _get_sentiment_analyzer():
+    """VADER analyser singleton, downloading the lexicon only if it is missing."""
+    global _sentiment_analyzer  # noqa: PLW0603
+    if _sentiment_analyzer is None:
+        from nltk.sentiment import SentimentIntensityAnalyzer  # type: ignore
+
+        try:
+            _sentiment_analyzer = SentimentIntensityAnalyzer()
+        except LookupError:
+            nltk_download("vader_lexicon")
+            _sentiment_analyzer = SentimentIntensityAnalyzer()
+    return _sentiment_analyzer
 
 # ---------------------------------------------------------------------------
 # Helper functions
@@ -75,24 +109,29 @@ def _get_embedding_model() -> SentenceTransformer:  # noqa: D401
     """Lazily load the sentence-transformer model (global singleton)."""
     global _embedding_model  # noqa: PLW0603
     if _embedding_model is None:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
         _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
     return _embedding_model
 
 
 def _clean_text(text: str) -> str:
     """Lower-case, strip HTML, remove stop-words; keep emojis/punctuation."""
+    from bs4 import BeautifulSoup
+
     # Remove HTML
     text = BeautifulSoup(text, "html.parser").get_text(separator=" ")
     # Lower-case
     text = text.lower()
     # Tokenise quick & dirty
-    tokens = [t for t in text.split() if t not in STOPWORDS]
+    stop_words = _get_stopwords()
+    tokens = [t for t in text.split() if t not in stop_words]
     return " ".join(tokens)
 
 
 def _sentiment_label(text: str) -> str:
     """Return 'positive', 'neutral', or 'negative' label using VADER compound score."""
-    score = SIA.polarity_scores(text)["compound"]
+    score = _get_sentiment_analyzer().polarity_scores(text)["compound"]
     if score >= 0.05:
         return "positive"
     if score <= -0.05:
@@ -100,41 +139,219 @@ def _sentiment_label(text: str) -> str:
     return "neutral"
 
 
-def _persist_embeddings(texts: List[str]) -> Tuple[List[List[float]], Path]:
-    """Compute sentence embeddings with caching based on sha1 of text list."""
-    sha = hashlib.sha1("\n".join(texts).encode()).hexdigest()
-    cache_path = EMBED_DIR / f"embeddings_{sha}.npy"
-    if cache_path.exists():
-        import numpy as np  # delayed import
+class EmbeddingStore:
+    """Content-addressed, per-answer embedding cache.
 
-        return np.load(cache_path), cache_path  # type: ignore[return-value]
+    Vectors live in one append-only float32 file (``vectors.f32``) read through
+    ``numpy.memmap``; ``index.json`` maps ``sha1(model + text)`` to a row. Only texts whose
+    hash is missing are encoded, so one new answer costs one ``encode`` call of one text.
+    Rows no longer referenced by the corpus are dropped by ``evict`` once they make up
+    more than ``compact_ratio`` of the file.
+
+    Several processes may share the directory: reads hold a shared ``flock`` on
+    ``store.lock`` and appends/evictions an exclusive one, and the index is reloaded
+    whenever ``index.json`` changes on disk. Encoding runs outside the lock.
+    """
+
+    def __init__(self, directory: Path, model_name: str = EMBEDDING_MODEL_NAME, compact_ratio: float = 0.25):
+        self.directory = Path(directory)
+        self.model_name = model_name
+        self.compact_ratio = compact_ratio
+        self.vectors_path = self.directory / "vectors.f32"
+        self.index_path = self.directory / "index.json"
+        self.lock_path = self.directory / "store.lock"
+        self._index: Dict[str, int] | None = None
+        self._index_stamp: Tuple[int, int] | None = None
+        self._dim: int | None = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _stamp(self) -> Tuple[int, int] | None:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self) -> Dict[str, int]:
+        """The index as on disk; re-read whenever another process has rewritten it. Call under the lock."""
+        stamp = self._stamp()
+        if self._index is None or stamp != self._index_stamp:
+            meta = {}
+            if stamp is not None:
+                try:
+                    meta = json.loads(self.index_path.read_text())
+                except ValueError:
+                    meta = {}
+            if meta.get("model") != self.model_name:
+                meta = {}  # different encoder -> vectors are not comparable, start over
+            self._index = meta.get("rows", {})
+            self._dim = meta.get("dim")
+            self._index_stamp = stamp
+        return self._index
+
+    def _save_index(self) -> None:
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"model": self.model_name, "dim": self._dim, "rows": self._index}))
+        tmp.replace(self.index_path)  # atomic, readers never see a partial index
+        self._index_stamp = self._stamp()
+
+    def _row_count(self) -> int:
+        if not self._dim or not self.vectors_path.exists():
+            return 0
+        return self.vectors_path.stat().st_size // (4 * self._dim)
+
+    def _matrix(self):
+        import numpy as np
+
+        rows = self._row_count()
+        if not rows:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+
+    def _rows(self, keys: List[str]) -> np.ndarray:
+        import numpy as np
+
+        if not keys:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.asarray(self._matrix()[[self._index[k] for k in keys]])
+
+    def embed(self, texts: List[str], encode) -> np.ndarray:
+        """Return a ``(len(texts), dim)`` float32 array, encoding only unseen texts.
+
+        ``encode(list_of_texts)`` must return a 2-D array-like.
+        """
+        import numpy as np
+
+        keys = [self.key(t) for t in texts]
+        with self._locked(exclusive=False):
+            index = self._load_index()
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in index and key not in missing:
+                    missing[key] = text
+            if not missing:
+                return self._rows(keys)
+
+        vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+
+        with self._locked(exclusive=True):
+            index = self._load_index()
+            # Another process may have added some of them while we were encoding
+            new = [(offset, key) for offset, key in enumerate(missing) if key not in index]
+            if new:
+                if index:
+                    next_row = self._row_count()
+                else:
+                    # Empty (or another encoder's) index: rows left in the file are unreferenced
+                    self._dim = int(vectors.shape[1])
+                    next_row = 0
+                with open(self.vectors_path, "ab" if next_row else "wb") as fh:
+                    fh.write(np.ascontiguousarray(vectors[[offset for offset, _ in new]]).tobytes())
+                for position, (_, key) in enumerate(new):
+                    index[key] = next_row + position
+                self._save_index()
+            return self._rows(keys)
+
+    def evict(self, keep_texts: Iterable[str]) -> int:
+        """Drop rows for texts not in ``keep_texts`` when enough are stale. Returns rows dropped."""
+        import numpy as np
+
+        keep_keys = {self.key(t) for t in keep_texts}
+        with self._locked(exclusive=True):
+            index = self._load_index()
+            keep = keep_keys & set(index)
+            stale = len(index) - len(keep)
+            if not index or stale <= len(index) * self.compact_ratio:
+                return 0
+
+            matrix = self._matrix()
+            kept_keys = sorted(keep, key=index.__getitem__)
+            tmp = self.vectors_path.with_suffix(".tmp")
+            with open(tmp, "wb") as fh:
+                if kept_keys:
+                    fh.write(np.ascontiguousarray(matrix[[index[k] for k in kept_keys]]).tobytes())
+            del matrix
+            tmp.replace(self.vectors_path)
+            self._index = {key: row for row, key in enumerate(kept_keys)}
+            self._save_index()
+            return stale
+
+
+_embedding_store: EmbeddingStore | None = None
+
+
+def _get_embedding_store() -> EmbeddingStore:
+    global _embedding_store  # noqa: PLW0603
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore(EMBED_DIR / "store")
+    return _embedding_store
 
-    model = _get_embedding_model()
-    embeds = model.encode(texts, convert_to_numpy=True, show_progress_bar=len(texts) > 100)
-    import numpy as np  # type: ignore
 
-    np.save(cache_path, embeds)
-    return embeds, cache_path
+def _persist_embeddings(texts: List[str]) -> Tuple[List[List[float]], Path]:
+    """Compute sentence embeddings, encoding only answers missing from the per-answer store."""
+    store = _get_embedding_store()
+
+    def encode(batch: List[str]):
+        return _get_embedding_model().encode(batch, convert_to_numpy=True, show_progress_bar=len(batch) > 100)
+
+    embeds = store.embed(texts, encode)
+    store.evict(texts)
+    return embeds, store.vectors_path  # type: ignore[return-value]
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-def fetch_open_ended_answers(db_session, survey_response_model, question_model) -> pd.DataFrame:  # noqa: D401
-    """Pull *all* open-ended answers from the DB and return as DataFrame."""
-    rows: List[Dict[str, str | int]] = []
+ANSWER_COLUMNS = ("response_id", "question_id", "question_type", "answer")
+
+
+def _open_ended_questions(db_session, question_model) -> Dict[int, str]:
+    """Map question id -> type name for open-ended questions, in one joined query."""
+    from sqlalchemy.orm import joinedload
+
+    questions = db_session.query(question_model).options(joinedload(question_model.type)).all()
+    return {
+        q.id: q.type.name  # type: ignore[attr-defined]
+        for q in questions
+        if q.type is not None and q.type.name in OPEN_ENDED_TYPES
+    }
 
-    question_cache: Dict[int, Tuple[str, str]] = {}  # qid -> (type, text)
 
-    responses: Iterable = db_session.query(survey_response_model).filter(
-        survey_response_model.status == "completed"  # only finished surveys
-    ).all()
+def iter_open_ended_answers(db_session, survey_response_model, question_model,
+                            batch_size: int = 1000) -> Iterator[List[Dict[str, str | int]]]:
+    """Yield open-ended answers in batches of row dicts, streaming completed responses.
 
-    for resp in responses:
+    Question types are loaded up front, so the whole scan costs two queries however many
+    responses or questions there are. Responses are read as ``(id, answers)`` tuples through
+    a server-side cursor, so memory stays flat as ``survey_responses`` grows.
+    """
+    question_types = _open_ended_questions(db_session, question_model)
+    if not question_types:
+        return
+
+    responses = (
+        db_session.query(survey_response_model.id, survey_response_model.answers)
+        .filter(survey_response_model.status == "completed")  # only finished surveys
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+    batch: List[Dict[str, str | int]] = []
+    for response_id, answers in responses:
         # ``answers`` is stored as JSON – convert to dict if needed
-        answer_dict: Dict[str, str] | None = (
-            resp.answers if isinstance(resp.answers, dict) else json.loads(resp.answers or "{}")
-        )
+        answer_dict = answers if isinstance(answers, dict) else json.loads(answers or "{}")
         if not answer_dict:
             continue
 
@@ -145,37 +362,55 @@ def fetch_open_ended_answers(db_session, survey_response_model, question_model)
                 continue  # malformed key
             if not isinstance(answer, str) or not answer.strip():
                 continue  # skip non-text answers
+            qtype = question_types.get(qid)
+            if qtype is None:
+                continue  # unknown or not open-ended
 
-            if qid not in question_cache:
-                q = db_session.query(question_model).get(qid)
-                if not q:
-                    continue
-                qtype = q.type.name  # type: ignore[attr-defined]
-                question_cache[qid] = (qtype, q.question_text)
-            else:
-                qtype, _ = question_cache[qid]
-
-            if qtype not in OPEN_ENDED_TYPES:
-                continue
-
-            rows.append(
+            batch.append(
                 {
-                    "response_id": resp.id,
+                    "response_id": response_id,
                     "question_id": qid,
                     "question_type": qtype,
                     "answer": answer.strip(),
                 }
             )
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fetch_open_ended_answers(db_session, survey_response_model, question_model,
+                             batch_size: int = 1000) -> pd.DataFrame:  # noqa: D401
+    """Pull *all* open-ended answers from the DB and return as DataFrame."""
+    import pandas as pd
 
-    return pd.DataFrame(rows)
+    columns: Dict[str, list] = {name: [] for name in ANSWER_COLUMNS}
+    for batch in iter_open_ended_answers(db_session, survey_response_model, question_model, batch_size):
+        for row in batch:
+            for name in ANSWER_COLUMNS:
+                columns[name].append(row[name])
+    if not columns["response_id"]:
+        return pd.DataFrame()
+    return pd.DataFrame(columns)
 
 
 def run_full_analysis(db_session, survey_response_model, question_model, num_clusters: int = 10) -> pd.DataFrame:
     """Main entry – fetch answers, compute embeddings, sentiment, topics, clusters."""
-
     df = fetch_open_ended_answers(db_session, survey_response_model, question_model)
     if df.empty:
         raise ValueError("No open-ended answers found in database.")
+    return analyze_answers(df, num_clusters=num_clusters)
+
+
+def analyze_answers(df: pd.DataFrame, num_clusters: int = 10) -> pd.DataFrame:
+    """CPU-heavy half of ``run_full_analysis`` on an already fetched answers frame.
+
+    Needs no database session, so it can run in a worker process (see ``text_analysis_jobs``).
+    """
+    from sklearn.cluster import KMeans  # type: ignore
+    from bertopic import BERTopic  # type: ignore
 
     # Clean text
     df["clean_text"] = df["answer"].apply(_clean_text)
@@ -192,7 +427,7 @@ def run_full_analysis(db_session, survey_response_model, question_model, num_clu
     df["topic"] = topics
 
     # K-means clustering on embeddings
-    kmeans = KMeans(n_clusters=num_clusters, n_init="auto", random_state=42)
+    kmeans = KMeans(n_clusters=min(num_clusters, len(df)), n_init="auto", random_state=42)
     df["cluster"] = kmeans.fit_predict(embeddings)
 
     return df
@@ -215,33 +450,35 @@ def get_analysis(db_session, survey_response_model, question_model, response_id:
 # Optional persistence helper
 # ---------------------------------------------------------------------------
 
-def create_analysis_table(db, db_session, survey_response_model, question_model) -> None:  # pragma: no cover
-    """Create & populate a table named 'text_answer_analytics' if it does not exist."""
-    from sqlalchemy import Column, Integer, String, JSON as SAJSON
+ANALYSIS_COLUMNS = ("response_id", "question_id", "question_type", "answer", "sentiment", "topic", "cluster")
 
-    if db.engine.dialect.has_table(db.engine, "text_answer_analytics"):
-        return
 
-    class TextAnswerAnalytics(db.Model):  # type: ignore
-        __tablename__ = "text_answer_analytics"
-        id = Column(Integer, primary_key=True)
-        response_id = Column(Integer)
-        question_id = Column(Integer)
-        sentiment = Column(String(20))
-        topic = Column(Integer)
-        cluster = Column(Integer)
-        extra = Column(SAJSON)
+def store_analysis(db_session, result_model, records: Iterable[Dict], job_id: str | None = None) -> int:
+    """Bulk-insert analysis rows (``run_full_analysis`` records) into ``text_answer_analytics``.
 
-    db.create_all()
+    Does not commit. Returns the number of rows written.
+    """
+    rows = []
+    for record in records:
+        row = {column: record.get(column) for column in ANALYSIS_COLUMNS}
+        for column in ("response_id", "question_id", "topic", "cluster"):
+            if row[column] is not None:
+                row[column] = int(row[column])  # numpy ints do not bind on every driver
+        row["job_id"] = job_id
+        rows.append(row)
+    if rows:
+        db_session.bulk_insert_mappings(result_model, rows)
+    return len(rows)
+
+
+def create_analysis_table(db, db_session, survey_response_model, question_model, result_model) -> int:  # pragma: no cover
+    """Create 'text_answer_analytics' if it does not exist and store a fresh analysis in it."""
+    result_model.__table__.create(db.engine, checkfirst=True)
 
     df = run_full_analysis(db_session, survey_response_model, question_model)
-    df[[
-        "response_id",
-        "question_id",
-        "sentiment",
-        "topic",
-        "cluster",
-    ]].to_sql("text_answer_analytics", db.engine, if_exists="append", index=False)
+    written = store_analysis(db_session, result_model, df.to_dict(orient="records"))
+    db_session.commit()
+    return written
 
 def generate_question_label(question_text: str, max_words: int = 3) -> str:
     """
@@ -261,14 +498,8 @@ def generate_question_label(question_text: str, max_words: int = 3) -> str:
         A concise, readable label (e.g., "Your Age", "Annual Budget", "Leadership Training")
     """
     import re
-    from nltk.corpus import stopwords
     
-    # Ensure stopwords are downloaded
-    try:
-        stop_words = set(stopwords.words('english'))
-    except:
-        nltk_download('stopwords', quiet=True)
-        stop_words = set(stopwords.words('english'))
+    stop_words = _get_stopwords()
     
     original_text = question_text.strip()
     text = original_text.lower()
@@ -745,9 +976,13 @@ def _classify_question_heuristic(question_text: str, question_metadata: dict = N
 
 
 __all__ = [
+    "iter_open_ended_answers",
     "fetch_open_ended_answers",
     "run_full_analysis",
+    "analyze_answers",
     "get_analysis",
+    "store_analysis",
+    "create_analysis_table",
     "generate_question_label",
     "generate_section_summary",
     "classify_question_type",
@@ -0,0 +1,268 @@
+"""wide_export.py
+
+Wide-format survey response exports: one row per response, one column per question.
+
+Analysts pulled ``/api/survey-responses/admin`` (every response with its full ``answers``
+JSON) and pivoted it client-side. ``WideResponseExporter`` does the pivot on the server
+for one template at a time:
+
+* columns are the fixed response fields (``FIXED_COLUMNS``) followed by one column per
+  question of the template's question list, in template order, named ``q<id>: <text>``;
+  answers to keys that are not in the list are dropped. List/dict answers are written
+  as JSON text;
+* responses are read ``chunk_size`` at a time from a server-side cursor and each chunk
+  is turned into a pandas ``DataFrame`` and appended to the file -- CSV with
+  ``DataFrame.to_csv``, Parquet with a ``pyarrow.parquet.ParquetWriter`` (one row group
+  per chunk). Answer columns are strings in Parquet so the schema is the same for every
+  chunk whatever mix of types the answers hold;
+* finished files are kept in ``cache_dir`` per template and format (app.py uses
+  ``WIDE_EXPORT_CACHE_DIR`` or its instance folder, never the source tree). A file is
+  reused while the template's *stamp* -- the responses' ``MAX(updated_at)`` high-water
+  mark, ``COUNT(*)`` and ``MAX(id)`` (so deletions and inserts with an old timestamp
+  also count) plus a hash of the question list -- is unchanged, so repeated downloads
+  cost one aggregate query.
+
+pandas (and pyarrow, which is optional and only needed for Parquet) are imported on first
+use, as in ``text_analytics``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMATS = (FORMAT_CSV, FORMAT_PARQUET)
+
+MIMETYPES = {
+    FORMAT_CSV: 'text/csv',
+    FORMAT_PARQUET: 'application/vnd.apache.parquet',
+}
+
+FIXED_COLUMNS = ('response_id', 'user_id', 'status', 'created_at', 'updated_at')
+
+DEFAULT_CACHE_DIR = os.getenv('WIDE_EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'wide_exports'))
+DEFAULT_CHUNK_SIZE = 2000
+
+MAX_COLUMN_TEXT = 80
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parse_json(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def question_columns(questions) -> List[Tuple[str, str]]:
+    """``[(answer key, column name)]`` for a template question list, in template order."""
+    columns = []
+    seen = set()
+    for q in _parse_json(questions) or []:
+        if not isinstance(q, dict) or q.get('id') is None:
+            continue
+        key = str(q['id'])
+        if key in seen:
+            continue
+        seen.add(key)
+        text = ' '.join(str(q.get('question_text') or '').split())
+        if len(text) > MAX_COLUMN_TEXT:
+            text = text[:MAX_COLUMN_TEXT - 3] + '...'
+        columns.append((key, f'q{key}: {text}' if text else f'q{key}'))
+    return columns
+
+
+def _cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def wide_row(response_row, keys: List[str]) -> List:
+    """Fixed fields of ``response_row`` followed by its answer to each of ``keys``."""
+    response_id, user_id, status, created_at, updated_at, answers = response_row
+    answers = _parse_json(answers)
+    if not isinstance(answers, dict):
+        answers = {}
+    return [response_id, user_id, status, created_at, updated_at] + [_cell(answers.get(key)) for key in keys]
+
+
+class WideResponseExporter:
+    """Build (and cache) wide exports of ``response_model`` rows for one template."""
+
+    def __init__(self, db, response_model, template_model, cache_dir: str = DEFAULT_CACHE_DIR,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.response_model = response_model
+        self.template_model = template_model
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self._locks: Dict[Tuple[int, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Stamp / cache paths
+    # ------------------------------------------------------------------
+
+    def stamp(self, session, template) -> str:
+        """Changes whenever the template's responses or question list change."""
+        model = self.response_model
+        count, last_id, high_water = session.execute(
+            select(func.count(), func.max(model.id), func.max(model.updated_at))
+            .where(model.template_id == template.id)
+        ).one()
+        questions = json.dumps(_parse_json(template.questions) or [], sort_keys=True, default=str)
+        digest = hashlib.sha1(questions.encode('utf-8')).hexdigest()[:12]
+        high_water = high_water.isoformat() if high_water is not None else '-'
+        return f'{high_water}|{count}|{last_id or 0}|{digest}'
+
+    def _paths(self, template_id: int, fmt: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, f'template_{template_id}.{fmt}')
+        return base, base + '.stamp'
+
+    def _lock(self, template_id: int, fmt: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((template_id, fmt), threading.Lock())
+
+    def _cached(self, template_id: int, fmt: str, stamp: str) -> Optional[str]:
+        path, stamp_path = self._paths(template_id, fmt)
+        try:
+            with open(stamp_path, encoding='utf-8') as f:
+                if f.read() == stamp and os.path.exists(path):
+                    return path
+        except OSError:
+            pass
+        return None
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _chunks(self, session, template_id: int, keys: List[str]) -> Iterator[List[List]]:
+        model = self.response_model
+        result = session.execute(
+            select(model.id, model.user_id, model.status, model.created_at, model.updated_at, model.answers)
+            .where(model.template_id == template_id)
+            .order_by(model.id)
+            .execution_options(stream_results=True, yield_per=self.chunk_size)
+        )
+        try:
+            for partition in result.partitions(self.chunk_size):
+                yield [wide_row(row, keys) for row in partition]
+        finally:
+            result.close()
+
+    def write(self, session, template, fmt: str, path: str) -> int:
+        """Write the wide export of ``template`` to ``path``; returns the number of rows."""
+        import pandas as pd
+
+        columns = question_columns(template.questions)
+        keys = [key for key, _ in columns]
+        names = list(FIXED_COLUMNS) + [name for _, name in columns]
+
+        rows = 0
+        if fmt == FORMAT_PARQUET:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema(
+                [('response_id', pa.int64()), ('user_id', pa.int64()), ('status', pa.string()),
+                 ('created_at', pa.timestamp('us')), ('updated_at', pa.timestamp('us'))]
+                + [(name, pa.string()) for _, name in columns]
+            )
+            with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+                for chunk in self._chunks(session, template.id, keys):
+                    frame = pd.DataFrame(chunk, columns=names)
+                    for _, name in columns:
+                        frame[name] = frame[name].map(lambda v: None if v is None else str(v))
+                    writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+                if not rows:
+                    writer.write_table(schema.empty_table())
+            return rows
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            pd.DataFrame(columns=names).to_csv(f, index=False)
+            for chunk in self._chunks(session, template.id, keys):
+                pd.DataFrame(chunk, columns=names).to_csv(f, index=False, header=False)
+                rows += len(chunk)
+        return rows
+
+    def export(self, session, template, fmt: str = FORMAT_CSV, use_cache: bool = True) -> Tuple[str, bool]:
+        """``(path, from_cache)`` of an up-to-date export of ``template`` in ``fmt``.
+
+        With ``use_cache=False`` the file is written to a temporary path the caller must
+        delete. Raises ``ValueError`` for an unknown format, ``RuntimeError`` if Parquet
+        is requested without pyarrow installed.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'; expected one of {', '.join(FORMATS)}")
+        if fmt == FORMAT_PARQUET and not parquet_available():
+            raise RuntimeError("Parquet export requires pyarrow; install it or use format=csv")
+
+        if not use_cache:
+            fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+            os.close(fd)
+            try:
+                self.write(session, template, fmt, path)
+            except Exception:
+                os.unlink(path)
+                raise
+            return path, False
+
+        stamp = self.stamp(session, template)
+        cached = self._cached(template.id, fmt, stamp)
+        if cached:
+            return cached, True
+
+        with self._lock(template.id, fmt):
+            # Another request may have built it while we waited
+            cached = self._cached(template.id, fmt, stamp)
+            if cached:
+                return cached, True
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path, stamp_path = self._paths(template.id, fmt)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=f'.{fmt}.tmp')
+            os.close(fd)
+            try:
+                rows = self.write(session, template, fmt, tmp_path)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            with open(stamp_path, 'w', encoding='utf-8') as f:
+                f.write(stamp)
+            logger.info(f"Wide {fmt} export for template {template.id} built ({rows} rows)")
+            return path, False
+
+
+__all__ = [
+    'FORMAT_CSV',
+    'FORMAT_PARQUET',
+    'FORMATS',
+    'MIMETYPES',
+    'FIXED_COLUMNS',
+    'parquet_available',
+    'question_columns',
+    'wide_row',
+    'WideResponseExporter',
+]